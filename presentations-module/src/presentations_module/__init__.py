@@ -1,5 +1,26 @@
+from .core.errors import AuthenticationError, PresentationDataError
 from .core.presentation_task import PresentationTask
+from .sources.asset_cache import AssetCache
 from .sources.download_format import DownloadFormat
+from .sources.page_helpers import install_page_helpers
+from .sources.render_profile import RENDER_PROFILES, RenderProfile, get_render_profile
+from .sources.request_policy import RequestPolicy, RequestStats
+from .sources.site_governor import SITE_ACTIONS, SiteGovernor
 from .sources.sokratic_source import SokraticSource
 
-__all__ = ["DownloadFormat", "PresentationTask", "SokraticSource"]
+__all__ = [
+    "AssetCache",
+    "AuthenticationError",
+    "DownloadFormat",
+    "PresentationDataError",
+    "PresentationTask",
+    "RENDER_PROFILES",
+    "RenderProfile",
+    "RequestPolicy",
+    "RequestStats",
+    "SITE_ACTIONS",
+    "SiteGovernor",
+    "SokraticSource",
+    "get_render_profile",
+    "install_page_helpers",
+]
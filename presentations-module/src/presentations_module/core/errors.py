@@ -0,0 +1,14 @@
+class PresentationDataError(ValueError):
+    """The request itself cannot be generated (unknown grade or style).
+
+    Raised for input the site will never accept, so callers fail the
+    presentation instead of retrying it on another tab.
+    """
+
+
+class AuthenticationError(RuntimeError):
+    """The browser session is not logged in to Sokratic, or logging in failed.
+
+    Neither the request nor the account's standing is at fault: callers
+    log in again and retry instead of counting it against the account.
+    """
@@ -1,4 +1,4 @@
-from typing import TypedDict
+from typing import Any, TypedDict
 
 
 class ProgressPayloadBase(TypedDict):
@@ -10,3 +10,6 @@ class ProgressPayloadBase(TypedDict):
 
 class ProgressPayload(ProgressPayloadBase, total=False):
     files: list[str]
+    order_url: str
+    # Request counters of the whole generation, on the final "done" update.
+    network: dict[str, Any]
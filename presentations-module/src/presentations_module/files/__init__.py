@@ -1,6 +1,7 @@
 from .file_storage import FileStorage
+from .generation_log_sink import GenerationLogSink
 from .local_file_storage import LocalFileStorage
 from .s3_file_storage import S3FileStorage
 from .sftp_file_storage import SftpFileStorage
 
-__all__ = ["FileStorage", "LocalFileStorage", "S3FileStorage", "SftpFileStorage"]
+__all__ = ["FileStorage", "GenerationLogSink", "LocalFileStorage", "S3FileStorage", "SftpFileStorage"]
@@ -4,6 +4,9 @@ from abc import ABC, abstractmethod
 class FileStorage(ABC):
     """Abstract interface for file storage backends."""
 
+    #: True when :meth:`append_bytes` extends an existing object in place.
+    supports_append: bool = False
+
     @abstractmethod
     def build_path(self, *parts: str) -> str:
         """Build a storage path or key from parts."""
@@ -31,3 +34,7 @@ class FileStorage(ABC):
         Returns the storage reference. The local file may be consumed (moved).
         """
         raise NotImplementedError
+
+    async def append_bytes(self, path: str, data: bytes) -> str:
+        """Append binary data to *path* (created if missing) and return its reference."""
+        raise NotImplementedError(f"{type(self).__name__} does not support appends")
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+
+from .file_storage import FileStorage
+
+DEFAULT_MAX_LOG_BYTES = 5 * 1024 * 1024
+
+
+class GenerationLogSink:
+    """Append-only, size-capped log writer for one generation.
+
+    :meth:`write` only buffers; :meth:`request_flush` hands the new lines to a
+    background task, so callers on the Playwright event loop never wait for
+    I/O. Storages with ``supports_append`` (local, SFTP) receive each batch as
+    an append, one drain at a time; a batch that fails to append is retried
+first on the next flush, ahead of lines written after it. Others
+    (S3) get one object assembled from all buffered parts on every
+    :meth:`checkpoint`, so one sink can span several phases without a later
+    phase overwriting an earlier one.
+    """
+
+    def __init__(
+        self,
+        storage: FileStorage,
+        path: str,
+        *,
+        max_bytes: int = DEFAULT_MAX_LOG_BYTES,
+        logger: logging.Logger | logging.LoggerAdapter | None = None,
+    ) -> None:
+        self.storage = storage
+        self.path = path
+        self.max_bytes = max_bytes
+        self.logger = logger or logging.getLogger(__name__)
+        self._pending: list[bytes] = []
+        self._parts: list[bytes] = []
+        self._accepted_bytes = 0
+        self._dropped_lines = 0
+        self._flush_task: asyncio.Task[None] | None = None
+        self._drain_lock = asyncio.Lock()
+        self._closed = False
+        self._ref: str | None = None
+
+    @property
+    def dropped_lines(self) -> int:
+        return self._dropped_lines
+
+    def write(self, line: str) -> None:
+        if self._closed:
+            return
+        data = (line + "\n").encode("utf-8", errors="replace")
+        if self._accepted_bytes + len(data) > self.max_bytes:
+            if self._dropped_lines == 0:
+                self._pending.append(
+                    f"... [log truncated: size cap of {self.max_bytes} bytes reached] ...\n".encode()
+                )
+            self._dropped_lines += 1
+            return
+        self._accepted_bytes += len(data)
+        self._pending.append(data)
+
+    def request_flush(self) -> None:
+        """Write buffered lines in the background; no-op if a flush is already running."""
+        if not self._pending or (self._flush_task is not None and not self._flush_task.done()):
+            return
+        self._flush_task = asyncio.get_running_loop().create_task(self._drain())
+
+    async def flush(self) -> None:
+        """Write buffered lines and wait until they are stored."""
+        # Waits for a background drain still holding the lock, then drains
+        # whatever it left behind.
+        await self._drain()
+
+    async def checkpoint(self) -> str | None:
+        """Store everything written so far and return the log reference; the sink stays open."""
+        await self.flush()
+        if self.storage.supports_append:
+            return self._ref
+        if not self._parts:
+            return None
+        self._ref = await self.storage.save_bytes(self.path, b"".join(self._parts))
+        return self._ref
+
+    async def close(self) -> str | None:
+        """Flush everything, append the truncation summary and return the log reference."""
+        if self._closed:
+            return None
+        self._closed = True
+        if self._dropped_lines:
+            self._pending.append(f"... [{self._dropped_lines} line(s) dropped] ...\n".encode())
+        return await self.checkpoint()
+
+    async def _drain(self) -> None:
+        async with self._drain_lock:
+            while self._pending:
+                batch, self._pending = b"".join(self._pending), []
+                if not self.storage.supports_append:
+                    self._parts.append(batch)
+                    continue
+                try:
+                    self._ref = await self.storage.append_bytes(self.path, batch)
+                except Exception as exc:  # pylint: disable=broad-except
+                    self.logger.warning("Failed to append to %s, will retry: %s", self.path, exc)
+                    # Only lines written during the append are pending now;
+                    # the failed batch goes back in front of them, whole.
+                    self._pending.insert(0, batch)
+                    return
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import shutil
 
@@ -7,6 +8,8 @@ from .file_storage import FileStorage
 class LocalFileStorage(FileStorage):
     """Stores files on the local filesystem, optionally rooted at base_dir."""
 
+    supports_append = True
+
     def __init__(self, base_dir: str = "") -> None:
         self._base = os.path.abspath(base_dir) if base_dir else ""
 
@@ -41,6 +44,19 @@ class LocalFileStorage(FileStorage):
             f.write(content)
         return dest
 
+    async def append_bytes(self, path: str, data: bytes) -> str:
+        dest = self._abs(path)
+
+        def _sync() -> None:
+            dest_dir = os.path.dirname(dest)
+            if dest_dir:
+                os.makedirs(dest_dir, exist_ok=True)
+            with open(dest, "ab") as f:
+                f.write(data)
+
+        await asyncio.to_thread(_sync)
+        return dest
+
     async def save_from_local_path(self, dest_path: str, local_path: str) -> str:
         dest = self._abs(dest_path)
         dest_dir = os.path.dirname(dest)
@@ -35,6 +35,8 @@ def _mkdir_p(sftp: "paramiko.SFTPClient", remote_path: str) -> None:
 class SftpFileStorage(FileStorage):
     """Store files on a remote path via SFTP (SSH + Paramiko)."""
 
+    supports_append = True
+
     def __init__(
         self,
         host: str,
@@ -165,6 +167,21 @@ class SftpFileStorage(FileStorage):
 
         return await asyncio.to_thread(_sync)
 
+    async def append_bytes(self, path: str, data: bytes) -> str:
+        full = self._abs_remote(path)
+
+        def _sync() -> str:
+            sftp = self._connect()
+            try:
+                _mkdir_p(sftp, full)
+                with sftp.open(full, "ab") as remote_f:  # type: ignore[operator]
+                    remote_f.write(data)
+            finally:
+                self._close(sftp)
+            return f"sftp://{self._host}{full}"
+
+        return await asyncio.to_thread(_sync)
+
     async def save_text(
         self, path: str, content: str, encoding: str = "utf-8"
     ) -> str:
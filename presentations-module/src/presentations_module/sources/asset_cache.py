@@ -0,0 +1,293 @@
+"""On-disk cache for Sokratic static assets served through ``page.route``."""
+
+import asyncio
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from playwright.async_api import Route
+
+CACHEABLE_RESOURCE_TYPES = frozenset({"script", "stylesheet"})
+
+# Bundler output such as ``/_next/static/...`` or ``app.3f9a1c2e.js`` never
+# changes under the same URL, so it is served without revalidation.
+_FINGERPRINT_RE = re.compile(r"(/_next/static/|[.\-_][0-9a-f]{8,}\.(?:js|mjs|css)$)", re.IGNORECASE)
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+_REPLAY_HEADERS = ("content-type", "cache-control", "etag", "last-modified", "vary")
+_INDEX_FILE = "index.json"
+
+
+@dataclasses.dataclass
+class AssetCacheStats:
+    hits: int = 0
+    misses: int = 0
+    revalidated: int = 0
+    stored: int = 0
+    evicted: int = 0
+    bytes_saved: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return dataclasses.asdict(self)
+
+
+@dataclasses.dataclass
+class _Entry:
+    digest: str
+    size: int
+    headers: dict[str, str]
+    immutable: bool
+    expires_at: float
+    last_used: float
+
+
+class AssetCache:
+    """Content-addressed asset cache with size-bounded LRU eviction.
+
+    Bodies are stored once per SHA-256 digest under *cache_dir*; the URL index
+    maps request URLs to digests and freshness data. Fingerprinted URLs (or
+    ``Cache-Control: immutable``) are always served from disk; other entries
+    are fresh for their ``max-age`` and then revalidated with ``ETag`` /
+    ``Last-Modified``. Use from a single event loop.
+
+    The URL index is kept in least-recently-used order, and bytes are counted
+    once per digest, so lookups, touches and eviction stay cheap as the cache
+    grows.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_bytes: int,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.logger = logger or logging.getLogger(__name__)
+        self.stats = AssetCacheStats()
+        # Least recently used first.
+        self._entries: dict[str, _Entry] = {}
+        # URLs per digest; a blob counts towards total_bytes while it has any.
+        self._refs: dict[str, int] = {}
+        self._total_bytes = 0
+        # Disk writes go one at a time, in the order the index changed.
+        self._write_lock = asyncio.Lock()
+        self._load_index()
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def snapshot(self) -> dict[str, int]:
+        return {**self.stats.as_dict(), "entries": len(self._entries), "bytes": self.total_bytes}
+
+    async def handle(self, route: Route) -> bool:
+        """Serve *route* from the cache or populate it; False means "not cacheable, continue"."""
+        request = route.request
+        if request.method != "GET" or request.resource_type not in CACHEABLE_RESOURCE_TYPES:
+            return False
+
+        url = request.url
+        entry = self._entries.get(url)
+        now = time.time()
+        if entry is not None and (entry.immutable or now < entry.expires_at):
+            body = await self._read_blob(entry.digest)
+            if body is not None:
+                self._touch(url, entry, now)
+                self.stats.hits += 1
+                self.stats.bytes_saved += entry.size
+                await route.fulfill(status=200, headers=entry.headers, body=body)
+                return True
+            self._drop_entry(url)
+            entry = None
+
+        conditional: dict[str, str] = {}
+        if entry is not None:
+            if etag := entry.headers.get("etag"):
+                conditional["if-none-match"] = etag
+            if last_modified := entry.headers.get("last-modified"):
+                conditional["if-modified-since"] = last_modified
+        headers = {**request.headers, **conditional} if conditional else None
+        try:
+            response = await route.fetch(headers=headers)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.logger.debug("AssetCache: fetch failed for %s, passing through: %s", url, exc)
+            return False
+
+        if response.status == 304 and entry is not None:
+            body = await self._read_blob(entry.digest)
+            if body is not None:
+                entry.expires_at = now + self._max_age(response.headers)
+                self._touch(url, entry, now)
+                self.stats.revalidated += 1
+                self.stats.bytes_saved += entry.size
+                await route.fulfill(status=200, headers=entry.headers, body=body)
+                return True
+            # The blob is gone, so the 304 has nothing to replay: ask again
+            # without validators.
+            self._drop_entry(url)
+            try:
+                response = await route.fetch()
+            except Exception as exc:  # pylint: disable=broad-except
+                self.logger.debug("AssetCache: refetch failed for %s, passing through: %s", url, exc)
+                return False
+
+        self.stats.misses += 1
+        body = await response.body()
+        if response.status == 200 and self._is_storable(response.headers):
+            try:
+                await self._store(url, body, response.headers, now)
+            except Exception as exc:  # pylint: disable=broad-except
+                # A failed store must not leave the page waiting for the asset.
+                self.logger.warning("AssetCache: failed to store %s: %s", url, exc)
+        await route.fulfill(response=response, body=body)
+        return True
+
+    # --- freshness ---
+
+    @staticmethod
+    def _cache_control(headers: dict[str, str]) -> str:
+        return (headers.get("cache-control") or "").lower()
+
+    def _is_storable(self, headers: dict[str, str]) -> bool:
+        cache_control = self._cache_control(headers)
+        return "no-store" not in cache_control and "private" not in cache_control
+
+    def _is_immutable(self, url: str, headers: dict[str, str]) -> bool:
+        return bool(_FINGERPRINT_RE.search(urlparse(url).path)) or "immutable" in self._cache_control(headers)
+
+    def _max_age(self, headers: dict[str, str]) -> float:
+        cache_control = self._cache_control(headers)
+        if "no-cache" in cache_control:
+            return 0
+        if match := _MAX_AGE_RE.search(cache_control):
+            return int(match.group(1))
+        expires = headers.get("expires")
+        if expires:
+            try:
+                return max(parsedate_to_datetime(expires).timestamp() - time.time(), 0)
+            except (TypeError, ValueError):
+                return 0
+        return 0
+
+    # --- index ---
+
+    def _add_entry(self, url: str, entry: _Entry) -> None:
+        self._entries[url] = entry
+        refs = self._refs.get(entry.digest, 0)
+        if not refs:
+            self._total_bytes += entry.size
+        self._refs[entry.digest] = refs + 1
+
+    def _drop_entry(self, url: str) -> str | None:
+        """Forget *url*; return its digest if no other URL uses that blob any more."""
+        entry = self._entries.pop(url, None)
+        if entry is None:
+            return None
+        refs = self._refs.pop(entry.digest) - 1
+        if refs:
+            self._refs[entry.digest] = refs
+            return None
+        self._total_bytes -= entry.size
+        return entry.digest
+
+    def _touch(self, url: str, entry: _Entry, now: float) -> None:
+        entry.last_used = now
+        self._entries[url] = self._entries.pop(url)
+
+    # --- storage ---
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, digest[:2], digest)
+
+    async def _read_blob(self, digest: str) -> bytes | None:
+        def _read() -> bytes | None:
+            try:
+                with open(self._blob_path(digest), "rb") as fh:
+                    return fh.read()
+            except OSError:
+                return None
+
+        return await asyncio.to_thread(_read)
+
+    async def _store(self, url: str, body: bytes, headers: dict[str, str], now: float) -> None:
+        digest = hashlib.sha256(body).hexdigest()
+        replay = {name: headers[name] for name in _REPLAY_HEADERS if name in headers}
+        replaced = self._drop_entry(url)
+        self._add_entry(url, _Entry(
+            digest=digest,
+            size=len(body),
+            headers=replay,
+            immutable=self._is_immutable(url, headers),
+            expires_at=now + self._max_age(headers),
+            last_used=now,
+        ))
+        self.stats.stored += 1
+        evicted = self._evict()
+        if replaced is not None and replaced != digest:
+            evicted.append(replaced)
+        async with self._write_lock:
+            # The index is serialized here, on the loop: other routes keep
+            # changing it while the thread writes.
+            index = json.dumps(
+                {cached_url: dataclasses.asdict(entry) for cached_url, entry in self._entries.items()}
+            ).encode()
+            try:
+                await asyncio.to_thread(self._write_files, digest, body, evicted, index)
+            except Exception as exc:  # pylint: disable=broad-except
+                self.logger.warning("AssetCache: failed to write %s: %s", url, exc)
+                self._drop_entry(url)
+
+    def _evict(self) -> list[str]:
+        """Drop least recently used URLs until the cache fits; return orphaned digests."""
+        orphaned: list[str] = []
+        while self._total_bytes > self.max_bytes and self._entries:
+            self.stats.evicted += 1
+            if (digest := self._drop_entry(next(iter(self._entries)))) is not None:
+                orphaned.append(digest)
+        return orphaned
+
+    def _write_files(self, digest: str, body: bytes, orphaned: list[str], index: bytes) -> None:
+        path = self._blob_path(digest)
+        if digest not in orphaned and not os.path.exists(path):
+            self._atomic_write(path, body)
+        for orphan in orphaned:
+            try:
+                os.remove(self._blob_path(orphan))
+            except OSError:
+                pass
+        self._atomic_write(os.path.join(self.cache_dir, _INDEX_FILE), index)
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _load_index(self) -> None:
+        try:
+            with open(os.path.join(self.cache_dir, _INDEX_FILE), "rb") as fh:
+                raw = json.loads(fh.read())
+            entries = {url: _Entry(**data) for url, data in raw.items()}
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, TypeError) as exc:
+            self.logger.warning("AssetCache: ignoring unreadable index in %s: %s", self.cache_dir, exc)
+            return
+        for url, entry in sorted(entries.items(), key=lambda item: item[1].last_used):
+            self._add_entry(url, entry)
@@ -0,0 +1,234 @@
+"""Page-side helper library installed into every Sokratic browser context.
+
+The script is registered once per context with ``add_init_script`` and runs
+before any page script on every navigation, so callers only send a short
+function call over CDP instead of the whole probe source. Waits are promises
+resolved from a ``MutationObserver`` (plus transition/animation end events)
+rather than ``requestAnimationFrame`` polling.
+"""
+
+from playwright.async_api import BrowserContext, Page
+
+PAGE_HELPERS_GLOBAL = "__presentationsHelpers"
+
+PAGE_HELPERS_JS = """
+(() => {
+    if (window.__presentationsHelpers) return;
+
+    const PRELOADER_SELECTORS = [
+        '[aria-busy="true"]',
+        '[class*="preloader"]',
+        '[class*="loader"]',
+        '[class*="loading"]',
+        '[data-testid*="loader"]',
+        'div[data-state="open"][aria-hidden="true"][data-aria-hidden="true"][class*="inset-0"]',
+        '[class*="bg-black/80"]',
+    ].join(',');
+
+    const viewport = () => ({
+        width: window.innerWidth || document.documentElement.clientWidth,
+        height: window.innerHeight || document.documentElement.clientHeight,
+    });
+
+    const isVisible = (el) => {
+        const style = window.getComputedStyle(el);
+        if (style.display === 'none' || style.visibility === 'hidden') return false;
+        if (parseFloat(style.opacity || '1') === 0) return false;
+        const rect = el.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0;
+    };
+
+    const describeCandidate = (el, vw, vh) => {
+        const style = window.getComputedStyle(el);
+        const rect = el.getBoundingClientRect();
+        const fullCover = rect.width >= vw * 0.8 && rect.height >= vh * 0.6;
+        const fixedLike = style.position === 'fixed' || style.position === 'absolute';
+        return {
+            tag: el.tagName.toLowerCase(),
+            id: el.id || '',
+            className: (el.className || '').toString().slice(0, 200),
+            width: Math.round(rect.width),
+            height: Math.round(rect.height),
+            position: style.position,
+            zIndex: style.zIndex || '',
+            fullCover,
+            blocking: fullCover && fixedLike,
+        };
+    };
+
+    const visibleCandidates = () => {
+        const { width: vw, height: vh } = viewport();
+        const out = [];
+        for (const el of document.querySelectorAll(PRELOADER_SELECTORS)) {
+            if (isVisible(el)) out.push(describeCandidate(el, vw, vh));
+        }
+        return out;
+    };
+
+    const isBlocked = () => {
+        const { width: vw, height: vh } = viewport();
+        for (const el of document.querySelectorAll(PRELOADER_SELECTORS)) {
+            if (isVisible(el) && describeCandidate(el, vw, vh).blocking) return true;
+        }
+        return false;
+    };
+
+    const preloaderState = () => {
+        const { width: vw, height: vh } = viewport();
+        const out = visibleCandidates();
+        return {
+            url: window.location.href,
+            viewport: `${vw}x${vh}`,
+            visibleCandidates: out.length,
+            blockingCandidates: out.filter((x) => x.blocking).length,
+            topCandidates: out.slice(0, 5),
+        };
+    };
+
+    // Resolve true once predicate() holds, false after timeoutMs. The
+    // predicate is re-checked at most once per task after DOM mutations or
+    // finished CSS transitions/animations under root.
+    const waitUntil = (predicate, timeoutMs, root) => new Promise((resolve) => {
+        const target = root || document.documentElement;
+        let done = false;
+        let scheduled = false;
+        let timer = null;
+        const finish = (value) => {
+            if (done) return;
+            done = true;
+            observer.disconnect();
+            target.removeEventListener('transitionend', schedule, true);
+            target.removeEventListener('animationend', schedule, true);
+            if (timer !== null) clearTimeout(timer);
+            resolve(value);
+        };
+        const check = () => {
+            scheduled = false;
+            let ok = false;
+            try { ok = !!predicate(); } catch (e) { ok = false; }
+            if (ok) finish(true);
+        };
+        function schedule() {
+            if (done || scheduled) return;
+            scheduled = true;
+            setTimeout(check, 0);
+        }
+        const observer = new MutationObserver(schedule);
+        observer.observe(target, {
+            subtree: true,
+            childList: true,
+            attributes: true,
+            attributeFilter: ['class', 'style', 'hidden', 'aria-busy', 'aria-hidden', 'data-state'],
+        });
+        target.addEventListener('transitionend', schedule, true);
+        target.addEventListener('animationend', schedule, true);
+        if (timeoutMs > 0) timer = setTimeout(() => finish(false), timeoutMs);
+        check();
+    });
+
+    const whenUnblocked = (timeoutMs) => waitUntil(() => !isBlocked(), timeoutMs);
+
+    const whenLoaderHidden = (button, timeoutMs) => waitUntil(() => {
+        const container = button.querySelector('.loader-container');
+        return !container || window.getComputedStyle(container).opacity === '0';
+    }, timeoutMs, button);
+
+    // Metadata for every card matched by xpath, in document order.
+    const styleCards = (xpath) => {
+        const result = document.evaluate(
+            xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null,
+        );
+        const cards = [];
+        for (let i = 0; i < result.snapshotLength; i += 1) {
+            const el = result.snapshotItem(i);
+            const rect = el.getBoundingClientRect();
+            const img = el.querySelector('img');
+            cards.push({
+                index: i,
+                visible: rect.width > 0 && rect.height > 0,
+                x: Math.round(rect.x),
+                y: Math.round(rect.y),
+                width: Math.round(rect.width),
+                height: Math.round(rect.height),
+                id: el.getAttribute('data-id') || el.id || '',
+                title: (el.getAttribute('title') || el.innerText || '').trim().slice(0, 120),
+                image: img ? (img.getAttribute('src') || '').slice(0, 300) : '',
+            });
+        }
+        return cards;
+    };
+
+    // Links to order pages (path starting with prefix) in document order,
+    // one per order id, as {url, title}.
+    const orderLinks = (prefix, limit) => {
+        const seen = new Set();
+        const out = [];
+        for (const link of document.querySelectorAll(`a[href*="${prefix}"]`)) {
+            const url = new URL(link.getAttribute('href'), window.location.href);
+            if (!url.pathname.startsWith(prefix)) continue;
+            const orderId = url.pathname.slice(prefix.length).split('/')[0];
+            if (!orderId || seen.has(orderId)) continue;
+            seen.add(orderId);
+            const title = (link.getAttribute('title') || link.innerText || '').trim();
+            out.push({ url: url.origin + prefix + orderId, title: title.slice(0, 300) });
+            if (out.length >= limit) break;
+        }
+        return out;
+    };
+
+    // Set form controls the way a user edit would: through the native value
+    // setter (so React sees the change) followed by input/change events.
+    // fields: [{name, xpath, value}]. Returns per-field results with the time
+    // spent and whether the value stuck.
+    const nativeSetter = (el) => {
+        const proto = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype
+            : el instanceof HTMLSelectElement ? HTMLSelectElement.prototype
+            : HTMLInputElement.prototype;
+        return Object.getOwnPropertyDescriptor(proto, 'value').set;
+    };
+
+    const fillFields = (fields) => fields.map(({ name, xpath, value }) => {
+        const started = performance.now();
+        const el = document.evaluate(
+            xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null,
+        ).singleNodeValue;
+        if (!el) return { name, found: false, applied: false, ms: 0 };
+        el.focus();
+        nativeSetter(el).call(el, value);
+        el.dispatchEvent(new Event('input', { bubbles: true }));
+        el.dispatchEvent(new Event('change', { bubbles: true }));
+        el.blur();
+        return {
+            name,
+            found: true,
+            applied: el.value === value,
+            ms: performance.now() - started,
+        };
+    });
+
+    Object.defineProperty(window, '__presentationsHelpers', {
+        value: Object.freeze({
+            version: 1,
+            fillFields,
+            isBlocked,
+            orderLinks,
+            preloaderState,
+            styleCards,
+            waitUntil,
+            whenLoaderHidden,
+            whenUnblocked,
+        }),
+        enumerable: false,
+    });
+})()
+"""
+
+
+async def install_page_helpers(context: BrowserContext) -> None:
+    """Register the helper library for every page opened in *context* from now on."""
+    await context.add_init_script(script=PAGE_HELPERS_JS)
+
+
+async def ensure_page_helpers(page: Page) -> None:
+    """Inject the helpers into a page whose document predates the init script."""
+    await page.evaluate(PAGE_HELPERS_JS)
@@ -0,0 +1,101 @@
+"""Chromium launch and context settings, grouped into selectable rendering profiles."""
+
+import dataclasses
+from typing import Any
+
+from playwright.async_api import BrowserContext
+
+BASE_CHROMIUM_ARGS = ("--no-sandbox", "--disable-dev-shm-usage")
+
+# Background services and features a scripted tab never uses.
+LEAN_CHROMIUM_ARGS = (
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-breakpad",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,BackForwardCache",
+)
+
+# Applied through a constructed stylesheet, so it adds no DOM node that
+# could trip up the site's hydration.
+REDUCE_MOTION_JS = """
+(() => {
+  if (!document.adoptedStyleSheets || typeof CSSStyleSheet !== "function") return;
+  const sheet = new CSSStyleSheet();
+  sheet.replaceSync(`*, *::before, *::after {
+    animation-duration: 0s !important;
+    animation-delay: 0s !important;
+    transition-duration: 0s !important;
+    transition-delay: 0s !important;
+    scroll-behavior: auto !important;
+  }`);
+  document.adoptedStyleSheets = [...document.adoptedStyleSheets, sheet];
+})()
+"""
+
+
+@dataclasses.dataclass(frozen=True)
+class RenderProfile:
+    """How a browser is launched and how its context renders pages.
+
+    ``headless_shell`` keeps Playwright's default headless binary
+    (chromium-headless-shell); False runs full Chromium in its new headless
+    mode (channel ``chromium``). Headed launches ignore it.
+    """
+
+    name: str
+    viewport: tuple[int, int] = (1280, 720)
+    device_scale_factor: float = 1.0
+    chromium_args: tuple[str, ...] = ()
+    reduce_motion: bool = False
+    headless_shell: bool = True
+
+    def launch_options(self, headless: bool, extra_args: tuple[str, ...] = ()) -> dict[str, Any]:
+        options: dict[str, Any] = {
+            "headless": headless,
+            "args": [*BASE_CHROMIUM_ARGS, *self.chromium_args, *extra_args],
+        }
+        if headless and not self.headless_shell:
+            options["channel"] = "chromium"
+        return options
+
+    def context_options(self) -> dict[str, Any]:
+        width, height = self.viewport
+        options: dict[str, Any] = {
+            "viewport": {"width": width, "height": height},
+            "device_scale_factor": self.device_scale_factor,
+        }
+        if self.reduce_motion:
+            options["reduced_motion"] = "reduce"
+        return options
+
+    async def install(self, context: BrowserContext) -> None:
+        """Register the profile's page-side tweaks for every page of *context*."""
+        if self.reduce_motion:
+            await context.add_init_script(script=REDUCE_MOTION_JS)
+
+
+RENDER_PROFILES = {
+    "standard": RenderProfile(name="standard"),
+    # Half-density rendering also halves screenshot dimensions.
+    "lean": RenderProfile(
+        name="lean",
+        device_scale_factor=0.5,
+        chromium_args=LEAN_CHROMIUM_ARGS,
+        reduce_motion=True,
+    ),
+    "full-chromium": RenderProfile(name="full-chromium", headless_shell=False),
+}
+
+
+def get_render_profile(name: str) -> RenderProfile:
+    try:
+        return RENDER_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown render profile: {name!r}") from None
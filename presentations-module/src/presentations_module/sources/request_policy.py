@@ -0,0 +1,102 @@
+"""Declarative request blocking for routed tabs and the traffic counters it feeds."""
+
+import dataclasses
+import fnmatch
+from typing import Any, Iterable
+from urllib.parse import urlparse
+
+DEFAULT_FIRST_PARTY_HOSTS = ("sokratic.ru", "*.sokratic.ru")
+DEFAULT_ALLOWED_HOSTS = (*DEFAULT_FIRST_PARTY_HOSTS, "storage.yandexcloud.net")
+DEFAULT_BLOCKED_RESOURCE_TYPES = ("image", "media", "font")
+
+# Analytics and ad beacons. Matched before the host allow-list, so a tracker
+# served from an allowed host is blocked as well. The path patterns are
+# generic file names, so they apply to third-party hosts only: the site's own
+# bundles may be called ``analytics.js`` too.
+TRACKER_HOST_PATTERNS = (
+    "mc.yandex.ru",
+    "mc.yandex.com",
+    "an.yandex.ru",
+    "google-analytics.com",
+    "*.google-analytics.com",
+    "googletagmanager.com",
+    "*.googletagmanager.com",
+    "*.doubleclick.net",
+    "connect.facebook.net",
+    "top-fwz1.mail.ru",
+    "counter.yadro.ru",
+    "*.hotjar.com",
+    "*.amplitude.com",
+)
+TRACKER_PATH_PATTERNS = (
+    "*/metrika/*",
+    "*/gtag/js*",
+    "*/gtm.js",
+    "*/analytics.js",
+    "*/tag.js",
+)
+
+
+def _matches(value: str, patterns: Iterable[str]) -> bool:
+    return any(fnmatch.fnmatchcase(value, pattern) for pattern in patterns)
+
+
+@dataclasses.dataclass(frozen=True)
+class RequestPolicy:
+    """Which requests a routed tab lets through.
+
+    Host patterns match the request host; URL patterns match ``host + path``
+    (no scheme, no query). Both use shell-style wildcards. Tracker path
+    patterns are not applied to ``first_party_hosts``.
+    """
+
+    allowed_hosts: tuple[str, ...] = DEFAULT_ALLOWED_HOSTS
+    first_party_hosts: tuple[str, ...] = DEFAULT_FIRST_PARTY_HOSTS
+    blocked_resource_types: frozenset[str] = frozenset(DEFAULT_BLOCKED_RESOURCE_TYPES)
+    blocked_url_patterns: tuple[str, ...] = ()
+    block_trackers: bool = True
+
+    def block_reason(self, url: str, resource_type: str) -> str | None:
+        """Why the request must be aborted, or None to let it through."""
+        parsed = urlparse(url)
+        host = (parsed.hostname or "").lower()
+        host_path = f"{host}{parsed.path}"
+        if self.block_trackers and (
+            _matches(host, TRACKER_HOST_PATTERNS)
+            or (
+                not _matches(host, self.first_party_hosts)
+                and _matches(host_path, TRACKER_PATH_PATTERNS)
+            )
+        ):
+            return "tracker"
+        if not _matches(host, self.allowed_hosts):
+            return "host"
+        if resource_type in self.blocked_resource_types:
+            return "resource_type"
+        if _matches(host_path, self.blocked_url_patterns):
+            return "url_pattern"
+        return None
+
+
+@dataclasses.dataclass
+class RequestStats:
+    """Requests and response bytes of one generation (or of the whole process).
+
+    ``allowed`` requests went to the network; ``cached`` ones were answered
+    by the asset cache; ``blocked`` were aborted by the policy and never
+    left the browser; ``failed`` were let through but did not complete.
+    """
+
+    allowed: int = 0
+    allowed_bytes: int = 0
+    cached: int = 0
+    blocked: int = 0
+    failed: int = 0
+    blocked_by: dict[str, int] = dataclasses.field(default_factory=dict)
+
+    def record_blocked(self, reason: str) -> None:
+        self.blocked += 1
+        self.blocked_by[reason] = self.blocked_by.get(reason, 0) + 1
+
+    def as_dict(self) -> dict[str, Any]:
+        return {**dataclasses.asdict(self), "blocked_by": dict(self.blocked_by)}
@@ -0,0 +1,23 @@
+"""Hook that paces the actions a source performs against the site."""
+
+import contextlib
+from typing import AsyncIterator
+
+# Actions a source asks permission for: submitting an order (from the
+# landing-page click to the order page) and exporting one file.
+SITE_ACTIONS = ("submit", "download")
+
+
+class SiteGovernor:
+    """Grants permission for site actions; the base class never waits.
+
+    Subclasses bound the rate and concurrency of each action, for example
+    across every worker of a cluster. :meth:`permit` is held for the whole
+    action, so a concurrency slot is released only when the action ends.
+    """
+
+    @contextlib.asynccontextmanager
+    async def permit(self, action: str) -> AsyncIterator[None]:
+        if action not in SITE_ACTIONS:
+            raise ValueError(f"Unknown site action: {action!r}")
+        yield
@@ -1,25 +1,42 @@
+import asyncio
+import collections
 import dataclasses
 import logging
 import os
 import random
+import re
 import tempfile
+import time
+import weakref
 from datetime import datetime, timezone
-from typing import AsyncIterator
-from urllib.parse import urlparse
+from typing import Any, AsyncIterator, Awaitable, Callable, Sequence
+from urllib.parse import unquote, urlparse
 
 from playwright.async_api import (
     Playwright,
     Browser,
     BrowserContext,
+    Download,
+    Error as PlaywrightError,
+    Locator,
     Page,
+    Request,
+    Response,
     Route,
     TimeoutError as PlaywrightTimeoutError,
     expect,
 )
 
+from .asset_cache import AssetCache
 from .download_format import DownloadFormat
+from .page_helpers import PAGE_HELPERS_GLOBAL, ensure_page_helpers, install_page_helpers
 from .presentation_source import PresentationSource
-from ..files import FileStorage, LocalFileStorage
+from .render_profile import RENDER_PROFILES, RenderProfile
+from .request_policy import RequestPolicy, RequestStats
+from .site_governor import SiteGovernor
+from ..files import FileStorage, GenerationLogSink, LocalFileStorage
+from ..files.generation_log_sink import DEFAULT_MAX_LOG_BYTES
+from ..core.errors import AuthenticationError, PresentationDataError
 from ..core.progress_payload import ProgressPayload
 
 GRADE_MAPPING = {
@@ -36,13 +53,156 @@ GRADE_MAPPING = {
     "11": "Старшая школа",
 }
 
+ORDER_PATH_PREFIX = "/ru/orders/"
+
+_CREATE_WITH_AI_XPATH = '//button[contains(normalize-space(), "Создать с AI")]'
+
+# Backend paths whose answer acknowledges an action in the page.
+_SPEECH_TEXT_PATH = re.compile(r"/generate\b")
+_ORDER_SUBMIT_PATH = re.compile(r"/orders/[^/]+/(?:generate|submit)\b")
+
+
+def _endpoint_response(method: str, path: re.Pattern[str]) -> Callable[[Response], bool]:
+    """Predicate for a successful *method* call to a Sokratic backend *path*.
+
+    Other calls the page makes meanwhile (analytics, autosave, polling) must
+    not pass for the acknowledgement of the action being waited on.
+    """
+
+    def _matches(response: Response) -> bool:
+        url = urlparse(response.url)
+        host = url.hostname or ""
+        return (
+            response.request.method == method
+            and (host == "sokratic.ru" or host.endswith(".sokratic.ru"))
+            and path.search(url.path) is not None
+            and response.status < 400
+        )
+
+    return _matches
+
+
+# Shown instead of the page asked for once the session is logged out.
+_LOGIN_FORM_SELECTOR = "form:has(input#email):has(input#password)"
+_AUTH_MODAL_PARAM = "auth-modal-open"
+
+# Top-level style cards of the design gallery, per creation form variant.
+_STYLE_CARD_XPATHS = {
+    "legacy": (
+        "//div[@role='dialog']//div["
+        "contains(@class, 'group/item') and contains(@class, 'cursor-pointer')"
+        " and not(ancestor::div[contains(@class, 'group/item')])"
+        "]"
+    ),
+    "redesign": (
+        "//form//div["
+        "contains(@class, 'group/item') and contains(@class, 'cursor-pointer')"
+        " and not(ancestor::div[contains(@class, 'group/item')])"
+        "]"
+    ),
+}
+
+# A cached style catalog is re-probed after this long even if the card count matches.
+_STYLE_CATALOG_TTL_S = 3600
+
+# Request counters are kept for at most this many generations; an order that
+# is never harvested drops out once newer generations push it out.
+_MAX_TRACKED_GENERATIONS = 1024
+# Log sinks of orders waiting between submission and harvest; fewer, since a
+# sink on non-appendable storage holds its whole log in memory.
+_MAX_OPEN_LOG_SINKS = 256
+# Screenshot rings (ring mode) of orders waiting between submission and
+# harvest; fewer still, since each holds up to a ring of JPEGs.
+_MAX_OPEN_SCREENSHOT_RINGS = 64
+
+_PRESENTATION_BUTTON_XPATH = (
+    "//button[normalize-space(.)='Презентация']"
+    "[not(contains(@class,'text-transparent'))]"
+)
+
 
 @dataclasses.dataclass
 class _GenCtx:
     """Per-generation context. Holds all state that differs between concurrent generations."""
     page: Page
     generation_dir: str
-    log_lines: list[str] = dataclasses.field(default_factory=list)
+    log_sink: GenerationLogSink | None = None
+    generation_id: str = ""
+
+
+@dataclasses.dataclass
+class _StyleCatalog:
+    """Style cards of one form variant as probed from the design gallery."""
+    count: int
+    visible_indices: list[int]
+    cards: list[dict]
+    probed_at: float
+
+
+# "fast": fill form fields through one page evaluation (native value setter +
+# input/change events); "humanized": type and select through Playwright.
+FORM_FILL_MODES = ("fast", "humanized")
+
+
+@dataclasses.dataclass(frozen=True)
+class _FormField:
+    name: str
+    xpath: str
+    value: str
+    select: bool = False
+
+
+# "all": every screenshot as PNG; "ring": stage shots as JPEG, debug shots kept
+# in a bounded in-memory ring and written only on failure / sampled success;
+# "off": none.
+SCREENSHOT_MODES = ("all", "ring", "off")
+
+# Export format label in the "Скачать" menu -> file extensions it downloads as.
+_FORMAT_EXTENSIONS = {
+    "PowerPoint": (".pptx", ".ppt"),
+    "PDF": (".pdf",),
+}
+
+
+class _DownloadRouter:
+    """Hand browser downloads of one page to the export waiting for that format.
+
+    Needed when several exports run at once on the same page: each waiter is
+    matched by file extension; a download nobody claims by extension goes to
+    the only pending waiter, if there is exactly one.
+    """
+
+    def __init__(self, page: Page, logger: logging.LoggerAdapter) -> None:
+        self._page = page
+        self._logger = logger
+        self._waiters: list[tuple[tuple[str, ...], asyncio.Future]] = []
+        page.on("download", self._on_download)
+
+    def expect(self, doc_format: str) -> "asyncio.Future[Download]":
+        future: asyncio.Future[Download] = asyncio.get_running_loop().create_future()
+        self._waiters.append((_FORMAT_EXTENSIONS.get(doc_format, ()), future))
+        return future
+
+    def discard(self, future: asyncio.Future) -> None:
+        self._waiters = [(exts, f) for exts, f in self._waiters if f is not future]
+
+    def close(self) -> None:
+        self._page.remove_listener("download", self._on_download)
+        for _, future in self._waiters:
+            future.cancel()
+        self._waiters = []
+
+    def _on_download(self, download: Download) -> None:
+        ext = os.path.splitext(download.suggested_filename)[1].lower()
+        pending = [(exts, f) for exts, f in self._waiters if not f.done()]
+        match = next((f for exts, f in pending if ext in exts), None)
+        if match is None and len(pending) == 1:
+            match = pending[0][1]
+        if match is None:
+            self._logger.warning("Unclaimed download %s", download.suggested_filename)
+            return
+        self.discard(match)
+        match.set_result(download)
 
 
 class GenerationLoggerAdapter(logging.LoggerAdapter):
@@ -58,11 +218,39 @@ class GenerationLoggerAdapter(logging.LoggerAdapter):
             return f"[generation_id={self._generation_id}] {msg}", kwargs
         return msg, kwargs
 
+def _order_id_from_url(url: str) -> str | None:
+    """``https://sokratic.ru/ru/orders/<id>[/...]`` -> ``<id>``."""
+    path = urlparse(url).path
+    if not path.startswith(ORDER_PATH_PREFIX):
+        return None
+    order_id = path[len(ORDER_PATH_PREFIX):].split("/", 1)[0]
+    return order_id or None
+
+
 class SokraticSource(PresentationSource):
     browser: Browser | None
     context: BrowserContext | None
     page: Page | None
 
+    # Export URL templates (``{order_id}`` placeholder) learned from UI
+    # downloads, shared by every source in the process.
+    _learned_export_urls: dict[str, str] = {}
+    # Style catalog per form variant, shared by every source in the process.
+    _style_catalogs: dict[str, _StyleCatalog] = {}
+    # Request counters per generation (every phase and tab adds to them) and
+    # for the whole process, including warm and monitor tabs.
+    _request_stats: collections.OrderedDict[str, RequestStats] = collections.OrderedDict()
+    _network_totals = RequestStats()
+    _tab_generations: "weakref.WeakKeyDictionary[Page, str]" = weakref.WeakKeyDictionary()
+    # One log sink per generation, kept from order submission to the end of
+    # the harvest so the size cap and the stored object cover both phases.
+    _log_sinks: collections.OrderedDict[str, GenerationLogSink] = collections.OrderedDict()
+    # Diagnostic screenshot ring per generation, kept across phases like the
+    # log sinks, so a failed harvest still writes what submission captured.
+    _screenshot_rings: collections.OrderedDict[str, collections.deque[tuple[str, bytes]]] = (
+        collections.OrderedDict()
+    )
+
     def __init__(
         self,
         playwright: Playwright,
@@ -75,6 +263,18 @@ class SokraticSource(PresentationSource):
         save_logs: bool = False,
         site_throttle_delay_ms: float = 5000,
         storage: FileStorage | None = None,
+        asset_cache: AssetCache | None = None,
+        direct_export: bool = True,
+        export_url_templates: dict[str, str] | None = None,
+        screenshot_mode: str | None = None,
+        screenshot_ring_size: int = 20,
+        screenshot_quality: int = 60,
+        screenshot_sample_percent: float = 0,
+        max_log_bytes: int = DEFAULT_MAX_LOG_BYTES,
+        form_fill_mode: str = "fast",
+        site_governor: SiteGovernor | None = None,
+        request_policy: RequestPolicy | None = None,
+        render_profile: RenderProfile | None = None,
     ) -> None:
         self.chrome = playwright.chromium
         self.browser = None
@@ -88,117 +288,194 @@ class SokraticSource(PresentationSource):
         self.logger = GenerationLoggerAdapter(logger)
         self.generation_timeout = generation_timeout
         self.playwright_default_timeout = playwright_default_timeout
-        self.save_screenshots = save_screenshots
+        self.screenshot_mode = screenshot_mode or ("all" if save_screenshots else "off")
+        if self.screenshot_mode not in SCREENSHOT_MODES:
+            raise ValueError(f"Unknown screenshot mode: {self.screenshot_mode!r}")
+        self.save_screenshots = self.screenshot_mode != "off"
+        self.screenshot_quality = screenshot_quality
+        self.screenshot_sample_percent = screenshot_sample_percent
+        self._screenshot_ring_size = screenshot_ring_size
         self.save_logs = save_logs
         self.site_throttle_delay_ms = site_throttle_delay_ms
         self.storage = storage or LocalFileStorage()
+        self.asset_cache = asset_cache
+        self.direct_export = direct_export
+        self.export_url_templates = dict(export_url_templates or {})
+        self.max_log_bytes = max_log_bytes
+        if form_fill_mode not in FORM_FILL_MODES:
+            raise ValueError(f"Unknown form fill mode: {form_fill_mode!r}")
+        self.form_fill_mode = form_fill_mode
+        self.site_governor = site_governor or SiteGovernor()
+        self.request_policy = request_policy or RequestPolicy()
+        self.render_profile = render_profile or RENDER_PROFILES["standard"]
 
     async def _ensure_generation_dir(self, generation_id: str) -> str:
         generation_dir = self.storage.build_path(self.generation_dir, generation_id)
         await self.storage.makedirs(generation_dir)
         return generation_dir
 
+    async def _capture_screenshot(self, ctx: _GenCtx, label: str) -> tuple[bytes, str] | None:
+        """PNG in ``all`` mode, compressed JPEG in ``ring`` mode; None on timeout."""
+        try:
+            if self.screenshot_mode == "ring":
+                return await ctx.page.screenshot(type="jpeg", quality=self.screenshot_quality), ".jpg"
+            return await ctx.page.screenshot(), ".png"
+        except PlaywrightTimeoutError:
+            logging.warning("Screenshot timed out (%s), skipping", label)
+            return None
+
     async def _save_generation_screenshot(
         self, ctx: _GenCtx, step_index: int, stage: str
     ) -> str | None:
+        """Stage screenshot reported to the UI; written in every mode except ``off``."""
         await self._flush_browser_logs(ctx)
         if not self.save_screenshots:
             return None
-        filename = f"{step_index + 1:02d}_{stage}.png"
-        key = self.storage.build_path(ctx.generation_dir, filename)
-        try:
-            data = await ctx.page.screenshot()
-        except PlaywrightTimeoutError:
-            logging.warning("Screenshot timed out for step %d (%s), skipping", step_index + 1, stage)
+        captured = await self._capture_screenshot(ctx, stage)
+        if captured is None:
             return None
+        data, ext = captured
+        key = self.storage.build_path(ctx.generation_dir, f"{step_index + 1:02d}_{stage}{ext}")
         return await self.storage.save_bytes(key, data)
 
+    async def _save_diagnostic_screenshot(
+        self, ctx: _GenCtx, label: str, step_index: int = 0
+    ) -> str | None:
+        """Debug screenshot from retry paths.
+
+        Written immediately in ``all`` mode. In ``ring`` mode it only goes to
+        the generation's in-memory ring of the last N shots, which
+        :meth:`_flush_screenshot_ring` writes out on failure or for a sampled
+        share of successes.
+        """
+        if self.screenshot_mode != "ring":
+            return await self._save_generation_screenshot(ctx, step_index, label)
+        await self._flush_browser_logs(ctx)
+        captured = await self._capture_screenshot(ctx, label)
+        if captured is None:
+            return None
+        self._screenshot_ring_for(ctx.generation_id).append((label, captured[0]))
+        return None
+
+    def _screenshot_ring_for(self, generation_id: str) -> collections.deque[tuple[str, bytes]]:
+        """The generation's screenshot ring, shared by every tab and phase in the process."""
+        ring = self._screenshot_rings.get(generation_id)
+        if ring is None:
+            ring = self._screenshot_rings[generation_id] = collections.deque(
+                maxlen=self._screenshot_ring_size
+            )
+            # Rings of orders that are never harvested here are lost; they
+            # only ever hold debug shots.
+            while len(self._screenshot_rings) > _MAX_OPEN_SCREENSHOT_RINGS:
+                self._screenshot_rings.popitem(last=False)
+        return ring
+
+    async def _flush_screenshot_ring(self, ctx: _GenCtx, reason: str) -> list[str]:
+        """Write the generation's buffered diagnostic screenshots to storage."""
+        return await self._write_screenshot_ring(ctx.generation_id, ctx.generation_dir, reason)
+
+    async def _write_screenshot_ring(
+        self, generation_id: str, generation_dir: str, reason: str
+    ) -> list[str]:
+        ring = self._screenshot_rings.pop(generation_id, None)
+        if not ring:
+            return []
+        paths = []
+        for index, (label, data) in enumerate(ring, start=1):
+            key = self.storage.build_path(generation_dir, f"ring_{reason}_{index:02d}_{label}.jpg")
+            try:
+                paths.append(await self.storage.save_bytes(key, data))
+            except Exception as exc:  # pylint: disable=broad-except
+                self.logger.warning("Failed to write ring screenshot %s: %s", label, exc)
+        self.logger.info("Wrote %d ring screenshot(s) (%s)", len(paths), reason)
+        return paths
+
+    async def _finish_screenshot_ring(self, ctx: _GenCtx) -> None:
+        """Successful generation: keep the ring only for a sampled share of decks."""
+        if self.screenshot_sample_percent > 0 and random.random() * 100 < self.screenshot_sample_percent:
+            await self._flush_screenshot_ring(ctx, reason="sampled")
+        else:
+            self._screenshot_rings.pop(ctx.generation_id, None)
+
     def _append_browser_log(self, ctx: _GenCtx, level: str, message: str) -> None:
-        if not self.save_logs:
+        if ctx.log_sink is None:
             return
         timestamp = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
         for line in message.splitlines() or [""]:
-            ctx.log_lines.append(f"{timestamp} [{level}] {line}")
+            ctx.log_sink.write(f"{timestamp} [{level}] {line}")
 
     async def _log_download_diag(self, ctx: _GenCtx, message: str, *, flush: bool = False) -> None:
         self._append_browser_log(ctx, "download-diag", message)
         if flush:
             await self._flush_browser_logs(ctx)
 
+    async def _page_helper(self, page: Page, name: str, *args: Any) -> Any:
+        """Call ``name(*args)`` from the page-side helper library and await its result.
+
+        Pages whose document was loaded before the init script was registered
+        get the library injected on first use.
+        """
+        call = f"""async ([name, args]) => {{
+            const helpers = window.{PAGE_HELPERS_GLOBAL};
+            if (!helpers) return {{ installed: false }};
+            return {{ installed: true, value: await helpers[name](...args) }};
+        }}"""
+        result = await page.evaluate(call, [name, list(args)])
+        if not result["installed"]:
+            await ensure_page_helpers(page)
+            result = await page.evaluate(call, [name, list(args)])
+        return result.get("value")
+
     async def _log_preloader_state(self, ctx: _GenCtx, label: str) -> None:
         try:
-            state = await ctx.page.evaluate(
-                """() => {
-                    const selectors = [
-                        '[aria-busy="true"]',
-                        '[class*="preloader"]',
-                        '[class*="loader"]',
-                        '[class*="loading"]',
-                        '[data-testid*="loader"]',
-                        'div[data-state="open"][aria-hidden="true"][data-aria-hidden="true"][class*="inset-0"]',
-                        '[class*="bg-black/80"]'
-                    ];
-                    const vw = window.innerWidth || document.documentElement.clientWidth;
-                    const vh = window.innerHeight || document.documentElement.clientHeight;
-                    const isVisible = (el) => {
-                        const style = window.getComputedStyle(el);
-                        if (style.display === 'none' || style.visibility === 'hidden') return false;
-                        if (parseFloat(style.opacity || '1') === 0) return false;
-                        const rect = el.getBoundingClientRect();
-                        return rect.width > 0 && rect.height > 0;
-                    };
-                    const out = [];
-                    const candidates = document.querySelectorAll(selectors.join(','));
-                    for (const el of candidates) {
-                        if (!isVisible(el)) continue;
-                        const style = window.getComputedStyle(el);
-                        const rect = el.getBoundingClientRect();
-                        const fullCover = rect.width >= vw * 0.8 && rect.height >= vh * 0.6;
-                        const fixedLike = style.position === 'fixed' || style.position === 'absolute';
-                        out.push({
-                            tag: el.tagName.toLowerCase(),
-                            id: el.id || '',
-                            className: (el.className || '').toString().slice(0, 200),
-                            width: Math.round(rect.width),
-                            height: Math.round(rect.height),
-                            position: style.position,
-                            zIndex: style.zIndex || '',
-                            fullCover,
-                            blocking: fullCover && fixedLike
-                        });
-                    }
-                    return {
-                        url: window.location.href,
-                        viewport: `${vw}x${vh}`,
-                        visibleCandidates: out.length,
-                        blockingCandidates: out.filter((x) => x.blocking).length,
-                        topCandidates: out.slice(0, 5),
-                    };
-                }"""
-            )
+            state = await self._page_helper(ctx.page, "preloaderState")
             self._append_browser_log(ctx, "preloader-state", f"{label}: {state}")
         except Exception as exc:  # pylint: disable=broad-except
             self._append_browser_log(ctx, "preloader-state", f"{label}: failed to evaluate ({exc})")
 
-    async def _flush_browser_logs(self, ctx: _GenCtx) -> str | None:
+    async def _flush_browser_logs(self, ctx: _GenCtx) -> None:
+        """Hand new log lines to the sink's background writer (never blocks on I/O)."""
+        if ctx.log_sink is not None:
+            ctx.log_sink.request_flush()
+
+    def _log_sink_for(self, generation_id: str, generation_dir: str) -> GenerationLogSink | None:
+        """The generation's log sink, shared by every tab and phase in the process."""
         if not self.save_logs:
             return None
-        log_key = self.storage.build_path(ctx.generation_dir, "log.txt")
-        content = "\n".join(ctx.log_lines)
-        if content:
-            content += "\n"
-        return await self.storage.save_text(log_key, content)
+        sink = self._log_sinks.get(generation_id)
+        if sink is None:
+            sink = self._log_sinks[generation_id] = GenerationLogSink(
+                self.storage,
+                self.storage.build_path(generation_dir, "log.txt"),
+                max_bytes=self.max_log_bytes,
+                logger=self.logger,
+            )
+            # Sinks of orders that are never harvested here were checkpointed
+            # when their submission ended; forgetting them loses no lines.
+            while len(self._log_sinks) > _MAX_OPEN_LOG_SINKS:
+                self._log_sinks.popitem(last=False)
+        return sink
+
+    async def _checkpoint_log_sink(self, generation_id: str) -> str | None:
+        """Store the generation's log so far and keep the sink for the next phase."""
+        sink = self._log_sinks.get(generation_id)
+        if sink is None:
+            return None
+        return await sink.checkpoint()
+
+    async def _close_log_sink(self, generation_id: str) -> str | None:
+        sink = self._log_sinks.pop(generation_id, None)
+        if sink is None:
+            return None
+        return await sink.close()
 
     async def init_async(self, headless: bool = False):
         if not self.is_init:
-            self.browser = await self.chrome.launch(
-                headless=headless,
-                args=["--no-sandbox", "--disable-dev-shm-usage"],
-            )
+            self.browser = await self.chrome.launch(**self.render_profile.launch_options(headless))
             self.is_init = True
             self.context = await self.browser.new_context(
+                **self.render_profile.context_options(),
                 accept_downloads=True,
-                viewport={"width": 1280, "height": 720},
                 locale="ru-RU",
                 timezone_id="Europe/Moscow",
                 user_agent=(
@@ -207,6 +484,8 @@ class SokraticSource(PresentationSource):
                     "Chrome/120.0.0.0 Safari/537.36"
                 ),
             )
+            await install_page_helpers(self.context)
+            await self.render_profile.install(self.context)
             self.page = await self.context.new_page()
             if self.playwright_default_timeout is not None:
                 self.page.set_default_timeout(self.playwright_default_timeout)
@@ -226,25 +505,171 @@ class SokraticSource(PresentationSource):
             await self.browser.close()
             self.is_init = False
 
-    async def _new_tab(self) -> Page:
+    async def new_tab(self) -> Page:
         """Open a new tab in the existing browser context with routing configured."""
         assert self.context is not None
         page = await self.context.new_page()
         if self.playwright_default_timeout is not None:
             page.set_default_timeout(self.playwright_default_timeout)
 
-        async def _block_heavy_resources(route: Route) -> None:
-            allowed_hosts = {"sokratic.ru", "storage.yandexcloud.net"}
-            host = urlparse(route.request.url).hostname or ""
-            is_allowed = host in allowed_hosts or host.endswith(".sokratic.ru")
-            if not is_allowed or route.request.resource_type in {"image", "media", "font"}:
+        # Requests the route aborted or answered from the asset cache; their
+        # requestfailed/requestfinished events must not count as traffic.
+        blocked: set[Request] = set()
+        cached: set[Request] = set()
+
+        async def _apply_request_policy(route: Route) -> None:
+            request = route.request
+            reason = self.request_policy.block_reason(request.url, request.resource_type)
+            if reason is not None:
+                blocked.add(request)
+                for stats in self._stats_for_tab(page):
+                    stats.record_blocked(reason)
                 await route.abort()
+            elif self.asset_cache is not None and await self.asset_cache.handle(route):
+                cached.add(request)
             else:
                 await route.continue_()
 
-        await page.route("**/*", _block_heavy_resources)
+        async def _on_request_finished(request: Request) -> None:
+            if request in cached:
+                cached.discard(request)
+                for stats in self._stats_for_tab(page):
+                    stats.cached += 1
+                return
+            try:
+                sizes = await request.sizes()
+                size = max(sizes["responseBodySize"], 0) + max(sizes["responseHeadersSize"], 0)
+            except PlaywrightError:
+                size = 0
+            for stats in self._stats_for_tab(page):
+                stats.allowed += 1
+                stats.allowed_bytes += size
+
+        def _on_request_failed(request: Request) -> None:
+            if request in blocked:
+                blocked.discard(request)
+                return
+            cached.discard(request)
+            for stats in self._stats_for_tab(page):
+                stats.failed += 1
+
+        page.on("requestfinished", _on_request_finished)
+        page.on("requestfailed", _on_request_failed)
+        await page.route("**/*", _apply_request_policy)
         return page
 
+    def _stats_for_tab(self, page: Page) -> list[RequestStats]:
+        """Counters a request of *page* adds to: the process totals and its generation's."""
+        generation_id = self._tab_generations.get(page)
+        if generation_id is None:
+            return [self._network_totals]
+        return [self._network_totals, self._generation_request_stats(generation_id)]
+
+    @classmethod
+    def _generation_request_stats(cls, generation_id: str) -> RequestStats:
+        stats = cls._request_stats.get(generation_id)
+        if stats is None:
+            stats = cls._request_stats[generation_id] = RequestStats()
+            while len(cls._request_stats) > _MAX_TRACKED_GENERATIONS:
+                cls._request_stats.popitem(last=False)
+        return stats
+
+    def _log_request_stats(self, ctx: _GenCtx) -> None:
+        stats = self._request_stats.get(ctx.generation_id)
+        if stats is not None:
+            self._append_browser_log(ctx, "network", str(stats.as_dict()))
+
+    @classmethod
+    def network_totals(cls) -> dict[str, Any]:
+        """Request counters of every tab opened in this process."""
+        return cls._network_totals.as_dict()
+
+    async def open_landing_tab(self) -> Page:
+        """Open a routed tab already navigated to the Sokratic landing page."""
+        page = await self.new_tab()
+        await page.goto(self.url)
+        return page
+
+    async def is_landing_ready(self, page: Page, timeout: int | None = None) -> bool:
+        """Return True if *page* still shows the landing page with the "Создать с AI" button."""
+        if page.is_closed() or not page.url.startswith(self.url):
+            return False
+        try:
+            await page.locator(_CREATE_WITH_AI_XPATH).first.wait_for(
+                state="visible", timeout=timeout
+            )
+        except PlaywrightTimeoutError:
+            return False
+        return True
+
+    async def is_logged_out(self, page: Page) -> bool:
+        """Return True if *page* was sent to the login modal instead of its content."""
+        if _AUTH_MODAL_PARAM in page.url:
+            return True
+        return await page.locator(_LOGIN_FORM_SELECTOR).first.is_visible()
+
+    async def _wait_unless_logged_out(self, page: Page, locator: Locator, timeout: float | None) -> None:
+        """Wait for *locator*, failing fast with AuthenticationError if the login form shows up."""
+        await locator.or_(page.locator(_LOGIN_FORM_SELECTOR)).first.wait_for(timeout=timeout)
+        if await self.is_logged_out(page):
+            raise AuthenticationError(f"Sokratic session is logged out ({page.url})")
+
+    def _open_generation_ctx(self, page: Page, generation_id: str, generation_dir: str) -> _GenCtx:
+        """Wrap *page* into a per-generation context with browser log listeners attached.
+
+        All tabs and phases of a generation write to one log sink; order
+        submission checkpoints it and the harvest closes it.
+        """
+        ctx = _GenCtx(
+            page=page,
+            generation_dir=generation_dir,
+            log_sink=self._log_sink_for(generation_id, generation_dir),
+            generation_id=generation_id,
+        )
+        self._tab_generations[page] = generation_id
+
+        page.on("console", lambda msg: self._append_browser_log(ctx, f"console:{msg.type}", msg.text))
+        page.on("pageerror", lambda exc: self._append_browser_log(ctx, "pageerror", str(exc)))
+        page.on("requestfailed", lambda req: self._append_browser_log(ctx, "requestfailed", f"{req.method} {req.url} - {req.failure}"))
+        return ctx
+
+    @staticmethod
+    def _generation_steps(formats: set[DownloadFormat]) -> list[str]:
+        return [
+            "start",
+            "form_saved",
+            "style_selected",
+            "generation_started",
+            "order_submitted",
+            *(["downloaded_powerpoint"] if DownloadFormat.POWERPOINT in formats else []),
+            *(["downloaded_pdf"] if DownloadFormat.PDF in formats else []),
+            *(["downloaded_text"] if DownloadFormat.TEXT in formats else []),
+            "done",
+        ]
+
+    @staticmethod
+    def _report_progress(
+        steps: list[str],
+        stage: str,
+        files: list[str] | None = None,
+        order_url: str | None = None,
+        step_index: int | None = None,
+    ) -> ProgressPayload:
+        if step_index is None:
+            step_index = steps.index(stage)
+        total_steps = len(steps)
+        payload: ProgressPayload = {
+            "stage": stage,
+            "step": step_index + 1,
+            "total_steps": total_steps,
+            "percent": int(((step_index + 1) / total_steps) * 100),
+        }
+        if files is not None:
+            payload["files"] = files
+        if order_url is not None:
+            payload["order_url"] = order_url
+        return payload
+
     async def generate_presentation(
         self,
         generation_id: str,
@@ -257,51 +682,81 @@ class SokraticSource(PresentationSource):
         style_id: str | None = None,
         formats_to_download: list[DownloadFormat] | None = None,
     ) -> AsyncIterator[ProgressPayload]:
+        """Submit an order and harvest it in one go (both phases back to back)."""
+        order_url: str | None = None
+        files: list[str] = []
+        async for update in self.submit_order(
+            generation_id=generation_id,
+            topic=topic,
+            language=language,
+            slides_amount=slides_amount,
+            grade=grade,
+            subject=subject,
+            author=author,
+            style_id=style_id,
+            formats_to_download=formats_to_download,
+        ):
+            files = list(update.get("files", files))
+            order_url = update.get("order_url", order_url)
+            yield update
+
+        if order_url is None:
+            raise RuntimeError("Order page URL was not recorded during submission")
+
+        async for update in self.harvest_order(
+            generation_id=generation_id,
+            order_url=order_url,
+            formats_to_download=formats_to_download,
+            files=files,
+        ):
+            yield update
+
+    async def submit_order(
+        self,
+        generation_id: str,
+        topic: str,
+        language: str,
+        slides_amount: int,
+        grade: str,
+        subject: str,
+        author: str | None = None,
+        style_id: str | None = None,
+        formats_to_download: list[DownloadFormat] | None = None,
+        page: Page | None = None,
+    ) -> AsyncIterator[ProgressPayload]:
+        """Order submission phase: fill the creation form and submit the order.
+
+        Closes its tab as soon as the order page is reached and the details
+        prompt is sent. The last update (``order_submitted``) carries the
+        ``order_url`` that :meth:`harvest_order` picks up later.
+
+        *page* may be a warm tab from :meth:`open_landing_tab`; otherwise a new
+        one is opened.
+        """
         self._check_init()
         self.logger.set_generation_id(generation_id)
         generation_dir = await self._ensure_generation_dir(generation_id)
-        self.logger.info("Start presentation generation")
-
-        tab = await self._new_tab()
-        await tab.goto(self.url)
-        self.logger.debug("Opened new tab for generation %s", generation_id)
-        ctx = _GenCtx(page=tab, generation_dir=generation_dir)
+        self.logger.info("Start order submission")
 
-        ctx.page.on("console", lambda msg: self._append_browser_log(ctx, f"console:{msg.type}", msg.text))
-        ctx.page.on("pageerror", lambda exc: self._append_browser_log(ctx, "pageerror", str(exc)))
-        ctx.page.on("requestfailed", lambda req: self._append_browser_log(ctx, "requestfailed", f"{req.method} {req.url} - {req.failure}"))
+        if page is not None and not page.is_closed():
+            tab = page
+            self.logger.debug("Using warm tab for generation %s", generation_id)
+        else:
+            tab = await self.open_landing_tab()
+            self.logger.debug("Opened new tab for generation %s", generation_id)
+        ctx = self._open_generation_ctx(tab, generation_id, generation_dir)
 
         await self._flush_browser_logs(ctx)
 
         _formats = (
             set(formats_to_download) if formats_to_download is not None else set(DownloadFormat)
         )
-
-        steps = [
-            "start",
-            "form_saved",
-            "style_selected",
-            "generation_started",
-            *(["downloaded_powerpoint"] if DownloadFormat.POWERPOINT in _formats else []),
-            *(["downloaded_pdf"] if DownloadFormat.PDF in _formats else []),
-            *(["downloaded_text"] if DownloadFormat.TEXT in _formats else []),
-            "done",
-        ]
-        total_steps = len(steps)
+        steps = self._generation_steps(_formats)
 
         def report_progress(
-            stage: str, files: list[str] | None = None
+            stage: str, files: list[str] | None = None, order_url: str | None = None
         ) -> ProgressPayload:
-            step_index = steps.index(stage)
-            payload: ProgressPayload = {
-                "stage": stage,
-                "step": step_index + 1,
-                "total_steps": total_steps,
-                "percent": int(((step_index + 1) / total_steps) * 100),
-            }
-            if files is not None:
-                payload["files"] = files
-            return payload
+            return self._report_progress(steps, stage, files=files, order_url=order_url)
 
         try:
             files: list[str] = []
@@ -312,263 +767,499 @@ class SokraticSource(PresentationSource):
                 files.append(path)
             yield report_progress("start", files=list(files))
 
-            self.logger.debug("Click 'Create with AI' on landing page")
-            await ctx.page.locator(
-                '//button[contains(normalize-space(), "Создать с AI")]'
-            ).click()
+            # From the landing-page click to the order page, the submission
+            # counts as one "submit" action of the site governor.
+            async with self.site_governor.permit("submit"):
+                self.logger.debug("Click 'Create with AI' on landing page")
+                await ctx.page.locator(_CREATE_WITH_AI_XPATH).click()
+
+                self.logger.debug("Wait for creation form")
+                await self._wait_unless_logged_out(
+                    ctx.page,
+                    ctx.page.locator('//textarea[@name="topic"]'),
+                    self.playwright_default_timeout,
+                )
 
-            self.logger.debug("Wait for creation form")
-            await ctx.page.locator('//textarea[@name="topic"]').wait_for(
-                timeout=self.playwright_default_timeout
-            )
+                settings_button = ctx.page.locator(
+                    "//form//button["
+                    "contains(normalize-space(), 'Настройки') "
+                    "or contains(normalize-space(), 'Дополнительные настройки') "
+                    "or .//span[normalize-space()='Настройки']"
+                    "]"
+                )
+                gallery_button = ctx.page.locator(
+                    '//button[contains(normalize-space(), "Смотреть все дизайны")]'
+                )
+                form_variant = (
+                    "legacy" if await gallery_button.count() else "redesign"
+                )
+                self.logger.debug("Detected form variant: %s", form_variant)
 
-            self.logger.debug("Fill topic")
-            await ctx.page.locator('//textarea[@name="topic"]').type(topic)
-            form_selects = ctx.page.locator("form select")
-            settings_button = ctx.page.locator(
-                "//form//button["
-                "contains(normalize-space(), 'Настройки') "
-                "or contains(normalize-space(), 'Дополнительные настройки') "
-                "or .//span[normalize-space()='Настройки']"
-                "]"
-            )
-            gallery_button = ctx.page.locator(
-                '//button[contains(normalize-space(), "Смотреть все дизайны")]'
-            )
-            form_variant = (
-                "legacy" if await gallery_button.count() else "redesign"
-            )
-            self.logger.debug("Detected form variant: %s", form_variant)
+                self.logger.debug(
+                    "Fill topic, slides amount (%s) and language (%s)", slides_amount, language
+                )
+                await self._fill_form(ctx, [
+                    _FormField("topic", '//textarea[@name="topic"]', topic),
+                    _FormField("slides_amount", "(//form//select)[1]", str(slides_amount), select=True),
+                    _FormField("language", "(//form//select)[2]", str(language), select=True),
+                ])
+
+                self.logger.debug("Open settings")
+                await settings_button.click()
+
+                self.logger.debug("Open audience selector")
+                await ctx.page.locator(
+                    '//button[contains(normalize-space(), "Выберите аудиторию")]'
+                ).click()
+
+                if grade not in GRADE_MAPPING:
+                    raise PresentationDataError(
+                        f"Invalid grade: {grade}. Must be one of: {list(GRADE_MAPPING.keys())}"
+                    )
 
-            self.logger.debug("Select slides amount: %s", slides_amount)
-            await form_selects.nth(0).select_option(str(slides_amount))
+                self.logger.debug("Select audience: %s", grade)
+                audience_option = GRADE_MAPPING[grade]
+                await ctx.page.locator(
+                    f'//div[@role="option" and normalize-space()="{audience_option}"]'
+                ).click()
 
-            self.logger.debug("Select language: %s", language)
-            await form_selects.nth(1).select_option(str(language))
+                self.logger.debug("Fill author")
+                await self._fill_form(ctx, [_FormField("author", '//input[@name="author"]', author or "")])
+                self.logger.debug("Save form")
+                await ctx.page.locator('//button[contains(normalize-space(), "Сохранить")]').click()
 
-            self.logger.debug("Open settings")
-            await settings_button.click()
+                if path := await self._save_generation_screenshot(
+                    ctx, steps.index("form_saved"), "form_saved"
+                ):
+                    files.append(path)
+                yield report_progress("form_saved", files=list(files))
+
+                if form_variant == "legacy":
+                    self.logger.debug("Open design gallery")
+                    await gallery_button.click()
+                styles_locator = ctx.page.locator(_STYLE_CARD_XPATHS[form_variant])
+
+                await styles_locator.first.wait_for(state="visible", timeout=self.playwright_default_timeout)
+                catalog = await self._style_catalog(ctx, form_variant, styles_locator)
+                final_style_id = self._pick_style(catalog, style_id)
+
+                self.logger.debug("Select style: %s", final_style_id)
+                target_style = styles_locator.nth(final_style_id)
+                await target_style.scroll_into_view_if_needed()
+                if form_variant == "legacy":
+                    await target_style.hover()
+                    await target_style.locator("button:has-text('Выбрать')").click()
+                else:
+                    await target_style.click()
 
-            self.logger.debug("Open audience selector")
-            await ctx.page.locator(
-                '//button[contains(normalize-space(), "Выберите аудиторию")]'
-            ).click()
+                if path := await self._save_generation_screenshot(
+                    ctx, steps.index("style_selected"), "style_selected"
+                ):
+                    files.append(path)
+                yield report_progress("style_selected", files=list(files))
 
-            if grade not in GRADE_MAPPING:
-                raise ValueError(
-                    f"Invalid grade: {grade}. Must be one of: {list(GRADE_MAPPING.keys())}"
-                )
+                self.logger.debug("Start generation")
+                await ctx.page.locator("form button[type='submit']:visible").click()
 
-            self.logger.debug("Select audience: %s", grade)
-            audience_option = GRADE_MAPPING[grade]
-            await ctx.page.locator(
-                f'//div[@role="option" and normalize-space()="{audience_option}"]'
-            ).click()
+                if path := await self._save_generation_screenshot(
+                    ctx, steps.index("generation_started"), "generation_started"
+                ):
+                    files.append(path)
+                yield report_progress("generation_started", files=list(files))
+
+                self.logger.debug("Wait for order page")
+                await ctx.page.wait_for_url(f"{self.url}{ORDER_PATH_PREFIX}*", timeout=self.generation_timeout)
+                order_url = ctx.page.url
+
+                self.logger.debug("Specifying details for generation")
+                details_prompt_filled = self.details_prompt.format(subject, grade)
+                await self._fill_form(ctx, [_FormField("details", "//form//textarea", details_prompt_filled)])
+                submit_button = ctx.page.locator('//form//button[@type="submit"]')
+                await expect(submit_button).to_be_enabled(timeout=self.playwright_default_timeout)
+                # Closing the tab right after the click can cancel the request
+                # before the site has the details.
+                if await self._wait_for_signal(
+                    ctx,
+                    "order_submitted",
+                    action=submit_button.click,
+                    response_predicate=_endpoint_response("POST", _ORDER_SUBMIT_PATH),
+                    locators=[(submit_button.first, "hidden")],
+                    timeout=self.site_throttle_delay_ms,
+                ) is None:
+                    self.logger.warning("Order submission not acknowledged: %s", order_url)
 
-            self.logger.debug("Fill author")
-            await ctx.page.locator('//input[@name="author"]').type(author or "")
-            self.logger.debug("Save form")
-            await ctx.page.locator('//button[contains(normalize-space(), "Сохранить")]').click()
+                if path := await self._save_generation_screenshot(
+                    ctx, steps.index("order_submitted"), "order_submitted"
+                ):
+                    files.append(path)
+                self.logger.info("Order submitted: %s", order_url)
+                yield report_progress("order_submitted", files=list(files), order_url=order_url)
+            await self._flush_browser_logs(ctx)
+        except Exception:
+            await self._flush_screenshot_ring(ctx, reason="failed")
+            self._log_request_stats(ctx)
+            self._request_stats.pop(generation_id, None)
+            raise
+        finally:
+            await tab.close()
+            self._log_request_stats(ctx)
+            await self._checkpoint_log_sink(generation_id)
+            self.logger.debug("Closed submission tab for generation %s", generation_id)
 
-            if path := await self._save_generation_screenshot(
-                ctx, steps.index("form_saved"), "form_saved"
-            ):
-                files.append(path)
-            yield report_progress("form_saved", files=list(files))
-
-            if form_variant == "legacy":
-                self.logger.debug("Open design gallery")
-                await gallery_button.click()
-                styles_locator = ctx.page.locator(
-                    "//div[@role='dialog']//div["
-                    "contains(@class, 'group/item') and contains(@class, 'cursor-pointer')"
-                    " and not(ancestor::div[contains(@class, 'group/item')])"
-                    "]"
-                )
-            else:
-                styles_locator = ctx.page.locator(
-                    "//form//div["
-                    "contains(@class, 'group/item') and contains(@class, 'cursor-pointer')"
-                    " and not(ancestor::div[contains(@class, 'group/item')])"
-                    "]"
-                )
+    async def abandon_order(self, generation_id: str, reason: str = "failed") -> None:
+        """Wrap up a submitted order that will not be harvested (e.g. it timed out).
 
-            await styles_locator.first.wait_for(state="visible", timeout=self.playwright_default_timeout)
-            styles_count = await styles_locator.count()
+        Writes the screenshots buffered for the generation and closes its
+        log sink; needs no browser.
+        """
+        generation_dir = await self._ensure_generation_dir(generation_id)
+        await self._write_screenshot_ring(generation_id, generation_dir, reason)
+        self._request_stats.pop(generation_id, None)
+        await self._close_log_sink(generation_id)
+
+    async def is_order_ready(self, page: Page, order_url: str, timeout: int | None = None) -> bool:
+        """Probe *order_url* on *page* and report whether the presentation is ready.
+
+        Used by lightweight monitors that cycle one tab through many pending
+        orders; never raises on a "not ready yet" timeout.
+        """
+        if page.url == order_url:
+            await page.reload()
+        else:
+            await page.goto(order_url)
+        try:
+            await page.locator(_PRESENTATION_BUTTON_XPATH).wait_for(
+                timeout=timeout or self.playwright_default_timeout
+            )
+        except PlaywrightTimeoutError:
+            return False
+        return True
 
-            visible_indices: list[int] = []
-            for _i in range(styles_count):
-                _box = await styles_locator.nth(_i).bounding_box()
-                if _box is not None and _box.get("width", 0) > 0:
-                    visible_indices.append(_i)
+    async def harvest_order(
+        self,
+        generation_id: str,
+        order_url: str,
+        formats_to_download: list[DownloadFormat] | None = None,
+        files: list[str] | None = None,
+    ) -> AsyncIterator[ProgressPayload]:
+        """Harvest phase: open *order_url* once it is ready and download the formats.
 
-            if not visible_indices:
-                raise RuntimeError("No visible styles found in design gallery")
+        *files* carries the paths reported by the submission phase so the final
+        ``done`` update lists everything produced for the generation.
+        """
+        self._check_init()
+        self.logger.set_generation_id(generation_id)
+        generation_dir = await self._ensure_generation_dir(generation_id)
+        self.logger.info("Start order harvest: %s", order_url)
 
-            self.logger.debug("Found %d visible styles", len(visible_indices))
+        tab = await self.new_tab()
+        await tab.goto(order_url)
+        self.logger.debug("Opened harvest tab for generation %s", generation_id)
+        ctx = self._open_generation_ctx(tab, generation_id, generation_dir)
 
-            if style_id is None:
-                final_style_id = random.choice(visible_indices)
-            else:
-                try:
-                    final_style_id = int(style_id)
-                except (TypeError, ValueError) as exc:
-                    raise ValueError("style_id must be a numeric index") from exc
+        _formats = (
+            set(formats_to_download) if formats_to_download is not None else set(DownloadFormat)
+        )
+        steps = self._generation_steps(_formats)
 
-                if final_style_id < 0 or final_style_id >= styles_count:
-                    raise ValueError(
-                        f"style_id index out of range: {final_style_id} (styles_count={styles_count})"
-                    )
+        def report_progress(
+            stage: str, files: list[str] | None = None, step_index: int | None = None
+        ) -> ProgressPayload:
+            return self._report_progress(steps, stage, files=files, step_index=step_index)
 
-            self.logger.debug("Select style: %s", final_style_id)
-            target_style = styles_locator.nth(int(final_style_id))
-            await target_style.scroll_into_view_if_needed()
-            if form_variant == "legacy":
-                await target_style.hover()
-                await target_style.locator("button:has-text('Выбрать')").click()
-            else:
-                await target_style.click()
+        downloads = _DownloadRouter(tab, self.logger)
+        ui_lock = asyncio.Lock()
+        exports: list[asyncio.Task[tuple[str, list[str]]]] = []
+        try:
+            files = list(files or [])
 
-            if path := await self._save_generation_screenshot(
-                ctx, steps.index("style_selected"), "style_selected"
-            ):
-                files.append(path)
-            yield report_progress("style_selected", files=list(files))
+            self.logger.debug("Wait for presentation download button")
+            await self._wait_unless_logged_out(
+                ctx.page, ctx.page.locator(_PRESENTATION_BUTTON_XPATH), self.generation_timeout
+            )
 
-            self.logger.debug("Start generation")
-            await ctx.page.locator("form button[type='submit']:visible").click()
+            self.logger.debug("Open presentation download menu")
+            await ctx.page.locator(_PRESENTATION_BUTTON_XPATH).click()
+
+            # All formats are exported at once from this tab: menu clicks and
+            # the speech text view take turns on the UI lock, and downloads
+            # are collected as they arrive. Progress advances by the number of
+            # finished formats, so it never goes backwards.
+            for doc_format, download_format in (
+                ("PowerPoint", DownloadFormat.POWERPOINT),
+                ("PDF", DownloadFormat.PDF),
+            ):
+                if download_format in _formats:
+                    exports.append(asyncio.create_task(self._harvest_file(
+                        ctx, steps, doc_format, generation_id, order_url, downloads, ui_lock
+                    )))
+            if DownloadFormat.TEXT in _formats:
+                exports.append(asyncio.create_task(self._harvest_text(
+                    ctx, steps, generation_id, ui_lock
+                )))
+
+            first_download_index = steps.index("order_submitted") + 1
+            for completed, export in enumerate(asyncio.as_completed(exports)):
+                stage, produced = await export
+                files.extend(produced)
+                yield report_progress(
+                    stage, files=list(files), step_index=first_download_index + completed
+                )
 
             if path := await self._save_generation_screenshot(
-                ctx, steps.index("generation_started"), "generation_started"
+                ctx, steps.index("done"), "done"
             ):
                 files.append(path)
-            yield report_progress("generation_started", files=list(files))
-
-            self.logger.debug("Wait for order page")
-            await ctx.page.wait_for_url(f"{self.url}/ru/orders/*", timeout=self.generation_timeout)
-
-            self.logger.debug("Specifying details for generation")
-            details_prompt_filled = self.details_prompt.format(subject, grade)
-            await ctx.page.locator('//form//textarea').type(details_prompt_filled)
-            submit_button = ctx.page.locator('//form//button[@type="submit"]')
-            await expect(submit_button).to_be_enabled(timeout=self.playwright_default_timeout)
-            await submit_button.click()
-
-            pres_button = (
-                "//button[normalize-space(.)='Презентация']"
-                "[not(contains(@class,'text-transparent'))]"
+            done = report_progress("done", files=list(files))
+            done["network"] = self._generation_request_stats(generation_id).as_dict()
+            yield done
+            await self._finish_screenshot_ring(ctx)
+            self.logger.info("Presentation generation completed successfully")
+        except Exception:
+            await self._flush_screenshot_ring(ctx, reason="failed")
+            raise
+        finally:
+            for export in exports:
+                export.cancel()
+            await asyncio.gather(*exports, return_exceptions=True)
+            downloads.close()
+            await tab.close()
+            self._log_request_stats(ctx)
+            self._request_stats.pop(generation_id, None)
+            await self._close_log_sink(generation_id)
+            self.logger.debug("Closed harvest tab for generation %s", generation_id)
+
+    async def _fill_form(self, ctx: _GenCtx, fields: Sequence[_FormField]) -> dict[str, float]:
+        """Fill *fields* in ``form_fill_mode`` and return the milliseconds spent per field.
+
+        Fast mode sets all fields in one page evaluation; a field whose value
+        did not stick (missing element, unknown select option) is typed as in
+        humanized mode.
+        """
+        timings: dict[str, float] = {}
+        if self.form_fill_mode == "fast":
+            results = await self._page_helper(
+                ctx.page, "fillFields", [dataclasses.asdict(field) for field in fields]
             )
-
-            self.logger.debug("Wait for presentation download button")
-            await ctx.page.locator(pres_button).wait_for(timeout=self.generation_timeout)
-
-            self.logger.debug("Open presentation download menu")
-            await ctx.page.locator(pres_button).click()
-
-            if DownloadFormat.POWERPOINT in _formats:
-                self.logger.info("Download PowerPoint")
-                files.append(
-                    await self._download_presentation(
-                        ctx=ctx,
-                        doc_format="PowerPoint",
-                        file_stem=generation_id,
-                    )
+            by_name = {result["name"]: result for result in results}
+            for field in fields:
+                result = by_name[field.name]
+                if result["applied"]:
+                    timings[field.name] = result["ms"]
+                    continue
+                self.logger.warning(
+                    "Fast fill did not apply %s (found=%s), typing it instead",
+                    field.name,
+                    result["found"],
                 )
-                if path := await self._save_generation_screenshot(
-                    ctx, steps.index("downloaded_powerpoint"), "downloaded_powerpoint"
-                ):
-                    files.append(path)
-                yield report_progress("downloaded_powerpoint", files=list(files))
-
-            if DownloadFormat.PDF in _formats:
-                self.logger.info("Download PDF")
-                files.append(
-                    await self._download_presentation(
-                        ctx=ctx,
-                        doc_format="PDF",
-                        file_stem=generation_id,
-                    )
+                timings[field.name] = await self._type_form_field(ctx, field)
+        else:
+            for field in fields:
+                timings[field.name] = await self._type_form_field(ctx, field)
+
+        self.logger.debug(
+            "Filled form fields (%s): %s",
+            self.form_fill_mode,
+            ", ".join(f"{name}={ms:.0f}ms" for name, ms in timings.items()),
+        )
+        return timings
+
+    async def _type_form_field(self, ctx: _GenCtx, field: _FormField) -> float:
+        started = time.monotonic()
+        locator = ctx.page.locator(field.xpath).first
+        if field.select:
+            await locator.select_option(field.value)
+        else:
+            await locator.type(field.value)
+        return (time.monotonic() - started) * 1000
+
+    async def _style_catalog(
+        self, ctx: _GenCtx, form_variant: str, styles_locator: Locator
+    ) -> _StyleCatalog:
+        """Style cards of *form_variant*, probed in one page evaluation and cached.
+
+        The cached catalog is reused while the gallery shows the same number of
+        cards and it is younger than ``_STYLE_CATALOG_TTL_S``.
+        """
+        count = await styles_locator.count()
+        cached = self._style_catalogs.get(form_variant)
+        if (
+            cached is not None
+            and cached.count == count
+            and time.monotonic() - cached.probed_at < _STYLE_CATALOG_TTL_S
+        ):
+            self.logger.debug("Using cached %s style catalog (%d styles)", form_variant, count)
+            return cached
+
+        cards = await self._page_helper(ctx.page, "styleCards", _STYLE_CARD_XPATHS[form_variant])
+        catalog = _StyleCatalog(
+            count=len(cards),
+            visible_indices=[card["index"] for card in cards if card["visible"]],
+            cards=cards,
+            probed_at=time.monotonic(),
+        )
+        if not catalog.visible_indices:
+            raise RuntimeError("No visible styles found in design gallery")
+        self.logger.debug(
+            "Probed %s style catalog: %d visible of %d styles",
+            form_variant,
+            len(catalog.visible_indices),
+            catalog.count,
+        )
+        SokraticSource._style_catalogs[form_variant] = catalog
+        return catalog
+
+    @staticmethod
+    def _pick_style(catalog: _StyleCatalog, style_id: str | None) -> int:
+        """Validate the requested style index, or pick a visible style uniformly at random."""
+        if style_id is None:
+            return random.choice(catalog.visible_indices)
+        try:
+            index = int(style_id)
+        except (TypeError, ValueError) as exc:
+            raise PresentationDataError("style_id must be a numeric index") from exc
+        if index < 0 or index >= catalog.count:
+            raise PresentationDataError(f"style_id index out of range: {index} (styles_count={catalog.count})")
+        return index
+
+    async def _harvest_file(
+        self,
+        ctx: _GenCtx,
+        steps: list[str],
+        doc_format: str,
+        file_stem: str,
+        order_url: str,
+        downloads: _DownloadRouter,
+        ui_lock: asyncio.Lock,
+    ) -> tuple[str, list[str]]:
+        """Export one presentation format: direct fetch first, the UI menu as fallback."""
+        stage = f"downloaded_{doc_format.lower()}"
+        async with self.site_governor.permit("download"):
+            self.logger.info("Download %s", doc_format)
+            path = await self._download_direct(ctx, doc_format, file_stem, order_url)
+            if path is None:
+                path = await self._download_presentation(
+                    ctx=ctx,
+                    doc_format=doc_format,
+                    file_stem=file_stem,
+                    downloads=downloads,
+                    ui_lock=ui_lock,
                 )
-                if path := await self._save_generation_screenshot(
-                    ctx, steps.index("downloaded_pdf"), "downloaded_pdf"
-                ):
-                    files.append(path)
-                yield report_progress("downloaded_pdf", files=list(files))
+        produced = [path]
+        if path := await self._save_generation_screenshot(ctx, steps.index(stage), stage):
+            produced.append(path)
+        return stage, produced
 
-            if DownloadFormat.TEXT in _formats:
-                files.append(await self._download_text(ctx=ctx, file_stem=generation_id))
+    async def _harvest_text(
+        self,
+        ctx: _GenCtx,
+        steps: list[str],
+        generation_id: str,
+        ui_lock: asyncio.Lock,
+    ) -> tuple[str, list[str]]:
+        """Generate and save the speech text on the harvest tab.
+
+        The text view replaces the presentation view, so the export holds the
+        UI lock until the presentation is shown again.
+        """
+        async with self.site_governor.permit("download"):
+            async with ui_lock:
+                produced = [await self._download_text(ctx=ctx, file_stem=generation_id)]
                 if path := await self._save_generation_screenshot(
                     ctx, steps.index("downloaded_text"), "downloaded_text"
                 ):
-                    files.append(path)
-                yield report_progress("downloaded_text", files=list(files))
+                    produced.append(path)
+                await ctx.page.locator(_PRESENTATION_BUTTON_XPATH).click()
+        return "downloaded_text", produced
 
-            if path := await self._save_generation_screenshot(
-                ctx, steps.index("done"), "done"
-            ):
-                files.append(path)
-            yield report_progress("done", files=list(files))
-            await self._flush_browser_logs(ctx)
-            self.logger.info("Presentation generation completed successfully")
+    async def list_order_history(self, limit: int = 200) -> list[dict[str, str]]:
+        """Orders on the account's history page as ``{"url", "title"}`` dicts, newest first."""
+        self._check_init()
+        tab = await self.new_tab()
+        try:
+            await tab.goto(f"{self.url}{ORDER_PATH_PREFIX}")
+            await tab.locator(f'a[href*="{ORDER_PATH_PREFIX}"]').first.wait_for(
+                timeout=self.playwright_default_timeout
+            )
+            return await self._page_helper(tab, "orderLinks", ORDER_PATH_PREFIX, limit)
+        finally:
+            await tab.close()
+
+    async def has_session(self) -> bool:
+        """Return False if the account's history page asks to log in instead."""
+        self._check_init()
+        tab = await self.new_tab()
+        try:
+            await tab.goto(f"{self.url}{ORDER_PATH_PREFIX}")
+            try:
+                await self._wait_unless_logged_out(
+                    tab, tab.locator(f'a[href*="{ORDER_PATH_PREFIX}"]'), self.playwright_default_timeout
+                )
+            except AuthenticationError:
+                return False
+            except PlaywrightTimeoutError:
+                # An account without orders lists no links; only the login form counts.
+                return not await self.is_logged_out(tab)
+            return True
         finally:
             await tab.close()
-            self.logger.debug("Closed tab for generation %s", generation_id)
 
     async def authenticate(self, login: str, password: str, generation_id: str) -> None:
         self._check_init()
         assert self.page is not None
         self.logger.set_generation_id(generation_id)
         generation_dir = await self._ensure_generation_dir(generation_id)
-        auth_ctx = _GenCtx(page=self.page, generation_dir=generation_dir)
+        auth_ctx = _GenCtx(page=self.page, generation_dir=generation_dir, generation_id=generation_id)
 
-        self.logger.info("Open auth modal")
+        try:
+            self.logger.info("Open auth modal")
 
-        await self.page.goto(url=f"{self.url}/ru?auth-modal-open=true")
+            await self.page.goto(url=f"{self.url}/ru?auth-modal-open=true")
 
-        await self.page.locator("//div[@role='dialog']").wait_for(timeout=self.playwright_default_timeout)
+            await self.page.locator("//div[@role='dialog']").wait_for(timeout=self.playwright_default_timeout)
 
-        # save screenshot here
-        await self._save_generation_screenshot(
-            auth_ctx, 0, "sokratic_auth_1"
-        )
+            # save screenshot here
+            await self._save_diagnostic_screenshot(auth_ctx, "sokratic_auth_1")
 
-        self.logger.debug("Locate email input")
-        email_input = await self.page.query_selector("input[id='email']")
+            self.logger.debug("Locate email input")
+            email_input = await self.page.query_selector("input[id='email']")
 
-        if email_input is None:
-            raise RuntimeError("Email input not found on Sokratic login page")
+            if email_input is None:
+                raise RuntimeError("Email input not found on Sokratic login page")
 
-        self.logger.debug("Type email")
-        await email_input.type(login)
+            self.logger.debug("Type email")
+            await email_input.type(login)
 
-        self.logger.debug("Locate password input")
-        password_input = await self.page.query_selector("input[id='password']")
+            self.logger.debug("Locate password input")
+            password_input = await self.page.query_selector("input[id='password']")
 
-        if password_input is None:
-            raise RuntimeError("Password input not found on Sokratic login page")
+            if password_input is None:
+                raise RuntimeError("Password input not found on Sokratic login page")
 
-        self.logger.debug("Type password")
-        await password_input.type(password)
+            self.logger.debug("Type password")
+            await password_input.type(password)
 
-        form = (
-            self.page.locator("form")
-            .filter(has=self.page.locator("input#email"))
-            .filter(has=self.page.locator("input#password"))
-        )
+            form = (
+                self.page.locator("form")
+                .filter(has=self.page.locator("input#email"))
+                .filter(has=self.page.locator("input#password"))
+            )
 
-        self.logger.debug("Submit auth form")
-        submit_button = form.locator("button[type='submit']")
-        await submit_button.first.click()
+            self.logger.debug("Submit auth form")
+            submit_button = form.locator("button[type='submit']")
+            await submit_button.first.click()
 
-        await self._save_generation_screenshot(
-            auth_ctx, 1, "sokratic_auth_2"
-        )
+            await self._save_diagnostic_screenshot(auth_ctx, "sokratic_auth_2", step_index=1)
 
-        self.logger.debug("Wait for auth success")
-        await self.page.wait_for_url(
-            f"{self.url}/ru?auth-success=true",
-            timeout=self.site_throttle_delay_ms,
-        )
+            self.logger.debug("Wait for auth success")
+            await self.page.wait_for_url(
+                f"{self.url}/ru?auth-success=true",
+                timeout=self.site_throttle_delay_ms,
+            )
+        except Exception:
+            await self._flush_screenshot_ring(auth_ctx, reason="failed")
+            raise
+        self._screenshot_rings.pop(generation_id, None)
 
         # await page.screenshot(path=os.path.join(generation_dir, "sokratic_auth_2.png"))
 
@@ -583,18 +1274,25 @@ class SokraticSource(PresentationSource):
             timeout=self.generation_timeout
         )
 
-        await page.locator("//button[normalize-space(.)='Сгенерировать текст']").click(
-            timeout=self.generation_timeout
-        )
+        markdown_content_path = "//div[contains(@class, 'markdown-body')]"
 
-        await page.wait_for_timeout(self.site_throttle_delay_ms)
+        # Sokratic answers the generate request once the speech text exists;
+        # the throttle delay only caps how long we wait for that signal.
+        await self._wait_for_signal(
+            ctx,
+            "speech_text",
+            action=lambda: page.locator("//button[normalize-space(.)='Сгенерировать текст']").click(
+                timeout=self.generation_timeout
+            ),
+            response_predicate=_endpoint_response("POST", _SPEECH_TEXT_PATH),
+            locators=[(page.locator(markdown_content_path).first, "visible")],
+            timeout=self.site_throttle_delay_ms,
+        )
 
         await page.locator("//button[normalize-space(.)='Текст выступления']").click(
             timeout=self.generation_timeout
         )
 
-        markdown_content_path = "//div[contains(@class, 'markdown-body')]"
-
         await page.locator(markdown_content_path).wait_for()
 
         text_content = await page.locator(markdown_content_path).inner_text()
@@ -605,6 +1303,67 @@ class SokraticSource(PresentationSource):
         key = self.storage.build_path(ctx.generation_dir, f"{file_stem}.txt")
         return await self.storage.save_text(key, text_content)
 
+    async def _wait_for_signal(
+        self,
+        ctx: _GenCtx,
+        label: str,
+        *,
+        action: Callable[[], Awaitable[object]] | None = None,
+        response_predicate: Callable[[Response], bool] | None = None,
+        locators: Sequence[tuple[Locator, str]] = (),
+        timeout: float | None = None,
+    ) -> str | None:
+        """Run *action* and return as soon as any readiness signal fires.
+
+        Signals are a network response matching *response_predicate* and
+        *locators* reaching their ``(locator, state)``. Listeners are armed
+        before *action* so fast responses are not missed. *timeout* (ms) is an
+        upper bound that replaces a fixed sleep: on expiry ``None`` is returned
+        and the caller carries on as if the old delay had elapsed.
+        """
+        page = ctx.page
+        waiters: dict[asyncio.Task, str] = {}
+        if response_predicate is not None:
+            waiters[asyncio.ensure_future(
+                page.wait_for_event("response", predicate=response_predicate, timeout=0)
+            )] = "response"
+        for index, (locator, state) in enumerate(locators):
+            waiters[asyncio.ensure_future(locator.wait_for(state=state, timeout=0))] = f"dom:{index}:{state}"
+        # Let the listeners subscribe before the action fires the request.
+        await asyncio.sleep(0)
+
+        started = time.monotonic()
+        signal: str | None = None
+        try:
+            if action is not None:
+                await action()
+            deadline = None if timeout is None else started + timeout / 1000
+            pending = set(waiters)
+            while pending and signal is None:
+                remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for task in done:
+                    if not task.cancelled() and task.exception() is None:
+                        signal = waiters[task]
+                        break
+        finally:
+            for task in waiters:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*waiters, return_exceptions=True)
+
+        elapsed_ms = int((time.monotonic() - started) * 1000)
+        if signal is None:
+            self.logger.debug("Wait %s: no signal after %dms, continuing", label, elapsed_ms)
+        else:
+            self.logger.debug("Wait %s: signal=%s after %dms", label, signal, elapsed_ms)
+        await self._log_download_diag(ctx, f"wait {label}: signal={signal} elapsed_ms={elapsed_ms}")
+        return signal
+
     async def _close_popup_if_visible(self, ctx: _GenCtx, popup_locator, timeout: int = 5000) -> bool:
         try:
             await popup_locator.wait_for(state="visible", timeout=1000)
@@ -631,63 +1390,39 @@ class SokraticSource(PresentationSource):
             btn_handle = await locator.element_handle(timeout=_timeout)
             if btn_handle is None:
                 return
-            await page.wait_for_function(
-                """(btn) => {
-                    const container = btn.querySelector('.loader-container');
-                    if (!container) return true;
-                    return window.getComputedStyle(container).opacity === '0';
-                }""",
-                arg=btn_handle,
-                timeout=_timeout,
-            )
+            await self._page_helper(page, "whenLoaderHidden", btn_handle, _timeout)
         except Exception:  # pylint: disable=broad-except
             pass  # non-critical – proceed with click attempt
 
     async def _wait_for_blocking_preloader_to_disappear(self, ctx: _GenCtx) -> None:
         await self._log_preloader_state(ctx, f"before_wait timeout={self.playwright_default_timeout}")
         try:
-            await ctx.page.wait_for_function(
-                """() => {
-                    const selectors = [
-                        '[aria-busy="true"]',
-                        '[class*="preloader"]',
-                        '[class*="loader"]',
-                        '[class*="loading"]',
-                        '[data-testid*="loader"]',
-                        'div[data-state="open"][aria-hidden="true"][data-aria-hidden="true"][class*="inset-0"]',
-                        '[class*="bg-black/80"]'
-                    ];
-                    const vw = window.innerWidth || document.documentElement.clientWidth;
-                    const vh = window.innerHeight || document.documentElement.clientHeight;
-                    const isVisible = (el) => {
-                        const style = window.getComputedStyle(el);
-                        if (style.display === 'none' || style.visibility === 'hidden') return false;
-                        if (parseFloat(style.opacity || '1') === 0) return false;
-                        const rect = el.getBoundingClientRect();
-                        return rect.width > 0 && rect.height > 0;
-                    };
-                    const isBlocking = (el) => {
-                        if (!isVisible(el)) return false;
-                        const style = window.getComputedStyle(el);
-                        const rect = el.getBoundingClientRect();
-                        const fullCover = rect.width >= vw * 0.8 && rect.height >= vh * 0.6;
-                        const fixedLike = style.position === 'fixed' || style.position === 'absolute';
-                        return fullCover && fixedLike;
-                    };
-                    const candidates = document.querySelectorAll(selectors.join(','));
-                    for (const el of candidates) {
-                        if (isBlocking(el)) return false;
-                    }
-                    return true;
-                }""",
-                timeout=self.playwright_default_timeout,
+            unblocked = await self._page_helper(
+                ctx.page, "whenUnblocked", self.playwright_default_timeout or 0
             )
+        except PlaywrightError as exc:
+            # A navigation destroys the page context together with the pending promise.
+            self.logger.warning("Preloader wait interrupted: %s", exc)
+            unblocked = False
+        if unblocked:
             await self._log_preloader_state(ctx, "after_wait success")
-        except PlaywrightTimeoutError:
+        else:
             self.logger.warning("Blocking preloader is still visible after %s ms", self.playwright_default_timeout)
             await self._log_preloader_state(ctx, "after_wait timeout")
 
-    async def _download_presentation(self, ctx: _GenCtx, doc_format: str, file_stem: str) -> str:
+    async def _download_presentation(
+        self,
+        ctx: _GenCtx,
+        doc_format: str,
+        file_stem: str,
+        downloads: "_DownloadRouter | None" = None,
+        ui_lock: asyncio.Lock | None = None,
+    ) -> str:
+        """Export *doc_format* from the order page and save it as ``file_stem.<ext>``.
+
+        Concurrent exports on one page share *downloads* (routes browser
+        downloads by file extension) and *ui_lock* (serializes menu clicks).
+        """
         await self.storage.makedirs(ctx.generation_dir)
 
         self.logger.debug("Check ref window")
@@ -705,193 +1440,62 @@ class SokraticSource(PresentationSource):
             f"//div[@role='menu'][.//div[@role='menuitem'][normalize-space(.)='{doc_format}']]"
         )
 
+        own_router = downloads is None
+        router = downloads or _DownloadRouter(page, self.logger)
+        lock = ui_lock or asyncio.Lock()
+
         self.logger.debug("Waiting for download button to become enabled")
         await expect(download_button).to_be_enabled(timeout=self.generation_timeout)
         self.logger.debug("Download button is enabled")
 
         max_attempts = 3
         last_error: Exception | None = None
-        download_info = None
+        download: Download | None = None
 
-        for attempt in range(1, max_attempts + 1):
-            await self._log_download_diag(
-                ctx,
-                f"{doc_format} attempt {attempt}/{max_attempts}: start url={page.url}",
-            )
-            await self._wait_for_blocking_preloader_to_disappear(ctx)
-            await self._save_generation_screenshot(
-                ctx, 0, f"before_download_{doc_format}_attempt_{attempt}"
-            )
-            popup_closed = await self._close_popup_if_visible(ctx, popup_locator)
-            if popup_closed:
-                self.logger.debug("Closed popup before clicking download button (attempt %s/%s)", attempt, max_attempts)
-                await self._log_download_diag(
-                    ctx, f"{doc_format} attempt {attempt}/{max_attempts}: popup closed before download button click"
-                )
-                await self._save_generation_screenshot(
-                    ctx, 0, f"popup_closed_before_download_{doc_format}_attempt_{attempt}"
-                )
-            self.logger.debug(
-                "Click download button (attempt %s/%s)", attempt, max_attempts
-            )
-            await self._log_download_diag(
-                ctx, f"{doc_format} attempt {attempt}/{max_attempts}: before click download button"
-            )
-            await self._log_preloader_state(ctx, f"attempt {attempt} before_click_download_button")
-            await self._wait_for_download_button_idle(page, download_button)
-            await download_button.scroll_into_view_if_needed(timeout=self.playwright_default_timeout)
-            await self._save_generation_screenshot(
-                ctx, 0, f"before_click_download_{doc_format}_attempt_{attempt}"
-            )
-            try:
-                await download_button.click(
-                    timeout=self.playwright_default_timeout,
-                    force=True,
-                )
-            except PlaywrightTimeoutError as exc:
-                last_error = exc
-                await self._log_download_diag(
-                    ctx,
-                    f"{doc_format} attempt {attempt}/{max_attempts}: download button click timeout",
-                    flush=True,
-                )
-                self.logger.warning(
-                    "Failed to click download button for format '%s' on attempt %s/%s. URL: %s",
-                    doc_format,
-                    attempt,
-                    max_attempts,
-                    page.url,
-                )
-                await self._save_generation_screenshot(
-                    ctx,
-                    0,
-                    f"download_button_click_timeout_{doc_format}_attempt_{attempt}",
-                )
-                continue
-            await self._log_download_diag(
-                ctx, f"{doc_format} attempt {attempt}/{max_attempts}: after click download button"
-            )
-            await self._log_preloader_state(ctx, f"attempt {attempt} after_click_download_button")
-            await self._save_generation_screenshot(
-                ctx, 0, f"after_click_download_{doc_format}_attempt_{attempt}"
-            )
-
-            # Inner retry loop: wait for the dropdown menu to appear.
-            # If it doesn't open (popup intervened or click didn't register) — re-click.
-            menu_open = False
-            menu_click_timeout_ms = 5000
-            max_menu_retries = 5
-            for menu_retry in range(1, max_menu_retries + 1):
-                popup_closed = await self._close_popup_if_visible(ctx, popup_locator)
-                if popup_closed:
-                    self.logger.debug(
-                        "Popup closed, re-clicking download button (attempt %s/%s, menu retry %s/%s)",
-                        attempt, max_attempts, menu_retry, max_menu_retries,
-                    )
-                    await self._log_download_diag(
+        try:
+            for attempt in range(1, max_attempts + 1):
+                waiter = router.expect(doc_format)
+                async with lock:
+                    clicked, error = await self._click_download_format(
                         ctx,
-                        f"{doc_format} attempt {attempt}/{max_attempts} menu retry {menu_retry}: popup closed, re-clicking",
-                    )
-                    await self._save_generation_screenshot(
-                        ctx, 0, f"before_reopen_menu_{doc_format}_a{attempt}_r{menu_retry}"
+                        doc_format,
+                        attempt,
+                        max_attempts,
+                        download_button=download_button,
+                        format_locator=format_locator,
+                        menu_locator=menu_locator,
+                        popup_locator=popup_locator,
                     )
-                    await self._wait_for_download_button_idle(page, download_button)
-                    await download_button.scroll_into_view_if_needed(timeout=self.playwright_default_timeout)
-                    await download_button.click(timeout=self.playwright_default_timeout, force=True)
-
+                if not clicked:
+                    router.discard(waiter)
+                    last_error = error or last_error
+                    continue
                 try:
-                    await menu_locator.wait_for(state="visible", timeout=menu_click_timeout_ms)
-                    menu_open = True
-                    self.logger.debug(
-                        "Dropdown menu appeared (attempt %s/%s, menu retry %s/%s)",
-                        attempt, max_attempts, menu_retry, max_menu_retries,
-                    )
-                    await self._log_download_diag(
-                        ctx,
-                        f"{doc_format} attempt {attempt}/{max_attempts} menu retry {menu_retry}: menu visible",
-                    )
+                    download = await asyncio.wait_for(waiter, timeout=self.generation_timeout / 1000)
                     break
-                except PlaywrightTimeoutError:
-                    self.logger.warning(
-                        "Dropdown menu did not appear after %s ms (attempt %s/%s, menu retry %s/%s), re-clicking",
-                        menu_click_timeout_ms, attempt, max_attempts, menu_retry, max_menu_retries,
-                    )
+                except asyncio.TimeoutError as exc:
+                    router.discard(waiter)
+                    last_error = exc
                     await self._log_download_diag(
                         ctx,
-                        f"{doc_format} attempt {attempt}/{max_attempts} menu retry {menu_retry}: menu timeout, re-clicking",
+                        f"{doc_format} attempt {attempt}/{max_attempts}: expect_download timeout",
                         flush=True,
                     )
-                    await self._save_generation_screenshot(
-                        ctx, 0, f"menu_timeout_{doc_format}_a{attempt}_r{menu_retry}"
-                    )
-                    await self._wait_for_download_button_idle(page, download_button)
-                    await download_button.scroll_into_view_if_needed(timeout=self.playwright_default_timeout)
-                    await download_button.click(timeout=self.playwright_default_timeout, force=True)
-
-            if not menu_open:
-                self.logger.warning(
-                    "Dropdown menu never appeared after %s menu retries (attempt %s/%s), retrying outer attempt",
-                    max_menu_retries, attempt, max_attempts,
-                )
-                await self._log_download_diag(
-                    ctx,
-                    f"{doc_format} attempt {attempt}/{max_attempts}: menu never opened, going to next attempt",
-                    flush=True,
-                )
-                continue
-
-            await format_locator.wait_for(state="visible", timeout=self.playwright_default_timeout)
-            await self._save_generation_screenshot(
-                ctx, 0, f"menu_open_{doc_format}_attempt_{attempt}"
-            )
-
-            try:
-                async with page.expect_download(timeout=self.generation_timeout) as download_info:
-                    self.logger.debug(
-                        "Click download format '%s' (attempt %s/%s)",
+                    self.logger.warning(
+                        "Download event not received for format '%s' on attempt %s/%s. URL: %s",
                         doc_format,
                         attempt,
                         max_attempts,
+                        page.url,
                     )
-                    await self._log_download_diag(
-                        ctx,
-                        f"{doc_format} attempt {attempt}/{max_attempts}: before click format",
+                    await self._save_diagnostic_screenshot(
+                        ctx, f"download_timeout_{doc_format}_attempt_{attempt}"
                     )
-                    await self._log_preloader_state(ctx, f"attempt {attempt} before_click_format")
-                    await self._save_generation_screenshot(
-                        ctx,
-                        0,
-                        f"before_click_download_format_{doc_format}_attempt_{attempt}",
-                    )
-                    if attempt == max_attempts:
-                        await format_locator.click(no_wait_after=True, force=True)
-                    else:
-                        await format_locator.click(no_wait_after=True)
-                    await self._log_download_diag(
-                        ctx,
-                        f"{doc_format} attempt {attempt}/{max_attempts}: after click format",
-                    )
-                    await self._log_preloader_state(ctx, f"attempt {attempt} after_click_format")
-                break
-            except PlaywrightTimeoutError as exc:
-                last_error = exc
-                await self._log_download_diag(
-                    ctx,
-                    f"{doc_format} attempt {attempt}/{max_attempts}: expect_download timeout",
-                    flush=True,
-                )
-                self.logger.warning(
-                    "Download event not received for format '%s' on attempt %s/%s. URL: %s",
-                    doc_format,
-                    attempt,
-                    max_attempts,
-                    page.url,
-                )
-                await self._save_generation_screenshot(
-                    ctx, 0, f"download_timeout_{doc_format}_attempt_{attempt}"
-                )
+        finally:
+            if own_router:
+                router.close()
 
-        if download_info is None:
+        if download is None:
             self.logger.error(
                 "Failed to download format '%s' after %s attempts",
                 doc_format,
@@ -904,9 +1508,10 @@ class SokraticSource(PresentationSource):
                 f"Download event not received for format '{doc_format}' after {max_attempts} attempts"
             ) from last_error
 
-        await self._close_popup_if_visible(ctx, popup_locator)
+        async with lock:
+            await self._close_popup_if_visible(ctx, popup_locator)
 
-        download = await download_info.value
+        self._learn_export_url(doc_format, download.url, page.url)
         ext = os.path.splitext(download.suggested_filename)[1]
         dest_key = self.storage.build_path(ctx.generation_dir, f"{file_stem}{ext}")
 
@@ -923,6 +1528,250 @@ class SokraticSource(PresentationSource):
         self.logger.debug("File saved to %s", filepath)
         return filepath
 
+    def _export_url(self, doc_format: str, order_url: str) -> str | None:
+        order_id = _order_id_from_url(order_url)
+        template = self.export_url_templates.get(doc_format) or self._learned_export_urls.get(doc_format)
+        if order_id is None or template is None:
+            return None
+        return template.replace("{order_id}", order_id)
+
+    def _learn_export_url(self, doc_format: str, download_url: str, order_url: str) -> None:
+        """Remember the URL the UI export hit so later orders can fetch it directly."""
+        order_id = _order_id_from_url(order_url)
+        if (
+            order_id is None
+            or not download_url.startswith(("https://", "http://"))
+            or order_id not in download_url
+        ):
+            return
+        template = download_url.replace(order_id, "{order_id}")
+        if self._learned_export_urls.get(doc_format) != template:
+            self.logger.info("Learned %s export URL: %s", doc_format, template)
+            SokraticSource._learned_export_urls[doc_format] = template
+
+    async def _download_direct(
+        self, ctx: _GenCtx, doc_format: str, file_stem: str, order_url: str
+    ) -> str | None:
+        """Fetch the export with the page's authenticated request context.
+
+        Returns None (caller falls back to the UI menu) when no export URL is
+        known or the response is not a file.
+        """
+        if not self.direct_export:
+            return None
+        url = self._export_url(doc_format, order_url)
+        if url is None:
+            return None
+
+        started = time.monotonic()
+        try:
+            response = await ctx.page.request.get(url, timeout=self.generation_timeout)
+            content_type = (response.headers.get("content-type") or "").lower()
+            if not response.ok or content_type.startswith(("text/html", "application/json")):
+                raise RuntimeError(f"HTTP {response.status} ({content_type or 'no content-type'})")
+            # APIResponse has no streaming reader; exports are a few MB at most.
+            body = await response.body()
+            if not body:
+                raise RuntimeError("empty body")
+        except Exception as exc:  # pylint: disable=broad-except
+            self.logger.warning("Direct %s export failed, falling back to UI: %s", doc_format, exc)
+            await self._log_download_diag(ctx, f"{doc_format}: direct export failed: {exc}", flush=True)
+            if doc_format not in self.export_url_templates:
+                SokraticSource._learned_export_urls.pop(doc_format, None)
+            return None
+
+        ext = self._export_extension(doc_format, response.headers, url)
+        dest_key = self.storage.build_path(ctx.generation_dir, f"{file_stem}{ext}")
+        filepath = await self.storage.save_bytes(dest_key, body)
+        elapsed_ms = int((time.monotonic() - started) * 1000)
+        self.logger.info("Direct %s export: %d bytes in %dms", doc_format, len(body), elapsed_ms)
+        await self._log_download_diag(ctx, f"{doc_format}: direct export {len(body)} bytes in {elapsed_ms}ms")
+        return filepath
+
+    @staticmethod
+    def _export_extension(doc_format: str, headers: dict[str, str], url: str) -> str:
+        disposition = headers.get("content-disposition") or ""
+        if match := re.search(r'filename\*?=(?:UTF-8\'\')?"?([^";]+)"?', disposition, re.IGNORECASE):
+            ext = os.path.splitext(unquote(match.group(1)))[1]
+            if ext:
+                return ext
+        ext = os.path.splitext(urlparse(url).path)[1]
+        if ext:
+            return ext
+        return _FORMAT_EXTENSIONS.get(doc_format, ("",))[0]
+
+    async def _click_download_format(
+        self,
+        ctx: _GenCtx,
+        doc_format: str,
+        attempt: int,
+        max_attempts: int,
+        *,
+        download_button: Locator,
+        format_locator: Locator,
+        menu_locator: Locator,
+        popup_locator: Locator,
+    ) -> tuple[bool, Exception | None]:
+        """Open the "Скачать" menu and click *doc_format*; False means retry the attempt.
+
+        Only drives the UI: the caller holds the page's UI lock around this call
+        and awaits the resulting download outside of it.
+        """
+        page = ctx.page
+        await self._log_download_diag(
+            ctx,
+            f"{doc_format} attempt {attempt}/{max_attempts}: start url={page.url}",
+        )
+        await self._wait_for_blocking_preloader_to_disappear(ctx)
+        await self._save_diagnostic_screenshot(
+            ctx, f"before_download_{doc_format}_attempt_{attempt}"
+        )
+        popup_closed = await self._close_popup_if_visible(ctx, popup_locator)
+        if popup_closed:
+            self.logger.debug("Closed popup before clicking download button (attempt %s/%s)", attempt, max_attempts)
+            await self._log_download_diag(
+                ctx, f"{doc_format} attempt {attempt}/{max_attempts}: popup closed before download button click"
+            )
+            await self._save_diagnostic_screenshot(
+                ctx, f"popup_closed_before_download_{doc_format}_attempt_{attempt}"
+            )
+        self.logger.debug(
+            "Click download button (attempt %s/%s)", attempt, max_attempts
+        )
+        await self._log_download_diag(
+            ctx, f"{doc_format} attempt {attempt}/{max_attempts}: before click download button"
+        )
+        await self._log_preloader_state(ctx, f"attempt {attempt} before_click_download_button")
+        await self._wait_for_download_button_idle(page, download_button)
+        await download_button.scroll_into_view_if_needed(timeout=self.playwright_default_timeout)
+        await self._save_diagnostic_screenshot(
+            ctx, f"before_click_download_{doc_format}_attempt_{attempt}"
+        )
+        try:
+            await download_button.click(
+                timeout=self.playwright_default_timeout,
+                force=True,
+            )
+        except PlaywrightTimeoutError as exc:
+            await self._log_download_diag(
+                ctx,
+                f"{doc_format} attempt {attempt}/{max_attempts}: download button click timeout",
+                flush=True,
+            )
+            self.logger.warning(
+                "Failed to click download button for format '%s' on attempt %s/%s. URL: %s",
+                doc_format,
+                attempt,
+                max_attempts,
+                page.url,
+            )
+            await self._save_diagnostic_screenshot(
+                ctx,
+                f"download_button_click_timeout_{doc_format}_attempt_{attempt}",
+            )
+            return False, exc
+        await self._log_download_diag(
+            ctx, f"{doc_format} attempt {attempt}/{max_attempts}: after click download button"
+        )
+        await self._log_preloader_state(ctx, f"attempt {attempt} after_click_download_button")
+        await self._save_diagnostic_screenshot(
+            ctx, f"after_click_download_{doc_format}_attempt_{attempt}"
+        )
+
+        # Inner retry loop: wait for the dropdown menu to appear.
+        # If it doesn't open (popup intervened or click didn't register) — re-click.
+        menu_open = False
+        menu_click_timeout_ms = 5000
+        max_menu_retries = 5
+        for menu_retry in range(1, max_menu_retries + 1):
+            popup_closed = await self._close_popup_if_visible(ctx, popup_locator)
+            if popup_closed:
+                self.logger.debug(
+                    "Popup closed, re-clicking download button (attempt %s/%s, menu retry %s/%s)",
+                    attempt, max_attempts, menu_retry, max_menu_retries,
+                )
+                await self._log_download_diag(
+                    ctx,
+                    f"{doc_format} attempt {attempt}/{max_attempts} menu retry {menu_retry}: popup closed, re-clicking",
+                )
+                await self._save_diagnostic_screenshot(
+                    ctx, f"before_reopen_menu_{doc_format}_a{attempt}_r{menu_retry}"
+                )
+                await self._wait_for_download_button_idle(page, download_button)
+                await download_button.scroll_into_view_if_needed(timeout=self.playwright_default_timeout)
+                await download_button.click(timeout=self.playwright_default_timeout, force=True)
+
+            try:
+                await menu_locator.wait_for(state="visible", timeout=menu_click_timeout_ms)
+                menu_open = True
+                self.logger.debug(
+                    "Dropdown menu appeared (attempt %s/%s, menu retry %s/%s)",
+                    attempt, max_attempts, menu_retry, max_menu_retries,
+                )
+                await self._log_download_diag(
+                    ctx,
+                    f"{doc_format} attempt {attempt}/{max_attempts} menu retry {menu_retry}: menu visible",
+                )
+                break
+            except PlaywrightTimeoutError:
+                self.logger.warning(
+                    "Dropdown menu did not appear after %s ms (attempt %s/%s, menu retry %s/%s), re-clicking",
+                    menu_click_timeout_ms, attempt, max_attempts, menu_retry, max_menu_retries,
+                )
+                await self._log_download_diag(
+                    ctx,
+                    f"{doc_format} attempt {attempt}/{max_attempts} menu retry {menu_retry}: menu timeout, re-clicking",
+                    flush=True,
+                )
+                await self._save_diagnostic_screenshot(
+                    ctx, f"menu_timeout_{doc_format}_a{attempt}_r{menu_retry}"
+                )
+                await self._wait_for_download_button_idle(page, download_button)
+                await download_button.scroll_into_view_if_needed(timeout=self.playwright_default_timeout)
+                await download_button.click(timeout=self.playwright_default_timeout, force=True)
+
+        if not menu_open:
+            self.logger.warning(
+                "Dropdown menu never appeared after %s menu retries (attempt %s/%s), retrying outer attempt",
+                max_menu_retries, attempt, max_attempts,
+            )
+            await self._log_download_diag(
+                ctx,
+                f"{doc_format} attempt {attempt}/{max_attempts}: menu never opened, going to next attempt",
+                flush=True,
+            )
+            return False, None
+
+        await format_locator.wait_for(state="visible", timeout=self.playwright_default_timeout)
+        await self._save_diagnostic_screenshot(
+            ctx, f"menu_open_{doc_format}_attempt_{attempt}"
+        )
+
+        self.logger.debug(
+            "Click download format '%s' (attempt %s/%s)",
+            doc_format,
+            attempt,
+            max_attempts,
+        )
+        await self._log_download_diag(
+            ctx,
+            f"{doc_format} attempt {attempt}/{max_attempts}: before click format",
+        )
+        await self._log_preloader_state(ctx, f"attempt {attempt} before_click_format")
+        await self._save_diagnostic_screenshot(
+            ctx,
+            f"before_click_download_format_{doc_format}_attempt_{attempt}",
+        )
+        if attempt == max_attempts:
+            await format_locator.click(no_wait_after=True, force=True)
+        else:
+            await format_locator.click(no_wait_after=True)
+        await self._log_download_diag(
+            ctx,
+            f"{doc_format} attempt {attempt}/{max_attempts}: after click format",
+        )
+        await self._log_preloader_state(ctx, f"attempt {attempt} after_click_format")
+        return True, None
 
 async def generate_presentation(
     playwright: Playwright,
@@ -0,0 +1,192 @@
+"""Tests for AssetCache with fake Playwright routes (no browser)."""
+from __future__ import annotations
+
+import asyncio
+import os
+
+import pytest
+from presentations_module.sources.asset_cache import AssetCache
+
+
+class _FakeRequest:
+    def __init__(self, url: str, resource_type: str = "script") -> None:
+        self.url = url
+        self.method = "GET"
+        self.resource_type = resource_type
+        self.headers = {"accept": "*/*"}
+
+
+class _FakeResponse:
+    def __init__(self, status: int, body: bytes = b"", headers: dict[str, str] | None = None) -> None:
+        self.status = status
+        self._body = body
+        self.headers = headers or {}
+
+    async def body(self) -> bytes:
+        return self._body
+
+
+class _FakeRoute:
+    def __init__(self, url: str, *responses: _FakeResponse, resource_type: str = "script") -> None:
+        self.request = _FakeRequest(url, resource_type)
+        self.responses = list(responses)
+        self.fetches: list[dict[str, str] | None] = []
+        self.fulfilled: dict | None = None
+
+    @property
+    def fetched(self) -> bool:
+        return bool(self.fetches)
+
+    @property
+    def fetch_headers(self) -> dict[str, str] | None:
+        return self.fetches[0]
+
+    async def fetch(self, headers: dict[str, str] | None = None) -> _FakeResponse:
+        self.fetches.append(headers)
+        assert self.responses
+        return self.responses.pop(0)
+
+    async def fulfill(self, **kwargs) -> None:
+        self.fulfilled = kwargs
+
+
+def _blobs(cache_dir) -> list[str]:
+    return [
+        os.path.join(root, name)
+        for root, _, files in os.walk(cache_dir)
+        for name in files
+        if name != "index.json"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_fingerprinted_asset_is_served_from_disk(tmp_path):
+    cache = AssetCache(str(tmp_path), max_bytes=1024)
+    url = "https://sokratic.ru/_next/static/chunks/main-0a1b2c3d4e.js"
+
+    first = _FakeRoute(url, _FakeResponse(200, b"console.log(1)", {"content-type": "text/javascript"}))
+    assert await cache.handle(first)
+    assert first.fetched
+
+    second = _FakeRoute(url)
+    assert await cache.handle(second)
+    assert not second.fetched
+    assert second.fulfilled["body"] == b"console.log(1)"
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+    assert cache.stats.bytes_saved == len(b"console.log(1)")
+
+    # A new cache instance picks the index up from disk.
+    reloaded = AssetCache(str(tmp_path), max_bytes=1024)
+    third = _FakeRoute(url)
+    assert await reloaded.handle(third)
+    assert not third.fetched
+
+
+@pytest.mark.asyncio
+async def test_stale_asset_is_revalidated_with_etag(tmp_path):
+    cache = AssetCache(str(tmp_path), max_bytes=1024)
+    url = "https://sokratic.ru/styles/site.css"
+    headers = {"content-type": "text/css", "etag": '"v1"', "cache-control": "no-cache"}
+
+    assert await cache.handle(_FakeRoute(url, _FakeResponse(200, b"body{}", headers), resource_type="stylesheet"))
+
+    revalidate = _FakeRoute(url, _FakeResponse(304), resource_type="stylesheet")
+    assert await cache.handle(revalidate)
+    assert revalidate.fetch_headers["if-none-match"] == '"v1"'
+    assert revalidate.fulfilled["body"] == b"body{}"
+    assert cache.stats.revalidated == 1
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_keeps_cache_within_budget(tmp_path):
+    cache = AssetCache(str(tmp_path), max_bytes=10)
+    old = "https://sokratic.ru/a.0a1b2c3d4e.js"
+    new = "https://sokratic.ru/b.0a1b2c3d4f.js"
+
+    await cache.handle(_FakeRoute(old, _FakeResponse(200, b"123456")))
+    await cache.handle(_FakeRoute(new, _FakeResponse(200, b"abcdef")))
+
+    assert cache.total_bytes == 6
+    assert cache.stats.evicted == 1
+    assert len(_blobs(tmp_path)) == 1
+
+    assert not await cache.handle(_FakeRoute(new, resource_type="xhr"))
+
+
+@pytest.mark.asyncio
+async def test_304_for_a_missing_blob_is_refetched_without_validators(tmp_path):
+    cache = AssetCache(str(tmp_path), max_bytes=1024)
+    url = "https://sokratic.ru/styles/site.css"
+    headers = {"content-type": "text/css", "etag": '"v1"', "cache-control": "no-cache"}
+    assert await cache.handle(_FakeRoute(url, _FakeResponse(200, b"body{}", headers), resource_type="stylesheet"))
+    for blob in _blobs(tmp_path):
+        os.remove(blob)
+
+    route = _FakeRoute(
+        url, _FakeResponse(304), _FakeResponse(200, b"body{2}", headers), resource_type="stylesheet"
+    )
+    assert await cache.handle(route)
+
+    assert route.fetches[0]["if-none-match"] == '"v1"'
+    assert route.fetches[1] is None
+    assert route.fulfilled["body"] == b"body{2}"
+    assert route.fulfilled["response"].status == 200
+    assert cache.stats.revalidated == 0
+    assert cache.total_bytes == len(b"body{2}")
+
+
+@pytest.mark.asyncio
+async def test_urls_sharing_a_body_share_its_blob_until_the_last_one_goes(tmp_path):
+    cache = AssetCache(str(tmp_path), max_bytes=10)
+    first = "https://sokratic.ru/a.0a1b2c3d4e.js"
+    second = "https://sokratic.ru/b.0a1b2c3d4e.js"
+    other = "https://sokratic.ru/c.0a1b2c3d4e.js"
+
+    await cache.handle(_FakeRoute(first, _FakeResponse(200, b"123456")))
+    await cache.handle(_FakeRoute(second, _FakeResponse(200, b"123456")))
+    await cache.handle(_FakeRoute(other, _FakeResponse(200, b"abcd")))
+    assert cache.total_bytes == 10
+    assert cache.stats.evicted == 0
+
+    # Serving the first URL makes it the most recently used one.
+    assert await cache.handle(_FakeRoute(first))
+    await cache.handle(_FakeRoute("https://sokratic.ru/d.0a1b2c3d4e.js", _FakeResponse(200, b"xy")))
+
+    # The second URL goes without freeing the shared blob, then the other one.
+    assert cache.stats.evicted == 2
+    assert cache.total_bytes == 8
+    assert len(_blobs(tmp_path)) == 2
+    served = _FakeRoute(first)
+    assert await cache.handle(served)
+    assert served.fulfilled["body"] == b"123456"
+    assert AssetCache(str(tmp_path), max_bytes=10).total_bytes == 8
+
+
+@pytest.mark.asyncio
+async def test_concurrent_stores_write_the_latest_index(tmp_path):
+    cache = AssetCache(str(tmp_path), max_bytes=1024)
+    urls = [f"https://sokratic.ru/{name}.0a1b2c3d4e.js" for name in "abcdefgh"]
+
+    await asyncio.gather(
+        *(cache.handle(_FakeRoute(url, _FakeResponse(200, url.encode()))) for url in urls)
+    )
+
+    reloaded = AssetCache(str(tmp_path), max_bytes=1024)
+    assert sorted(reloaded._entries) == sorted(urls)
+
+
+@pytest.mark.asyncio
+async def test_route_is_fulfilled_when_storing_fails(tmp_path, monkeypatch):
+    cache = AssetCache(str(tmp_path), max_bytes=1024)
+    url = "https://sokratic.ru/a.0a1b2c3d4e.js"
+
+    def _broken_write(*args):
+        raise RuntimeError("dictionary changed size during iteration")
+
+    monkeypatch.setattr(cache, "_write_files", _broken_write)
+    route = _FakeRoute(url, _FakeResponse(200, b"x"))
+
+    assert await cache.handle(route)
+    assert route.fulfilled["body"] == b"x"
+    assert cache.total_bytes == 0
@@ -0,0 +1,120 @@
+"""Tests for routing concurrent downloads of one page by file extension."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+from presentations_module.sources.sokratic_source import SokraticSource, _DownloadRouter, _GenCtx
+
+
+class _FakePage:
+    def __init__(self) -> None:
+        self.listeners = []
+
+    def on(self, event, callback) -> None:
+        self.listeners.append(callback)
+
+    def remove_listener(self, event, callback) -> None:
+        self.listeners.remove(callback)
+
+    def emit(self, filename: str) -> SimpleNamespace:
+        download = SimpleNamespace(suggested_filename=filename)
+        for callback in list(self.listeners):
+            callback(download)
+        return download
+
+
+@pytest.mark.asyncio
+async def test_downloads_are_matched_by_extension_regardless_of_order():
+    page = _FakePage()
+    router = _DownloadRouter(page, logging.getLogger("test"))
+    pptx = router.expect("PowerPoint")
+    pdf = router.expect("PDF")
+
+    pdf_download = page.emit("deck.pdf")
+    pptx_download = page.emit("deck.pptx")
+
+    assert await pdf is pdf_download
+    assert await pptx is pptx_download
+    router.close()
+    assert page.listeners == []
+
+
+@pytest.mark.asyncio
+async def test_unknown_extension_goes_to_the_only_pending_waiter():
+    page = _FakePage()
+    router = _DownloadRouter(page, logging.getLogger("test"))
+    waiter = router.expect("PowerPoint")
+
+    download = page.emit("deck.odp")
+
+    assert await waiter is download
+    router.close()
+
+
+def test_export_url_is_learned_from_ui_download_and_reused_for_other_orders():
+    from presentations_module.sources.sokratic_source import SokraticSource
+
+    source = SokraticSource(
+        SimpleNamespace(chromium=None),  # type: ignore[arg-type]
+        logger=logging.getLogger("test"),
+        generation_dir="",
+        generation_timeout=1000,
+    )
+    SokraticSource._learned_export_urls.clear()
+    try:
+        source._learn_export_url(
+            "PDF",
+            "https://sokratic.ru/api/orders/abc123/export?format=pdf",
+            "https://sokratic.ru/ru/orders/abc123",
+        )
+        assert source._export_url("PDF", "https://sokratic.ru/ru/orders/zz9") == (
+            "https://sokratic.ru/api/orders/zz9/export?format=pdf"
+        )
+        # Blob URLs and URLs without the order id cannot be replayed.
+        source._learn_export_url("PowerPoint", "blob:https://sokratic.ru/1", "https://sokratic.ru/ru/orders/abc123")
+        assert source._export_url("PowerPoint", "https://sokratic.ru/ru/orders/zz9") is None
+    finally:
+        SokraticSource._learned_export_urls.clear()
+
+
+@pytest.mark.asyncio
+async def test_speech_text_takes_its_turn_on_the_harvest_tab():
+    source = SokraticSource(
+        SimpleNamespace(chromium=None),  # type: ignore[arg-type]
+        logger=logging.getLogger("test"),
+        generation_dir="",
+        generation_timeout=1000,
+    )
+    ui_lock = asyncio.Lock()
+    clicks: list[str] = []
+
+    async def _no_new_tab():
+        raise AssertionError("the speech text must not open another tab")
+
+    async def _download_text(ctx, file_stem):
+        assert ui_lock.locked()
+        return f"{file_stem}.txt"
+
+    async def _no_screenshot(ctx, step_index, stage):
+        return None
+
+    def _locator(selector):
+        async def _click():
+            assert ui_lock.locked()
+            clicks.append(selector)
+
+        return SimpleNamespace(click=_click)
+
+    source.new_tab = _no_new_tab
+    source._download_text = _download_text
+    source._save_generation_screenshot = _no_screenshot
+    ctx = _GenCtx(page=SimpleNamespace(locator=_locator), generation_dir="", generation_id="g1")
+
+    stage, produced = await source._harvest_text(ctx, ["downloaded_text"], "g1", ui_lock)
+
+    assert (stage, produced) == ("downloaded_text", ["g1.txt"])
+    # The presentation view is restored before the menu gets the tab back.
+    assert len(clicks) == 1 and not ui_lock.locked()
@@ -0,0 +1,103 @@
+"""Tests for SokraticSource._fill_form with a fake page (no browser)."""
+from __future__ import annotations
+
+import logging
+from types import SimpleNamespace
+
+import pytest
+from presentations_module.sources.sokratic_source import SokraticSource, _FormField, _GenCtx
+
+
+class _FakeLocator:
+    def __init__(self, page: "_FakePage", xpath: str) -> None:
+        self.page = page
+        self.xpath = xpath
+
+    @property
+    def first(self) -> "_FakeLocator":
+        return self
+
+    async def type(self, value: str) -> None:
+        self.page.typed.append((self.xpath, value))
+
+    async def select_option(self, value: str) -> None:
+        self.page.selected.append((self.xpath, value))
+
+
+class _FakePage:
+    def __init__(self, rejected: set[str] = frozenset()) -> None:
+        self.rejected = rejected
+        self.evaluations = 0
+        self.typed: list[tuple[str, str]] = []
+        self.selected: list[tuple[str, str]] = []
+
+    async def evaluate(self, expression: str, arg=None):
+        name, (fields,) = arg
+        assert name == "fillFields"
+        self.evaluations += 1
+        results = [
+            {"name": field["name"], "found": True, "applied": field["name"] not in self.rejected, "ms": 1.5}
+            for field in fields
+        ]
+        return {"installed": True, "value": results}
+
+    def locator(self, xpath: str) -> _FakeLocator:
+        return _FakeLocator(self, xpath)
+
+
+def _source(form_fill_mode: str) -> SokraticSource:
+    playwright = SimpleNamespace(chromium=None)
+    return SokraticSource(
+        playwright,  # type: ignore[arg-type]
+        logger=logging.getLogger("test"),
+        generation_dir="",
+        generation_timeout=1000,
+        form_fill_mode=form_fill_mode,
+    )
+
+
+_FIELDS = [
+    _FormField("topic", "//textarea", "Фотосинтез"),
+    _FormField("slides_amount", "(//form//select)[1]", "12", select=True),
+]
+
+
+@pytest.mark.asyncio
+async def test_fast_mode_fills_all_fields_in_one_evaluation():
+    page = _FakePage()
+    ctx = _GenCtx(page=page, generation_dir="")  # type: ignore[arg-type]
+
+    timings = await _source("fast")._fill_form(ctx, _FIELDS)
+
+    assert page.evaluations == 1
+    assert timings == {"topic": 1.5, "slides_amount": 1.5}
+    assert page.typed == [] and page.selected == []
+
+
+@pytest.mark.asyncio
+async def test_fast_mode_types_fields_that_did_not_apply():
+    page = _FakePage(rejected={"slides_amount"})
+    ctx = _GenCtx(page=page, generation_dir="")  # type: ignore[arg-type]
+
+    await _source("fast")._fill_form(ctx, _FIELDS)
+
+    assert page.typed == []
+    assert page.selected == [("(//form//select)[1]", "12")]
+
+
+@pytest.mark.asyncio
+async def test_humanized_mode_types_every_field():
+    page = _FakePage()
+    ctx = _GenCtx(page=page, generation_dir="")  # type: ignore[arg-type]
+
+    timings = await _source("humanized")._fill_form(ctx, _FIELDS)
+
+    assert page.evaluations == 0
+    assert page.typed == [("//textarea", "Фотосинтез")]
+    assert page.selected == [("(//form//select)[1]", "12")]
+    assert set(timings) == {"topic", "slides_amount"}
+
+
+def test_unknown_form_fill_mode_is_rejected():
+    with pytest.raises(ValueError, match="form fill mode"):
+        _source("instant")
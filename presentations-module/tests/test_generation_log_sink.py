@@ -0,0 +1,175 @@
+"""Tests for GenerationLogSink on local and non-appendable storage."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+from presentations_module.files.file_storage import FileStorage
+from presentations_module.files.generation_log_sink import GenerationLogSink
+from presentations_module.files.local_file_storage import LocalFileStorage
+from presentations_module.sources.sokratic_source import SokraticSource
+
+
+class _ObjectStorage(FileStorage):
+    """Write-once storage without append support, like S3."""
+
+    def __init__(self) -> None:
+        self.objects: dict[str, bytes] = {}
+
+    async def save_bytes(self, path: str, data: bytes) -> str:
+        self.objects[path] = data
+        return path
+
+    async def save_text(self, path: str, content: str, encoding: str = "utf-8") -> str:
+        return await self.save_bytes(path, content.encode(encoding))
+
+    async def save_from_local_path(self, dest_path: str, local_path: str) -> str:
+        raise NotImplementedError
+
+    async def makedirs(self, path: str) -> None:
+        return None
+
+    def build_path(self, *parts: str) -> str:
+        return "/".join(parts)
+
+
+@pytest.mark.asyncio
+async def test_local_sink_appends_across_phases(tmp_path):
+    storage = LocalFileStorage(base_dir=str(tmp_path))
+
+    first = GenerationLogSink(storage, "gen/log.txt")
+    first.write("submit 1")
+    first.request_flush()
+    first.write("submit 2")
+    await first.flush()
+    ref = await first.close()
+
+    second = GenerationLogSink(storage, "gen/log.txt")
+    second.write("harvest 1")
+    await second.close()
+
+    assert ref == str(tmp_path / "gen" / "log.txt")
+    assert open(ref, encoding="utf-8").read() == "submit 1\nsubmit 2\nharvest 1\n"
+
+
+@pytest.mark.asyncio
+async def test_sink_caps_size_and_reports_dropped_lines(tmp_path):
+    storage = LocalFileStorage(base_dir=str(tmp_path))
+    sink = GenerationLogSink(storage, "log.txt", max_bytes=11)
+    for line in ("12345", "abcd", "dropped", "dropped too"):
+        sink.write(line)
+    ref = await sink.close()
+    sink.write("after close")
+
+    assert sink.dropped_lines == 2
+    lines = open(ref, encoding="utf-8").read().splitlines()
+    assert lines[:2] == ["12345", "abcd"]
+    assert "size cap of 11 bytes" in lines[2]
+    assert lines[3] == "... [2 line(s) dropped] ..."
+    assert len(lines) == 4
+
+
+@pytest.mark.asyncio
+async def test_non_append_storage_gets_one_object_on_close():
+    storage = _ObjectStorage()
+    sink = GenerationLogSink(storage, "gen/log.txt")
+    sink.write("one")
+    sink.request_flush()
+    sink.write("two")
+    await sink.flush()
+    assert storage.objects == {}
+
+    assert await sink.close() == "gen/log.txt"
+    assert storage.objects["gen/log.txt"] == b"one\ntwo\n"
+
+
+@pytest.mark.asyncio
+async def test_non_append_storage_keeps_earlier_phases_on_checkpoint():
+    storage = _ObjectStorage()
+    sink = GenerationLogSink(storage, "gen/log.txt", max_bytes=12)
+    sink.write("submit")
+    assert await sink.checkpoint() == "gen/log.txt"
+    assert storage.objects["gen/log.txt"] == b"submit\n"
+
+    sink.write("harvest")
+    await sink.close()
+
+    lines = storage.objects["gen/log.txt"].decode().splitlines()
+    assert lines[0] == "submit"
+    # The size cap spans both phases.
+    assert "size cap of 12 bytes" in lines[1]
+    assert lines[2] == "... [1 line(s) dropped] ..."
+
+
+class _FlakyAppendStorage(_ObjectStorage):
+    supports_append = True
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.failures = 1
+
+    async def append_bytes(self, path: str, data: bytes) -> str:
+        if self.failures:
+            self.failures -= 1
+            raise OSError("connection reset")
+        self.objects[path] = self.objects.get(path, b"") + data
+        return path
+
+
+@pytest.mark.asyncio
+async def test_failed_append_is_retried_on_the_next_flush():
+    storage = _FlakyAppendStorage()
+    sink = GenerationLogSink(storage, "gen/log.txt")
+    sink.write("one")
+    await sink.flush()
+    assert storage.objects == {}
+
+    sink.write("two")
+    assert await sink.close() == "gen/log.txt"
+    assert storage.objects["gen/log.txt"] == b"one\ntwo\n"
+
+
+class _SlowAppendStorage(_FlakyAppendStorage):
+    """Append storage that fails once, after yielding to the loop."""
+
+    async def append_bytes(self, path: str, data: bytes) -> str:
+        await asyncio.sleep(0.01)
+        return await super().append_bytes(path, data)
+
+
+@pytest.mark.asyncio
+async def test_background_flush_waits_for_a_running_flush():
+    storage = _SlowAppendStorage()
+    sink = GenerationLogSink(storage, "gen/log.txt")
+    sink.write("one")
+    flush = asyncio.create_task(sink.flush())
+    await asyncio.sleep(0)
+    # Written while the first append is in flight, which then fails.
+    sink.write("two")
+    sink.request_flush()
+    await flush
+    await sink.close()
+
+    assert storage.objects["gen/log.txt"] == b"one\ntwo\n"
+
+
+def test_phases_of_a_generation_share_one_sink():
+    def _source() -> SokraticSource:
+        return SokraticSource(
+            SimpleNamespace(chromium=None),  # type: ignore[arg-type]
+            logger=logging.getLogger("test"),
+            generation_dir="",
+            generation_timeout=1000,
+            save_logs=True,
+            storage=_ObjectStorage(),
+        )
+
+    submit, harvest = _source(), _source()
+    try:
+        sink = submit._log_sink_for("g1", "gen")
+        assert harvest._log_sink_for("g1", "gen") is sink
+        assert harvest._log_sink_for("g2", "gen") is not sink
+    finally:
+        SokraticSource._log_sinks.clear()
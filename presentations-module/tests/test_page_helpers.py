@@ -0,0 +1,56 @@
+"""Tests for SokraticSource._page_helper with a fake page (no browser)."""
+from __future__ import annotations
+
+import logging
+from types import SimpleNamespace
+
+import pytest
+from presentations_module.sources.page_helpers import PAGE_HELPERS_JS
+from presentations_module.sources.sokratic_source import SokraticSource
+
+
+class _FakePage:
+    """Evaluates helper calls against a dict standing in for the page-side library."""
+
+    def __init__(self, installed: bool) -> None:
+        self.installed = installed
+        self.helpers = {"isBlocked": lambda: False, "preloaderState": lambda: {"visibleCandidates": 0}}
+        self.scripts: list[str] = []
+
+    async def evaluate(self, expression: str, arg=None):
+        if arg is None:
+            self.scripts.append(expression)
+            self.installed = True
+            return None
+        name, args = arg
+        if not self.installed:
+            return {"installed": False}
+        return {"installed": True, "value": self.helpers[name](*args)}
+
+
+def _source() -> SokraticSource:
+    playwright = SimpleNamespace(chromium=None)
+    return SokraticSource(
+        playwright,  # type: ignore[arg-type]
+        logger=logging.getLogger("test"),
+        generation_dir="",
+        generation_timeout=1000,
+    )
+
+
+@pytest.mark.asyncio
+async def test_page_helper_calls_installed_library():
+    page = _FakePage(installed=True)
+
+    assert await _source()._page_helper(page, "isBlocked") is False
+    assert page.scripts == []
+
+
+@pytest.mark.asyncio
+async def test_page_helper_injects_library_into_old_documents():
+    page = _FakePage(installed=False)
+
+    state = await _source()._page_helper(page, "preloaderState")
+
+    assert state == {"visibleCandidates": 0}
+    assert page.scripts == [PAGE_HELPERS_JS]
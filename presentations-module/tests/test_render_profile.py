@@ -0,0 +1,60 @@
+"""Tests for RenderProfile launch/context options (no browser)."""
+from __future__ import annotations
+
+import pytest
+from presentations_module import RENDER_PROFILES, get_render_profile
+from presentations_module.sources.render_profile import LEAN_CHROMIUM_ARGS, REDUCE_MOTION_JS
+
+
+class _FakeContext:
+    def __init__(self) -> None:
+        self.scripts: list[str] = []
+
+    async def add_init_script(self, script: str) -> None:
+        self.scripts.append(script)
+
+
+def test_standard_profile_keeps_the_pool_defaults():
+    profile = get_render_profile("standard")
+
+    assert profile.launch_options(True, extra_args=("--marker",)) == {
+        "headless": True,
+        "args": ["--no-sandbox", "--disable-dev-shm-usage", "--marker"],
+    }
+    assert profile.context_options() == {
+        "viewport": {"width": 1280, "height": 720},
+        "device_scale_factor": 1.0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_lean_profile_trims_chromium_and_disables_motion():
+    profile = get_render_profile("lean")
+    context = _FakeContext()
+
+    options = profile.launch_options(True, extra_args=("--marker",))
+    await profile.install(context)
+
+    assert options["args"][-1] == "--marker"
+    assert set(LEAN_CHROMIUM_ARGS) <= set(options["args"])
+    assert "channel" not in options
+    assert profile.context_options()["device_scale_factor"] < 1
+    assert profile.context_options()["reduced_motion"] == "reduce"
+    assert context.scripts == [REDUCE_MOTION_JS]
+
+
+@pytest.mark.asyncio
+async def test_full_chromium_profile_selects_the_channel_only_when_headless():
+    profile = RENDER_PROFILES["full-chromium"]
+    context = _FakeContext()
+
+    await profile.install(context)
+
+    assert profile.launch_options(True)["channel"] == "chromium"
+    assert "channel" not in profile.launch_options(False)
+    assert context.scripts == []
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError):
+        get_render_profile("turbo")
@@ -0,0 +1,120 @@
+"""Tests for RequestPolicy and the per-generation request counters (no browser)."""
+from __future__ import annotations
+
+import logging
+from types import SimpleNamespace
+
+import pytest
+from presentations_module import RequestPolicy
+from presentations_module.sources.sokratic_source import SokraticSource
+
+
+def test_default_policy_blocks_trackers_foreign_hosts_and_heavy_types():
+    policy = RequestPolicy()
+
+    assert policy.block_reason("https://sokratic.ru/ru", "document") is None
+    assert policy.block_reason("https://api.sokratic.ru/v1/orders", "xhr") is None
+    assert policy.block_reason("https://storage.yandexcloud.net/x/deck.pptx", "other") is None
+    assert policy.block_reason("https://mc.yandex.ru/watch/1", "script") == "tracker"
+    assert policy.block_reason("https://storage.yandexcloud.net/metrika/tag.js", "script") == "tracker"
+    assert policy.block_reason("https://cdn.example.com/app.js", "script") == "host"
+    assert policy.block_reason("https://sokratic.ru/logo.png", "image") == "resource_type"
+
+    custom = RequestPolicy(blocked_url_patterns=("sokratic.ru/api/telemetry*",), block_trackers=False)
+    assert custom.block_reason("https://sokratic.ru/api/telemetry/v2", "fetch") == "url_pattern"
+    assert custom.block_reason("https://mc.yandex.ru/watch/1", "script") == "host"
+
+
+def test_tracker_paths_apply_to_third_party_hosts_only():
+    policy = RequestPolicy()
+
+    assert policy.block_reason("https://sokratic.ru/static/analytics.js", "script") is None
+    assert policy.block_reason("https://app.sokratic.ru/js/tag.js", "script") is None
+    assert policy.block_reason("https://storage.yandexcloud.net/x/analytics.js", "script") == "tracker"
+    assert policy.block_reason("https://cdn.example.com/gtm.js", "script") == "tracker"
+
+
+class _FakeRequest:
+    def __init__(self, url: str, resource_type: str, body_size: int = 0) -> None:
+        self.url = url
+        self.resource_type = resource_type
+        self.body_size = body_size
+        self.method = "GET"
+        self.failure = "net::ERR_FAILED"
+
+    async def sizes(self) -> dict[str, int]:
+        return {"responseBodySize": self.body_size, "responseHeadersSize": 100}
+
+
+class _FakeRoute:
+    def __init__(self, request: _FakeRequest) -> None:
+        self.request = request
+        self.outcome = ""
+
+    async def abort(self) -> None:
+        self.outcome = "abort"
+
+    async def continue_(self) -> None:
+        self.outcome = "continue"
+
+
+class _FakePage:
+    def __init__(self) -> None:
+        self.handlers: dict[str, list] = {}
+        self.route_handler = None
+
+    def set_default_timeout(self, timeout: int) -> None:
+        pass
+
+    def on(self, event: str, handler) -> None:
+        self.handlers.setdefault(event, []).append(handler)
+
+    async def emit(self, event: str, request: _FakeRequest) -> None:
+        for handler in self.handlers.get(event, []):
+            result = handler(request)
+            if result is not None:
+                await result
+
+    async def route(self, pattern: str, handler) -> None:
+        self.route_handler = handler
+
+
+class _FakeContext:
+    async def new_page(self) -> _FakePage:
+        return _FakePage()
+
+
+@pytest.mark.asyncio
+async def test_tab_counts_allowed_blocked_and_failed_requests_per_generation():
+    source = SokraticSource(
+        SimpleNamespace(chromium=None),  # type: ignore[arg-type]
+        logger=logging.getLogger("test"),
+        generation_dir="",
+        generation_timeout=1000,
+    )
+    source.context = _FakeContext()  # type: ignore[assignment]
+    page = await source.new_tab()
+    source._open_generation_ctx(page, "gen-net", "")  # type: ignore[arg-type]
+
+    script = _FakeRequest("https://sokratic.ru/app.js", "script", body_size=900)
+    image = _FakeRequest("https://sokratic.ru/logo.png", "image")
+    broken = _FakeRequest("https://sokratic.ru/api", "xhr")
+    for request in (script, image, broken):
+        route = _FakeRoute(request)
+        await page.route_handler(route)
+        assert route.outcome == ("abort" if request is image else "continue")
+
+    await page.emit("requestfinished", script)
+    await page.emit("requestfailed", image)
+    await page.emit("requestfailed", broken)
+
+    stats = SokraticSource._request_stats.pop("gen-net").as_dict()
+    assert stats == {
+        "allowed": 1,
+        "allowed_bytes": 1000,
+        "cached": 0,
+        "blocked": 1,
+        "failed": 1,
+        "blocked_by": {"resource_type": 1},
+    }
+    assert SokraticSource.network_totals()["allowed"] >= 1
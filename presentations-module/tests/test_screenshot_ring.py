@@ -0,0 +1,67 @@
+"""Tests for the in-memory screenshot ring of SokraticSource (no browser)."""
+from __future__ import annotations
+
+import logging
+from types import SimpleNamespace
+
+import pytest
+from presentations_module.sources.sokratic_source import SokraticSource, _GenCtx
+
+
+class _ShotPage:
+    def __init__(self) -> None:
+        self.calls = []
+
+    async def screenshot(self, **kwargs) -> bytes:
+        self.calls.append(kwargs)
+        return b"jpeg-%d" % len(self.calls)
+
+
+@pytest.mark.asyncio
+async def test_ring_mode_buffers_debug_shots_and_flushes_last_n_on_failure(tmp_path):
+    source = SokraticSource(
+        SimpleNamespace(chromium=None),  # type: ignore[arg-type]
+        logger=logging.getLogger("test"),
+        generation_dir="",
+        generation_timeout=1000,
+        screenshot_mode="ring",
+        screenshot_ring_size=2,
+        screenshot_quality=40,
+    )
+    page = _ShotPage()
+    ctx = _GenCtx(page=page, generation_dir=str(tmp_path), generation_id="g1")
+
+    for label in ("a", "b", "c"):
+        assert await source._save_diagnostic_screenshot(ctx, label) is None
+    assert list(tmp_path.iterdir()) == []
+    assert page.calls[0] == {"type": "jpeg", "quality": 40}
+
+    paths = await source._flush_screenshot_ring(ctx, reason="failed")
+    assert sorted(p.rsplit("/", 1)[1] for p in paths) == [
+        "ring_failed_01_b.jpg",
+        "ring_failed_02_c.jpg",
+    ]
+    assert await source._flush_screenshot_ring(ctx, reason="failed") == []
+
+
+@pytest.mark.asyncio
+async def test_ring_outlives_the_phase_and_is_flushed_when_the_order_is_abandoned(tmp_path):
+    def _source() -> SokraticSource:
+        return SokraticSource(
+            SimpleNamespace(chromium=None),  # type: ignore[arg-type]
+            logger=logging.getLogger("test"),
+            generation_dir=str(tmp_path),
+            generation_timeout=1000,
+            screenshot_mode="ring",
+        )
+
+    submit = _source()
+    ctx = _GenCtx(page=_ShotPage(), generation_dir=str(tmp_path / "g1"), generation_id="g1")
+    try:
+        await submit._save_diagnostic_screenshot(ctx, "retry")
+
+        await _source().abandon_order("g1")
+    finally:
+        SokraticSource._screenshot_rings.clear()
+
+    assert [p.name for p in (tmp_path / "g1").iterdir()] == ["ring_failed_01_retry.jpg"]
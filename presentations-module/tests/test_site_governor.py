@@ -0,0 +1,69 @@
+"""Tests for the SiteGovernor hook of SokraticSource (no browser)."""
+from __future__ import annotations
+
+import contextlib
+import logging
+from types import SimpleNamespace
+
+import pytest
+from presentations_module import SiteGovernor
+from presentations_module.sources.sokratic_source import SokraticSource, _GenCtx
+
+
+class _RecordingGovernor(SiteGovernor):
+    def __init__(self) -> None:
+        self.events: list[str] = []
+
+    @contextlib.asynccontextmanager
+    async def permit(self, action: str):
+        self.events.append(f"enter:{action}")
+        try:
+            yield
+        finally:
+            self.events.append(f"exit:{action}")
+
+
+def _source(governor: SiteGovernor | None = None) -> SokraticSource:
+    playwright = SimpleNamespace(chromium=None)
+    return SokraticSource(
+        playwright,  # type: ignore[arg-type]
+        logger=logging.getLogger("test"),
+        generation_dir="",
+        generation_timeout=1000,
+        site_governor=governor,
+    )
+
+
+@pytest.mark.asyncio
+async def test_file_export_runs_inside_a_download_permit():
+    governor = _RecordingGovernor()
+    source = _source(governor)
+
+    async def _download_direct(ctx, doc_format, file_stem, order_url):
+        governor.events.append(f"fetch:{doc_format}")
+        return f"/out/{file_stem}.pdf"
+
+    async def _no_screenshot(*_args):
+        return None
+
+    source._download_direct = _download_direct  # type: ignore[method-assign]
+    source._save_generation_screenshot = _no_screenshot  # type: ignore[method-assign]
+    ctx = _GenCtx(page=None, generation_dir="")  # type: ignore[arg-type]
+
+    stage, produced = await source._harvest_file(
+        ctx, ["downloaded_pdf"], "PDF", "gen", "https://x/ru/orders/1", None, None  # type: ignore[arg-type]
+    )
+
+    assert (stage, produced) == ("downloaded_pdf", ["/out/gen.pdf"])
+    assert governor.events == ["enter:download", "fetch:PDF", "exit:download"]
+
+
+@pytest.mark.asyncio
+async def test_default_governor_never_waits_but_rejects_unknown_actions():
+    governor = _source().site_governor
+
+    async with governor.permit("submit"):
+        pass
+    with pytest.raises(ValueError, match="site action"):
+        async with governor.permit("browse"):
+            pass
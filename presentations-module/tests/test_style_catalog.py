@@ -0,0 +1,89 @@
+"""Tests for the cached style catalog of SokraticSource (no browser)."""
+from __future__ import annotations
+
+import logging
+from types import SimpleNamespace
+
+import pytest
+from presentations_module import PresentationDataError
+from presentations_module.sources.sokratic_source import SokraticSource, _GenCtx, _StyleCatalog
+
+
+class _FakeLocator:
+    def __init__(self, count: int) -> None:
+        self._count = count
+
+    async def count(self) -> int:
+        return self._count
+
+
+class _FakePage:
+    def __init__(self, cards: list[dict]) -> None:
+        self.cards = cards
+        self.probes = 0
+
+    async def evaluate(self, expression: str, arg=None):
+        name, _args = arg
+        assert name == "styleCards"
+        self.probes += 1
+        return {"installed": True, "value": self.cards}
+
+
+def _cards(*visible: bool) -> list[dict]:
+    return [{"index": index, "visible": flag} for index, flag in enumerate(visible)]
+
+
+def _source() -> SokraticSource:
+    playwright = SimpleNamespace(chromium=None)
+    return SokraticSource(
+        playwright,  # type: ignore[arg-type]
+        logger=logging.getLogger("test"),
+        generation_dir="",
+        generation_timeout=1000,
+    )
+
+
+@pytest.fixture(autouse=True)
+def _clear_catalogs(monkeypatch):
+    monkeypatch.setattr(SokraticSource, "_style_catalogs", {})
+
+
+@pytest.mark.asyncio
+async def test_catalog_is_probed_once_per_form_variant():
+    page = _FakePage(_cards(True, False, True))
+    ctx = _GenCtx(page=page, generation_dir="")  # type: ignore[arg-type]
+
+    first = await _source()._style_catalog(ctx, "redesign", _FakeLocator(3))
+    second = await _source()._style_catalog(ctx, "redesign", _FakeLocator(3))
+
+    assert first.visible_indices == [0, 2]
+    assert second is first
+    assert page.probes == 1
+
+    page.cards = _cards(True, True, True, True)
+    changed = await _source()._style_catalog(ctx, "redesign", _FakeLocator(4))
+    assert changed.count == 4
+    assert page.probes == 2
+
+    await _source()._style_catalog(ctx, "legacy", _FakeLocator(4))
+    assert page.probes == 3
+
+
+@pytest.mark.asyncio
+async def test_catalog_without_visible_styles_is_an_error():
+    ctx = _GenCtx(page=_FakePage(_cards(False, False)), generation_dir="")  # type: ignore[arg-type]
+
+    with pytest.raises(RuntimeError, match="No visible styles"):
+        await _source()._style_catalog(ctx, "redesign", _FakeLocator(2))
+    assert SokraticSource._style_catalogs == {}
+
+
+def test_pick_style_validates_index_and_picks_only_visible_styles():
+    catalog = _StyleCatalog(count=4, visible_indices=[1, 3], cards=[], probed_at=0.0)
+
+    assert SokraticSource._pick_style(catalog, "0") == 0
+    assert {SokraticSource._pick_style(catalog, None) for _ in range(50)} == {1, 3}
+    with pytest.raises(PresentationDataError, match="out of range"):
+        SokraticSource._pick_style(catalog, "4")
+    with pytest.raises(PresentationDataError, match="numeric"):
+        SokraticSource._pick_style(catalog, "abc")
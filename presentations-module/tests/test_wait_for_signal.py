@@ -0,0 +1,138 @@
+"""Tests for SokraticSource._wait_for_signal with fake page/locators (no browser)."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+from presentations_module.sources.sokratic_source import (
+    SokraticSource,
+    _GenCtx,
+    _ORDER_SUBMIT_PATH,
+    _SPEECH_TEXT_PATH,
+    _endpoint_response,
+)
+
+
+class _FakePage:
+    def __init__(self, response_after: float | None) -> None:
+        self.response_after = response_after
+
+    async def wait_for_event(self, event, predicate=None, timeout=None):
+        if self.response_after is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.response_after)
+        return SimpleNamespace(url="https://sokratic.ru/api/x")
+
+
+class _ResponseStreamPage:
+    """Page whose responses arrive in order; wait_for_event applies the predicate."""
+
+    def __init__(self, *responses: tuple[float, str, str]) -> None:
+        self.responses = responses
+
+    async def wait_for_event(self, event, predicate=None, timeout=None):
+        for delay, method, url in self.responses:
+            await asyncio.sleep(delay)
+            response = SimpleNamespace(url=url, status=200, request=SimpleNamespace(method=method))
+            if predicate(response):
+                return response
+        await asyncio.Event().wait()
+
+
+class _FakeLocator:
+    def __init__(self, ready_after: float | None) -> None:
+        self.ready_after = ready_after
+
+    async def wait_for(self, state=None, timeout=None):
+        if self.ready_after is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.ready_after)
+
+
+def _source() -> SokraticSource:
+    playwright = SimpleNamespace(chromium=None)
+    return SokraticSource(
+        playwright,  # type: ignore[arg-type]
+        logger=logging.getLogger("test"),
+        generation_dir="",
+        generation_timeout=1000,
+    )
+
+
+@pytest.mark.asyncio
+async def test_returns_first_signal_without_waiting_for_the_upper_bound():
+    source = _source()
+    ctx = _GenCtx(page=_FakePage(response_after=0.01), generation_dir="")
+    clicked = []
+
+    async def action():
+        clicked.append(True)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    signal = await source._wait_for_signal(
+        ctx,
+        "speech_text",
+        action=action,
+        response_predicate=lambda response: True,
+        locators=[(_FakeLocator(ready_after=None), "visible")],
+        timeout=5000,
+    )
+    assert signal == "response"
+    assert clicked == [True]
+    assert loop.time() - started < 1
+
+
+@pytest.mark.asyncio
+async def test_upper_bound_returns_none_when_nothing_fires():
+    source = _source()
+    ctx = _GenCtx(page=_FakePage(response_after=None), generation_dir="")
+
+    signal = await source._wait_for_signal(
+        ctx,
+        "speech_text",
+        response_predicate=lambda response: True,
+        locators=[(_FakeLocator(ready_after=0.01), "visible")],
+        timeout=1,
+    )
+    assert signal is None
+
+
+@pytest.mark.asyncio
+async def test_an_unrelated_post_does_not_pass_for_the_generate_response():
+    source = _source()
+    predicate = _endpoint_response("POST", _SPEECH_TEXT_PATH)
+    unrelated = _ResponseStreamPage(
+        (0.0, "POST", "https://sokratic.ru/api/telemetry/v2"),
+        (0.0, "PATCH", "https://sokratic.ru/api/orders/abc123"),
+        (0.0, "GET", "https://sokratic.ru/api/orders/abc123/speech/generate"),
+    )
+
+    signal = await source._wait_for_signal(
+        _GenCtx(page=unrelated, generation_dir=""), "speech_text", response_predicate=predicate, timeout=50
+    )
+    assert signal is None
+
+    generated = _ResponseStreamPage(
+        (0.0, "POST", "https://sokratic.ru/api/telemetry/v2"),
+        (0.01, "POST", "https://api.sokratic.ru/v1/orders/abc123/speech/generate"),
+    )
+    signal = await source._wait_for_signal(
+        _GenCtx(page=generated, generation_dir=""), "speech_text", response_predicate=predicate, timeout=5000
+    )
+    assert signal == "response"
+
+
+def test_order_submit_predicate_matches_only_the_submit_call():
+    predicate = _endpoint_response("POST", _ORDER_SUBMIT_PATH)
+
+    def _response(method: str, url: str, status: int = 200) -> SimpleNamespace:
+        return SimpleNamespace(url=url, status=status, request=SimpleNamespace(method=method))
+
+    assert predicate(_response("POST", "https://sokratic.ru/api/orders/abc123/generate"))
+    assert not predicate(_response("POST", "https://sokratic.ru/api/orders/abc123/generate", status=500))
+    assert not predicate(_response("PATCH", "https://sokratic.ru/api/orders/abc123"))
+    assert not predicate(_response("POST", "https://sokratic.ru/api/telemetry/v2"))
+    assert not predicate(_response("POST", "https://mc.yandex.ru/orders/abc123/submit"))
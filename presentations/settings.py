@@ -1,12 +1,15 @@
 """Django settings for the presentations project."""
 from __future__ import annotations
 
+import logging
 import os
 from pathlib import Path
 
 from dotenv import load_dotenv
 from celery.schedules import crontab
 
+logger = logging.getLogger(__name__)
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(BASE_DIR / ".env")
 
@@ -50,6 +53,20 @@ def _int_env(name: str, default: int) -> int:
         return default
 
 
+def _number_map_env(name: str, cast: type[int] | type[float]) -> dict[str, int | float]:
+    """Parse "key=number,..."; malformed items are skipped with a warning."""
+    parsed: dict[str, int | float] = {}
+    for item in _list_env(name):
+        key, sep, value = item.partition("=")
+        try:
+            if not sep or not key.strip():
+                raise ValueError(item)
+            parsed[key.strip()] = cast(value.strip())
+        except ValueError:
+            logger.warning("Ignoring malformed %s item %r", name, item)
+    return parsed
+
+
 SECRET_KEY = _read_env("DJANGO_SECRET_KEY", "django-insecure-REPLACE_WITH_YOUR_SECRET_KEY")
 DEBUG = _bool_env("DJANGO_DEBUG", True)
 ALLOWED_HOSTS = _list_env("DJANGO_ALLOWED_HOSTS")
@@ -122,6 +139,9 @@ DATABASES = {
         "PASSWORD": _read_env("DJANGO_DB_PASSWORD", ""),
         "HOST": _read_env("DJANGO_DB_HOST", "localhost"),
         "PORT": _read_env("DJANGO_DB_PORT", ""),
+        # Every Celery worker thread may hold a connection; see docs/runtime.md
+        # before raising this above 0 (close after each task).
+        "CONN_MAX_AGE": _int_env("DJANGO_DB_CONN_MAX_AGE", 0),
     }
 }
 
@@ -156,14 +176,19 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
+# Beat runs on every node; its tasks go to the node's own worker queue, and
+# cluster-wide work inside them is gated on the elected leader.
+CELERY_TASK_ROUTES = ("presentations_app.node_registry.route_node_local_task",)
 CELERY_BEAT_SCHEDULE = {
     "dispatch-pending-presentations": {
         "task": "presentations_app.tasks.dispatch_pending_presentations",
         "schedule": _int_env("PRESENTATIONS_DISPATCH_INTERVAL_S", 60),  # 1 minute
+        "options": {"expires": _int_env("PRESENTATIONS_DISPATCH_INTERVAL_S", 60)},
     },
     "hourly-telegram-presentation-stats": {
         "task": "presentations_app.tasks.send_hourly_telegram_stats",
         "schedule": crontab(minute=0),  # every hour at :00 (CELERY_TIMEZONE, UTC)
+        "options": {"expires": 1800},
     },
 }
 
@@ -183,10 +208,156 @@ PLAYWRIGHT_DEFAULT_TIMEOUT_MS = _int_env(
     90000,
 )
 PRESENTATIONS_SAVE_SCREENSHOTS = _bool_env("SAVE_SCREENSHOTS", True)
+# all | ring | off. "ring" keeps debug screenshots as JPEG in memory and writes
+# them only on failure or for SCREENSHOT_SAMPLE_PERCENT of successful decks.
+PRESENTATIONS_SCREENSHOT_MODE = _read_env(
+    "SCREENSHOT_MODE",
+    "all" if PRESENTATIONS_SAVE_SCREENSHOTS else "off",
+)
+PRESENTATIONS_SCREENSHOT_RING_SIZE = _int_env("SCREENSHOT_RING_SIZE", 20)
+PRESENTATIONS_SCREENSHOT_QUALITY = _int_env("SCREENSHOT_QUALITY", 60)
+PRESENTATIONS_SCREENSHOT_SAMPLE_PERCENT = _int_env("SCREENSHOT_SAMPLE_PERCENT", 1)
 PRESENTATIONS_SAVE_LOGS = _bool_env("SAVE_LOGS", False)
+# fast | humanized. "humanized" types the creation form character by character.
+PRESENTATIONS_FORM_FILL_MODE = _read_env("PRESENTATIONS_FORM_FILL_MODE", "fast")
+# Per-generation log.txt cap; later lines are counted, not written.
+PRESENTATIONS_MAX_LOG_BYTES = _int_env("MAX_LOG_BYTES", 5 * 1024 * 1024)
 PRESENTATIONS_HEADLESS = _bool_env("PRESENTATIONS_HEADLESS", True)
+# Chromium launch/render settings: standard | lean | full-chromium (see docs/runtime.md).
+PRESENTATIONS_RENDER_PROFILE = _read_env("PRESENTATIONS_RENDER_PROFILE", "standard")
 PRESENTATIONS_SITE_THROTTLE_DELAY_MS = _int_env("SITE_THROTTLE_DELAY_MS", 5000)
+# Request policy of every routed tab. Host and URL patterns use shell-style
+# wildcards; URL patterns match host + path. Resource types "none" blocks none.
+PRESENTATIONS_ALLOWED_HOSTS = _list_env("PRESENTATIONS_ALLOWED_HOSTS") or [
+    "sokratic.ru",
+    "*.sokratic.ru",
+    "storage.yandexcloud.net",
+]
+PRESENTATIONS_BLOCKED_RESOURCE_TYPES = _list_env("PRESENTATIONS_BLOCKED_RESOURCE_TYPES") or [
+    "image",
+    "media",
+    "font",
+]
+PRESENTATIONS_BLOCKED_URL_PATTERNS = _list_env("PRESENTATIONS_BLOCKED_URL_PATTERNS")
+PRESENTATIONS_BLOCK_TRACKERS = _bool_env("PRESENTATIONS_BLOCK_TRACKERS", True)
+# Cluster-wide pacing of Sokratic actions (submit, download) through Redis:
+# auto (on when the URL is Redis and a limit is set) | redis | off.
+# Rates are "action=count/seconds", concurrency "action=slots".
+PRESENTATIONS_SITE_GOVERNOR = _read_env("PRESENTATIONS_SITE_GOVERNOR", "auto")
+PRESENTATIONS_SITE_RATES = dict(
+    item.split("=", 1) for item in _list_env("PRESENTATIONS_SITE_RATES") if "=" in item
+)
+PRESENTATIONS_SITE_CONCURRENCY = dict(
+    item.split("=", 1) for item in _list_env("PRESENTATIONS_SITE_CONCURRENCY") if "=" in item
+)
+PRESENTATIONS_SITE_LEASE_S = _int_env("PRESENTATIONS_SITE_LEASE_S", 120)
 PRESENTATIONS_LEASE_TIMEOUT_S = _int_env("PRESENTATIONS_LEASE_TIMEOUT_S", 1800)
+# Claim pending presentations on PostgreSQL NOTIFY and on local tab release;
+# the dispatch beat tick then only catches what was missed.
+PRESENTATIONS_PUSH_DISPATCH = _bool_env("PRESENTATIONS_PUSH_DISPATCH", True)
+PRESENTATIONS_PUSH_DISPATCH_DEBOUNCE_MS = _int_env("PRESENTATIONS_PUSH_DISPATCH_DEBOUNCE_MS", 100)
+# Node-targeted dispatch: workers publish free slots to Redis and the relay
+# sends each claimed presentation to a node queue. auto | redis | off.
+PRESENTATIONS_NODE_REGISTRY = _read_env("PRESENTATIONS_NODE_REGISTRY", "auto")
+PRESENTATIONS_NODE_REGISTRY_REDIS_URL = _read_env(
+    "PRESENTATIONS_NODE_REGISTRY_REDIS_URL", CELERY_BROKER_URL
+)
+PRESENTATIONS_NODE_REGISTRY_KEY = _read_env(
+    "PRESENTATIONS_NODE_REGISTRY_KEY", "presentations:nodes"
+)
+PRESENTATIONS_NODE_HEARTBEAT_S = _int_env("PRESENTATIONS_NODE_HEARTBEAT_S", 5)
+PRESENTATIONS_NODE_HEARTBEAT_TTL_S = _int_env("PRESENTATIONS_NODE_HEARTBEAT_TTL_S", 20)
+# Leader lease for cluster-wide periodic work (relay resets, Telegram stats):
+# auto (redis when the URL is redis) | redis | off (every node leads).
+PRESENTATIONS_LEADER_ELECTION = _read_env("PRESENTATIONS_LEADER_ELECTION", "auto")
+PRESENTATIONS_LEADER_REDIS_URL = _read_env("PRESENTATIONS_LEADER_REDIS_URL", CELERY_BROKER_URL)
+PRESENTATIONS_LEADER_KEY = _read_env("PRESENTATIONS_LEADER_KEY", "presentations:leader")
+PRESENTATIONS_LEADER_LEASE_S = _int_env("PRESENTATIONS_LEADER_LEASE_S", 10)
+# Claim order: priority, then fair share between owners (weights are
+# "owner=weight", an owner key or a requester such as user:42), with one
+# priority level of aging per PRESENTATIONS_PRIORITY_AGING_S of waiting.
+# Off claims strictly oldest first.
+PRESENTATIONS_FAIR_QUEUE = _bool_env("PRESENTATIONS_FAIR_QUEUE", True)
+PRESENTATIONS_PRIORITY_AGING_S = _int_env("PRESENTATIONS_PRIORITY_AGING_S", 60)
+PRESENTATIONS_OWNER_WEIGHTS = _number_map_env("PRESENTATIONS_OWNER_WEIGHTS", float)
+# Retries: attempts per presentation, and the backoff per failure class
+# ("class=seconds" for site, browser and auth; data errors are not retried),
+# doubled per attempt up to the max, with jitter.
+PRESENTATIONS_MAX_ATTEMPTS = _int_env("PRESENTATIONS_MAX_ATTEMPTS", 3)
+PRESENTATIONS_RETRY_BACKOFF_S = {
+    "browser": 15,
+    "auth": 30,
+    "site": 300,
+    **_number_map_env("PRESENTATIONS_RETRY_BACKOFF_S", int),
+}
+PRESENTATIONS_RETRY_BACKOFF_MAX_S = _int_env("PRESENTATIONS_RETRY_BACKOFF_MAX_S", 3600)
+# Orders waiting on server-side generation hold no tab; cap them separately.
+# Celery worker concurrency should be at least this value.
+PRESENTATIONS_MAX_ORDERS_IN_FLIGHT = _int_env(
+    "PRESENTATIONS_MAX_ORDERS_IN_FLIGHT",
+    PRESENTATIONS_MAX_TABS * 2,
+)
+PRESENTATIONS_ORDER_POLL_INTERVAL_S = _int_env("PRESENTATIONS_ORDER_POLL_INTERVAL_S", 15)
+PRESENTATIONS_ORDER_PROBE_TIMEOUT_MS = _int_env("PRESENTATIONS_ORDER_PROBE_TIMEOUT_MS", 5000)
+# Tabs are spread over several Chromium processes so one crash only loses its
+# own tabs. 0 tabs per browser means ceil(MAX_TABS / BROWSER_COUNT).
+PRESENTATIONS_BROWSER_COUNT = _int_env("PRESENTATIONS_BROWSER_COUNT", 1)
+PRESENTATIONS_TABS_PER_BROWSER = _int_env("PRESENTATIONS_TABS_PER_BROWSER", 0)
+# Adaptive tab budget: grows by one tab per healthy interval up to
+# PRESENTATIONS_MAX_TABS and is cut by 30 % under stress, down to MIN_TABS.
+PRESENTATIONS_ADAPTIVE_TABS = _bool_env("PRESENTATIONS_ADAPTIVE_TABS", True)
+PRESENTATIONS_MIN_TABS = _int_env("PRESENTATIONS_MIN_TABS", 1)
+PRESENTATIONS_TAB_CONTROL_INTERVAL_S = _int_env("PRESENTATIONS_TAB_CONTROL_INTERVAL_S", 30)
+PRESENTATIONS_TAB_CPU_HIGH_PCT = _int_env("PRESENTATIONS_TAB_CPU_HIGH_PCT", 90)
+PRESENTATIONS_TAB_MEMORY_HIGH_PCT = _int_env("PRESENTATIONS_TAB_MEMORY_HIGH_PCT", 90)
+PRESENTATIONS_TAB_FAILURE_RATE_HIGH_PCT = _int_env("PRESENTATIONS_TAB_FAILURE_RATE_HIGH_PCT", 25)
+PRESENTATIONS_CHROMIUM_RSS_LIMIT_MB = _int_env("PRESENTATIONS_CHROMIUM_RSS_LIMIT_MB", 0)
+# A browser is replaced by a fresh one (after its tabs drain) once it has served
+# this many generations, been up this long or grown past this RSS; 0 disables.
+PRESENTATIONS_BROWSER_MAX_GENERATIONS = _int_env("PRESENTATIONS_BROWSER_MAX_GENERATIONS", 200)
+PRESENTATIONS_BROWSER_MAX_UPTIME_S = _int_env("PRESENTATIONS_BROWSER_MAX_UPTIME_S", 6 * 3600)
+PRESENTATIONS_BROWSER_MAX_RSS_MB = _int_env("PRESENTATIONS_BROWSER_MAX_RSS_MB", 0)
+# Routed tabs parked on the landing page per authenticated browser.
+PRESENTATIONS_WARM_TABS = _int_env("PRESENTATIONS_WARM_TABS", 2)
+PRESENTATIONS_WARM_TAB_MAX_AGE_S = _int_env("PRESENTATIONS_WARM_TAB_MAX_AGE_S", 300)
+# Fetch exports straight from the URL the UI would hit (learned from UI
+# downloads or configured as "PowerPoint=https://...{order_id}...,PDF=...");
+# the "Скачать" menu stays as fallback.
+PRESENTATIONS_DIRECT_EXPORT = _bool_env("PRESENTATIONS_DIRECT_EXPORT", True)
+PRESENTATIONS_EXPORT_URL_TEMPLATES = dict(
+    item.split("=", 1) for item in _list_env("PRESENTATIONS_EXPORT_URL_TEMPLATES") if "=" in item
+)
+# On-disk cache of Sokratic JS/CSS bundles served through page.route; 0 MB disables.
+PRESENTATIONS_ASSET_CACHE_MB = _int_env("PRESENTATIONS_ASSET_CACHE_MB", 256)
+PRESENTATIONS_ASSET_CACHE_DIR = _read_env(
+    "PRESENTATIONS_ASSET_CACHE_DIR",
+    str(BASE_DIR / "storage" / "asset_cache"),
+)
+# Sokratic login state shared by all workers/nodes: auto | redis | file | off.
+PRESENTATIONS_SESSION_STORE = _read_env("PRESENTATIONS_SESSION_STORE", "auto")
+PRESENTATIONS_SESSION_REDIS_URL = _read_env("PRESENTATIONS_SESSION_REDIS_URL", CELERY_BROKER_URL)
+PRESENTATIONS_SESSION_REDIS_KEY = _read_env(
+    "PRESENTATIONS_SESSION_REDIS_KEY",
+    "presentations:sokratic:session",
+)
+PRESENTATIONS_SESSION_FILE = _read_env(
+    "PRESENTATIONS_SESSION_FILE",
+    str(BASE_DIR / "storage" / "sokratic_session.json"),
+)
+PRESENTATIONS_SESSION_MAX_AGE_S = _int_env("PRESENTATIONS_SESSION_MAX_AGE_S", 12 * 3600)
+PRESENTATIONS_SESSION_LOCK_TIMEOUT_S = _int_env("PRESENTATIONS_SESSION_LOCK_TIMEOUT_S", 120)
+PRESENTATIONS_SITE_GOVERNOR_REDIS_URL = _read_env(
+    "PRESENTATIONS_SITE_GOVERNOR_REDIS_URL", CELERY_BROKER_URL
+)
+PRESENTATIONS_SITE_GOVERNOR_KEY = _read_env(
+    "PRESENTATIONS_SITE_GOVERNOR_KEY", "presentations:sokratic:governor"
+)
+# Sokratic accounts as "user:password[:max_tabs],..."; empty falls back to
+# SOKRATIC_USERNAME/SOKRATIC_PASSWORD. Each account gets its own browser(s).
+SOKRATIC_ACCOUNTS = _list_env("SOKRATIC_ACCOUNTS")
+# Consecutive login/tab-phase failures before an account stops taking new orders.
+PRESENTATIONS_ACCOUNT_QUARANTINE_FAILURES = _int_env("PRESENTATIONS_ACCOUNT_QUARANTINE_FAILURES", 3)
+PRESENTATIONS_ACCOUNT_QUARANTINE_S = _int_env("PRESENTATIONS_ACCOUNT_QUARANTINE_S", 900)
 
 S3_BUCKET = _read_env("S3_BUCKET")
 S3_PREFIX = _read_env("S3_PREFIX", "")
@@ -0,0 +1,479 @@
+"""Sharded Playwright browser pool shared by all Celery tasks of a worker."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from django.conf import settings
+from playwright.async_api import async_playwright, Page, Playwright
+from playwright._impl._errors import TargetClosedError, TimeoutError as PlaywrightTimeoutError
+
+from presentations_module import (
+    AssetCache,
+    AuthenticationError,
+    PresentationDataError,
+    SokraticSource,
+)
+
+from .browser_sessions import SessionManager
+from .browser_shards import BrowserShard, ShardFleet, SourceFactory
+from .order_monitor import OrderMonitor
+from .site_governor import build_site_governor
+from .sokratic_accounts import AccountPool, configured_accounts
+from .tab_controller import TabBudget
+
+logger = logging.getLogger(__name__)
+
+
+class _LoopThread:
+    """Daemon thread running the pool's event loop, started on first use."""
+
+    def __init__(self, init: Callable[[], Awaitable[None]]) -> None:
+        self.lock = threading.Lock()
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._init = init
+        self._thread: threading.Thread | None = None
+        self._init_error: Exception | None = None
+        self._ready = threading.Event()
+
+    def _main(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._init())
+        except Exception as exc:  # pragma: no cover
+            self._init_error = exc
+            logger.exception("BrowserPool: failed to initialize: %s", exc)
+        finally:
+            self._ready.set()
+        if self._init_error is not None:
+            return
+        self.loop.run_forever()
+
+    def ensure_running(self) -> None:
+        need_wait = False
+        with self.lock:
+            if self._thread is not None and self._thread.is_alive():
+                if self._ready.is_set():
+                    if self._init_error is not None:
+                        raise RuntimeError(
+                            f"BrowserPool: init failed: {self._init_error}"
+                        ) from self._init_error
+                    return
+                need_wait = True
+            else:
+                self._ready.clear()
+                self._init_error = None
+                self._thread = threading.Thread(target=self._main, daemon=True, name="browser-pool")
+                self._thread.start()
+                need_wait = True
+        if need_wait and not self._ready.wait(timeout=60):
+            raise RuntimeError("BrowserPool: browser did not start in time")
+        if self._init_error is not None:
+            raise RuntimeError(
+                f"BrowserPool: init failed: {self._init_error}"
+            ) from self._init_error
+
+    def is_running(self) -> bool:
+        """Started and initialized, without starting it."""
+        with self.lock:
+            return (
+                self._thread is not None
+                and self._thread.is_alive()
+                and self._ready.is_set()
+                and self._init_error is None
+            )
+
+
+class BrowserPool:
+    """N Chromium processes with M tabs each, shared across all Celery tasks.
+
+    Runs in a background daemon thread with its own persistent event loop.
+    ``tab_slot`` places every task on the least-loaded healthy shard, capped by
+    PRESENTATIONS_MAX_TABS overall. The shards themselves (launch, crash
+    relaunch, recycling, warm tabs) are a ShardFleet (browser_shards.py), and
+    their logins a SessionManager (browser_sessions.py). Orders waiting for
+    server-side generation hold no tab; they are tracked as "orders in flight"
+    and watched by a single OrderMonitor probe tab. With
+    PRESENTATIONS_ADAPTIVE_TABS the global budget is resized at runtime by a
+    TabBudget between PRESENTATIONS_MIN_TABS and PRESENTATIONS_MAX_TABS.
+    Every shard is logged in with one of the configured Sokratic accounts;
+    new orders go to the least-loaded account that is not quarantined, and
+    later phases of an order stay on its account.
+    """
+
+    def __init__(self) -> None:
+        self._runner = _LoopThread(self._init)
+        self._accounts = AccountPool()
+        self._fleet = ShardFleet(SourceFactory.from_settings(), load_session=self._load_session)
+        self._sessions = SessionManager(self._fleet, record_failure=self._record_account_failure)
+        self._tab_budget = TabBudget()
+        self._orders_in_flight = 0
+        self._order_monitors: dict[str, OrderMonitor] = {}
+        self._capacity_listeners: list[Callable[[], None]] = []
+
+    # --- internal ---
+
+    async def _init(self) -> None:
+        playwright = await async_playwright().start()
+        self._accounts = AccountPool(configured_accounts())
+        # Every account needs at least one browser of its own.
+        browser_count = max(settings.PRESENTATIONS_BROWSER_COUNT, len(self._accounts), 1)
+        tabs_per_browser = settings.PRESENTATIONS_TABS_PER_BROWSER or math.ceil(
+            settings.PRESENTATIONS_MAX_TABS / browser_count
+        )
+        accounts = self._accounts.accounts
+        shards = [
+            BrowserShard(
+                index=index,
+                capacity=max(tabs_per_browser, 1),
+                account=accounts[index % len(accounts)] if accounts else None,
+            )
+            for index in range(browser_count)
+        ]
+        for account in accounts:
+            shard_capacity = sum(s.capacity for s in shards if s.account is account)
+            account.capacity = (
+                min(account.max_tabs, shard_capacity) if account.max_tabs else shard_capacity
+            )
+        self._sessions.configure(accounts)
+        sources = self._fleet.sources
+        try:
+            sources.site_governor = build_site_governor()
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("BrowserPool: site governor unavailable, actions are not paced: %s", exc)
+            sources.site_governor = None
+        if settings.PRESENTATIONS_ASSET_CACHE_MB > 0:
+            sources.asset_cache = AssetCache(
+                settings.PRESENTATIONS_ASSET_CACHE_DIR,
+                max_bytes=settings.PRESENTATIONS_ASSET_CACHE_MB * 1024 * 1024,
+                logger=logger,
+            )
+        self._tab_budget.start(
+            active_tabs=lambda: self._fleet.active_tabs, on_change=self._fleet.notify_slots
+        )
+        await self._fleet.start(playwright, shards)
+        logger.info(
+            "BrowserPool: started (browsers=%d, accounts=%d, tabs_per_browser=%d, max_tabs=%d, "
+            "worker_pid=%d)",
+            browser_count,
+            len(self._accounts),
+            tabs_per_browser,
+            settings.PRESENTATIONS_MAX_TABS,
+            os.getpid(),
+        )
+
+    async def _load_session(self, shard: BrowserShard) -> dict[str, Any] | None:
+        return await self._sessions.load(shard)
+
+    def _pick_shard(self, account: str | None = None) -> BrowserShard | None:
+        """Least-loaded healthy shard with a free tab, if the global budget allows.
+
+        Without *account*, shards of the least-loaded account that takes new
+        orders win. With it, only that account's shards qualify; its tab cap
+        still applies but a quarantine does not, so its orders can finish.
+        """
+        if self._fleet.active_tabs >= self.tab_budget:
+            return None
+        now = time.monotonic()
+        candidates = []
+        for shard in self._fleet.shards:
+            if not shard.admits():
+                continue
+            owner = shard.account
+            if account is not None:
+                if owner is None or owner.username != account:
+                    continue
+                if owner.capacity and owner.active_tabs >= owner.capacity:
+                    continue
+            elif owner is not None and not owner.admits(now):
+                continue
+            candidates.append(shard)
+        if not candidates:
+            return None
+        return min(
+            candidates,
+            key=lambda shard: (
+                shard.account.load if shard.account else 0.0,
+                shard.active_tabs,
+                shard.index,
+            ),
+        )
+
+    def _record_account_failure(self, shard: BrowserShard, reason: str) -> None:
+        """Count a failure against *shard*'s account and quarantine it past the threshold."""
+        if shard.account is None:
+            return
+        quarantine_s = self._accounts.record_failure(shard.account, reason)
+        if quarantine_s is None:
+            return
+        # Wake tasks waiting for a tab once the account takes orders again.
+        loop = asyncio.get_running_loop()
+        loop.call_later(quarantine_s, lambda: loop.create_task(self._fleet.notify_slots()))
+
+    def _order_monitor(self, account: str | None) -> OrderMonitor:
+        """Order monitor for *account*; orders are only visible to the account that placed them."""
+        key = account or ""
+        monitor = self._order_monitors.get(key)
+        if monitor is None:
+            monitor = OrderMonitor(
+                build_source=lambda: self._build_monitor_source(account),
+                poll_interval_s=settings.PRESENTATIONS_ORDER_POLL_INTERVAL_S,
+                probe_timeout_ms=settings.PRESENTATIONS_ORDER_PROBE_TIMEOUT_MS,
+            )
+            self._order_monitors[key] = monitor
+        return monitor
+
+    def _build_monitor_source(self, account: str | None = None) -> SokraticSource:
+        """Source for the order monitor, bound to the least-loaded healthy shard of *account*."""
+        shards = [
+            shard
+            for shard in self._fleet.shards
+            if shard.healthy
+            and not shard.recycling
+            and (account is None or (shard.account is not None and shard.account.username == account))
+        ]
+        if not shards:
+            raise RuntimeError(f"BrowserPool: no healthy browser for the order monitor (account={account})")
+        shard = min(shards, key=lambda s: (s.active_tabs, s.index))
+        return shard.bind(self.build_source(logging.getLogger("presentations_module")))
+
+    # --- public ---
+
+    def _ensure_running(self) -> None:
+        self._runner.ensure_running()
+
+    @property
+    def playwright(self) -> Playwright:
+        self._ensure_running()
+        assert self._fleet.playwright is not None
+        return self._fleet.playwright
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        self._ensure_running()
+        assert self._runner.loop is not None
+        return self._runner.loop
+
+    @property
+    def tab_budget(self) -> int:
+        """Upper bound on concurrently open task tabs across all shards."""
+        budget = self._tab_budget.budget
+        budget = min(budget, sum(shard.capacity for shard in self._fleet.shards) or budget)
+        if self._accounts:
+            budget = min(budget, self._accounts.capacity or budget)
+        return budget
+
+    @property
+    def account_names(self) -> list[str]:
+        """Usernames of the configured Sokratic accounts, in shard order."""
+        self._ensure_running()
+        return self._accounts.names
+
+    @property
+    def local_tab_budget(self) -> int:
+        """Live tab budget without initializing the pool (MAX_TABS before start)."""
+        if self._runner.is_running():
+            return self.tab_budget
+        return settings.PRESENTATIONS_MAX_TABS
+
+    def record_stage(self, stage: str, seconds: float) -> None:
+        """Feed one observed stage duration to the tab controller."""
+        self._tab_budget.record_stage(stage, seconds)
+
+    @property
+    def active_tabs(self) -> int:
+        self._ensure_running()
+        return self._fleet.active_tabs
+
+    @property
+    def local_active_tabs(self) -> int:
+        """Active tab count without triggering pool initialization."""
+        if self._runner.is_running():
+            return self._fleet.active_tabs
+        return 0
+
+    @property
+    def local_orders_in_flight(self) -> int:
+        """Orders between submission and harvest completion, without initializing the pool."""
+        if self._runner.is_running():
+            return self._orders_in_flight
+        return 0
+
+    def local_snapshot(self) -> dict[str, Any] | None:
+        """Pool state for logs/metrics, or None when the pool is not running."""
+        if not self._runner.is_running():
+            return None
+        sources = self._fleet.sources
+        return {
+            "worker_pid": os.getpid(),
+            "tab_budget": self.tab_budget,
+            "render_profile": sources.render_profile.name,
+            **self._tab_budget.snapshot(),
+            "active_tabs": self._fleet.active_tabs,
+            "orders_in_flight": self._orders_in_flight,
+            "monitored_orders": sum(m.pending_count for m in self._order_monitors.values()),
+            "accounts": self._accounts.snapshot(),
+            "asset_cache": sources.asset_cache.snapshot() if sources.asset_cache else None,
+            "site_governor": sources.site_governor.snapshot() if sources.site_governor else None,
+            "network": SokraticSource.network_totals(),
+            "shards": [shard.snapshot() for shard in self._fleet.shards],
+        }
+
+    def build_source(self, logger_obj: logging.Logger, storage: Any = None) -> SokraticSource:
+        """SokraticSource configured from settings; bind it to a shard before use."""
+        return self._fleet.sources.build(self.playwright, logger_obj, storage)
+
+    @asynccontextmanager
+    async def order_in_flight(self, task_id: str) -> AsyncIterator[None]:
+        """Count *task_id* as an order in flight for the whole generation."""
+        self._ensure_running()
+        self._orders_in_flight += 1
+        logger.debug(
+            "Order in flight: task_id=%s orders_in_flight=%d worker_pid=%d",
+            task_id,
+            self._orders_in_flight,
+            os.getpid(),
+        )
+        try:
+            yield
+        finally:
+            self._orders_in_flight -= 1
+            self._notify_capacity_freed()
+
+    async def wait_for_order(
+        self, order_url: str, timeout_s: float, account: str | None = None
+    ) -> None:
+        """Park until *account*'s order monitor sees *order_url* ready (no tab held)."""
+        self._ensure_running()
+        await self._order_monitor(account).wait_until_ready(order_url, timeout_s)
+
+    @asynccontextmanager
+    async def tab_slot(self, task_id: str, account: str | None = None) -> AsyncIterator[BrowserShard]:
+        """Reserve one tab on the least-loaded healthy shard (of *account*, if given)."""
+        self._ensure_running()
+        slots_changed = self._fleet.slots_changed
+        assert slots_changed is not None
+        if account is not None and self._accounts.get(account) is None:
+            raise RuntimeError(f"BrowserPool: Sokratic account {account!r} is not configured")
+        async with slots_changed:
+            await slots_changed.wait_for(lambda: self._pick_shard(account) is not None)
+            shard = self._pick_shard(account)
+            assert shard is not None
+            if shard.account is not None:
+                shard.account.active_tabs += 1
+            shard.active_tabs += 1
+            shard.served_tasks.add(task_id)
+            self._fleet.active_tabs += 1
+            active_now = self._fleet.active_tabs
+        logger.info(
+            "Browser tab acquired: task_id=%s active_tabs=%d/%d shard=%s shard_tabs=%d/%d worker_pid=%d",
+            task_id,
+            active_now,
+            self.tab_budget,
+            shard.label,
+            shard.active_tabs,
+            shard.capacity,
+            os.getpid(),
+        )
+        try:
+            yield shard
+        except Exception as exc:
+            self._record_tab_failure(shard, exc)
+            raise
+        else:
+            self._tab_budget.record_outcome(failed=False)
+            if shard.account is not None:
+                shard.account.record_success()
+        finally:
+            async with slots_changed:
+                if shard.account is not None:
+                    shard.account.active_tabs -= 1
+                shard.active_tabs -= 1
+                self._fleet.active_tabs -= 1
+                active_now = self._fleet.active_tabs
+                slots_changed.notify_all()
+            logger.info(
+                "Browser tab released: task_id=%s active_tabs=%d/%d shard=%s shard_tabs=%d/%d worker_pid=%d",
+                task_id,
+                active_now,
+                self.tab_budget,
+                shard.label,
+                shard.active_tabs,
+                shard.capacity,
+                os.getpid(),
+            )
+            self._fleet.maybe_recycle(shard)
+            self._notify_capacity_freed()
+
+    def _record_tab_failure(self, shard: BrowserShard, exc: Exception) -> None:
+        """Charge a failed tab phase to the tab budget, the browser or the account."""
+        if isinstance(exc, PresentationDataError):
+            # The request was at fault, not the account or the tab.
+            return
+        if isinstance(exc, AuthenticationError):
+            # Logged out: drop the session and log in again on the next tab. A
+            # failed login was already counted against the account.
+            self._sessions.invalidate(shard)
+            return
+        if isinstance(exc, TargetClosedError):
+            self._tab_budget.record_outcome(failed=True)
+            if shard.browser is not None and not shard.browser.is_connected():
+                self._fleet.schedule_relaunch(shard)
+            else:
+                self._record_account_failure(shard, "tab closed")
+        elif isinstance(exc, (asyncio.TimeoutError, TimeoutError, PlaywrightTimeoutError)):
+            self._tab_budget.record_outcome(failed=True)
+            self._record_account_failure(shard, "tab timeout")
+        else:
+            self._record_account_failure(shard, f"tab error: {exc.__class__.__name__}")
+
+    def add_capacity_listener(self, callback: Callable[[], None]) -> None:
+        """Call *callback* whenever a tab or an order-in-flight slot is released.
+
+        Runs on the pool's event loop, so it must return at once (e.g. wake a thread).
+        """
+        self._capacity_listeners.append(callback)
+
+    def _notify_capacity_freed(self) -> None:
+        for callback in self._capacity_listeners:
+            try:
+                callback()
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("BrowserPool: capacity listener failed: %s", exc)
+
+    def run(self, coro: Any) -> Any:
+        """Submit *coro* to the shared event loop and block until it completes."""
+        self._ensure_running()
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return future.result()
+
+    async def take_warm_tab(self, shard: BrowserShard) -> Page | None:
+        """Pop a ready landing-page tab from *shard*, or None if none is warm."""
+        self._ensure_running()
+        return await self._fleet.take_warm_tab(shard)
+
+    async def open_tab(self, shard: BrowserShard) -> Page:
+        self._ensure_running()
+        return await self._fleet.open_tab(shard)
+
+    async def ensure_authenticated(
+        self,
+        shard: BrowserShard,
+        *,
+        generation_id: str,
+        logger_obj: logging.Logger,
+        storage: Any,
+    ) -> None:
+        """Log *shard* in, from its account's stored session when there is a valid one."""
+        self._ensure_running()
+        await self._sessions.ensure_authenticated(
+            shard, generation_id=generation_id, logger_obj=logger_obj, storage=storage
+        )
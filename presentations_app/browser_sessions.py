@@ -0,0 +1,307 @@
+"""Sokratic login state of the pool's browser shards.
+
+A shard starts from its account's stored session (see session_store) when
+there is a valid one and logs in for real only otherwise. One process per
+account refreshes the stored session while the others wait for it. A stored
+session is checked against the site once before it is trusted; one the site
+rejects is cleared from the store.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Callable
+
+from django.conf import settings
+from playwright._impl._errors import TargetClosedError
+from playwright.async_api import Page
+
+from presentations_module import AuthenticationError
+
+from .browser_shards import BrowserShard, ShardFleet
+from .session_store import SessionStore, build_session_store, is_session_state_valid
+from .sokratic_accounts import SokraticAccount
+
+logger = logging.getLogger(__name__)
+
+# add_cookies() covers only half of a storage_state; the origins' localStorage
+# is seeded by an init script, without overwriting keys the site set since.
+_RESTORE_LOCAL_STORAGE_JS = """
+(origins => {
+  const stored = origins.find(entry => entry.origin === window.location.origin);
+  if (!stored) return;
+  try {
+    for (const {name, value} of stored.localStorage || []) {
+      if (window.localStorage.getItem(name) === null) window.localStorage.setItem(name, value);
+    }
+  } catch (e) {}
+})(%s);
+"""
+
+
+class SessionManager:
+    """Stored-session adoption and real logins, per shard and account.
+
+    Must be used from the browser-pool event loop. *record_failure* counts a
+    failed login against the shard's account.
+    """
+
+    _AUTH_COOLDOWN_S = 30
+
+    def __init__(
+        self, fleet: ShardFleet, *, record_failure: Callable[[BrowserShard, str], None]
+    ) -> None:
+        self._fleet = fleet
+        self._record_failure = record_failure
+        self._stores: dict[str, SessionStore | None] = {}
+
+    def configure(self, accounts: list[SokraticAccount]) -> None:
+        """Open the session store of every account (None if unavailable)."""
+        for account in accounts:
+            # A single account keeps the unsuffixed session key of older releases.
+            store_key = account.key if len(accounts) > 1 else None
+            try:
+                self._stores[account.username] = build_session_store(store_key)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning(
+                    "BrowserPool: session store unavailable, logging in per browser: %s", exc
+                )
+                self._stores[account.username] = None
+
+    def store_for(self, shard: BrowserShard) -> SessionStore | None:
+        if shard.account is None:
+            return None
+        return self._stores.get(shard.account.username)
+
+    async def load(self, shard: BrowserShard) -> dict[str, Any] | None:
+        """Stored login state of *shard*'s account if it is still valid, else None."""
+        store = self.store_for(shard)
+        if store is None:
+            return None
+        try:
+            record = await asyncio.to_thread(store.load)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("BrowserPool: failed to load stored session: %s", exc)
+            return None
+        if not is_session_state_valid(record, max_age_s=settings.PRESENTATIONS_SESSION_MAX_AGE_S):
+            return None
+        assert record is not None
+        return record["storage_state"]
+
+    async def _adopt_stored_session(
+        self, shard: BrowserShard, *, logger_obj: logging.Logger, storage: Any
+    ) -> bool:
+        """Copy a valid stored session into the running context of *shard* and check it."""
+        storage_state = await self.load(shard)
+        if storage_state is None or shard.context is None:
+            return False
+        await shard.context.add_cookies(storage_state["cookies"])
+        if storage_state.get("origins"):
+            await shard.context.add_init_script(
+                script=_RESTORE_LOCAL_STORAGE_JS % json.dumps(storage_state["origins"])
+            )
+        if not await self._has_session(shard, logger_obj=logger_obj, storage=storage):
+            await self._discard_session(shard, "stored session rejected")
+            return False
+        shard.is_authenticated = True
+        shard.session_verified = True
+        shard.auth_failed_until = 0.0
+        self._fleet.schedule_refill(shard)
+        logger.info(
+            "BrowserPool: adopted stored session (worker_pid=%d, shard=%s)",
+            os.getpid(),
+            shard.label,
+        )
+        return True
+
+    async def _has_session(
+        self, shard: BrowserShard, *, logger_obj: logging.Logger, storage: Any
+    ) -> bool:
+        """Ask the site whether *shard*'s context is logged in."""
+        source = shard.bind(self._fleet.build_source(logger_obj, storage))
+        try:
+            return await source.has_session()
+        finally:
+            source.page = None
+            source.context = None
+            source.browser = None
+
+    def invalidate(self, shard: BrowserShard) -> None:
+        """Forget the session of *shard* after the site logged it out mid-task.
+
+        The next ensure_authenticated logs in again. Must be called from the
+        pool loop.
+        """
+        if not shard.is_authenticated:
+            # Cooldowns and failed logins: there is no session to drop.
+            return
+        warm_pages = self._reset(shard, "logged out")
+        asyncio.get_running_loop().create_task(
+            self._clear_session(shard, warm_pages), name=f"browser-shard-{shard.index}-logout"
+        )
+
+    async def _discard_session(self, shard: BrowserShard, reason: str) -> None:
+        """Drop a session the site no longer accepts from *shard* and the store."""
+        await self._clear_session(shard, self._reset(shard, reason))
+
+    @staticmethod
+    def _reset(shard: BrowserShard, reason: str) -> list[Page]:
+        """Mark *shard* logged out; return its warm tabs, parked while it was."""
+        shard.is_authenticated = False
+        shard.session_verified = False
+        logger.warning(
+            "BrowserPool: session discarded, %s (worker_pid=%d, shard=%s)",
+            reason,
+            os.getpid(),
+            shard.label,
+        )
+        warm_pages = [page for page, _opened_at in shard.warm_pages]
+        shard.warm_pages = []
+        return warm_pages
+
+    async def _clear_session(self, shard: BrowserShard, warm_pages: list[Page]) -> None:
+        for page in warm_pages:
+            await self._fleet.close_page(page)
+        store = self.store_for(shard)
+        if store is None:
+            return
+        try:
+            await asyncio.to_thread(store.clear)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("BrowserPool: failed to clear stored session: %s", exc)
+
+    async def ensure_authenticated(
+        self,
+        shard: BrowserShard,
+        *,
+        generation_id: str,
+        logger_obj: logging.Logger,
+        storage: Any,
+    ) -> None:
+        if shard.is_authenticated and shard.session_verified:
+            return
+        self._check_cooldown(shard)
+
+        async with shard.auth_lock:
+            if shard.is_authenticated and shard.session_verified:
+                return
+            self._check_cooldown(shard)
+
+            if shard.is_authenticated:
+                # Launched from a stored session: check it once before trusting it.
+                if await self._has_session(shard, logger_obj=logger_obj, storage=storage):
+                    shard.session_verified = True
+                    return
+                await self._discard_session(shard, "stored session rejected")
+            elif await self._adopt_stored_session(shard, logger_obj=logger_obj, storage=storage):
+                return
+
+            store = self.store_for(shard)
+            lock_handle: Any = None
+            if store is not None:
+                # One process refreshes the stored session; the others wait
+                # here and then adopt what it saved.
+                try:
+                    lock_handle = await asyncio.to_thread(
+                        store.acquire_refresh_lock,
+                        settings.PRESENTATIONS_SESSION_LOCK_TIMEOUT_S,
+                    )
+                except Exception as exc:  # pylint: disable=broad-except
+                    logger.warning("BrowserPool: session refresh lock unavailable: %s", exc)
+            try:
+                if store is not None and await self._adopt_stored_session(
+                    shard, logger_obj=logger_obj, storage=storage
+                ):
+                    return
+                await self._login(
+                    shard,
+                    generation_id=generation_id,
+                    logger_obj=logger_obj,
+                    storage=storage,
+                )
+            finally:
+                if store is not None and lock_handle is not None:
+                    await asyncio.to_thread(store.release_refresh_lock, lock_handle)
+
+    @staticmethod
+    def _check_cooldown(shard: BrowserShard) -> None:
+        now = time.monotonic()
+        if now < shard.auth_failed_until:
+            raise AuthenticationError(
+                f"BrowserPool: auth on cooldown, retry in {shard.auth_failed_until - now:.0f}s"
+            )
+
+    async def _login(
+        self,
+        shard: BrowserShard,
+        *,
+        generation_id: str,
+        logger_obj: logging.Logger,
+        storage: Any,
+    ) -> None:
+        """Run the real login flow on *shard* and persist the resulting session."""
+        account = shard.account
+        if account is None:
+            raise RuntimeError("SOKRATIC_ACCOUNTS or SOKRATIC_USERNAME/SOKRATIC_PASSWORD are not set")
+
+        logger.info(
+            "BrowserPool: opening auth tab (worker_pid=%d, shard=%s, account=%s)",
+            os.getpid(),
+            shard.label,
+            account.username,
+        )
+        auth_source = shard.bind(self._fleet.build_source(logger_obj, storage))
+        auth_source.page = await self._fleet.open_tab(shard)
+        if auth_source.playwright_default_timeout is not None:
+            auth_source.page.set_default_timeout(auth_source.playwright_default_timeout)
+
+        try:
+            await auth_source.authenticate(
+                login=account.username,
+                password=account.password,
+                generation_id=f"auth-{generation_id}",
+            )
+            account.record_success()
+            shard.is_authenticated = True
+            shard.session_verified = True
+            shard.auth_failed_until = 0.0
+            self._fleet.schedule_refill(shard)
+            logger.info(
+                "BrowserPool: shared authentication completed (worker_pid=%d, shard=%s)",
+                os.getpid(),
+                shard.label,
+            )
+        except Exception as exc:
+            shard.auth_failed_until = time.monotonic() + self._AUTH_COOLDOWN_S
+            self._record_failure(shard, f"auth failed: {exc.__class__.__name__}")
+            logger.warning(
+                "BrowserPool: auth failed, cooldown %ds (worker_pid=%d, shard=%s)",
+                self._AUTH_COOLDOWN_S,
+                os.getpid(),
+                shard.label,
+            )
+            if isinstance(exc, TargetClosedError):
+                raise
+            raise AuthenticationError(f"Sokratic login failed: {exc}") from exc
+        finally:
+            if auth_source.page is not None:
+                try:
+                    await auth_source.page.close()
+                except Exception:  # pylint: disable=broad-except
+                    logger.debug("BrowserPool: auth tab already closed")
+            auth_source.page = None
+            auth_source.context = None
+            auth_source.browser = None
+
+        store = self.store_for(shard)
+        if store is not None and shard.context is not None:
+            try:
+                storage_state = await shard.context.storage_state()
+                await asyncio.to_thread(store.save, storage_state)
+                logger.info("BrowserPool: stored session saved (shard=%s)", shard.label)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("BrowserPool: failed to save session: %s", exc)
@@ -0,0 +1,533 @@
+"""Browser shards of the pool and their lifecycle.
+
+A shard is one Chromium process with its own context and tab budget.
+:class:`ShardFleet` launches the shards, relaunches a crashed one after its
+tabs drain, replaces a browser past its recycling limits and keeps warm
+landing-page tabs on authenticated shards. Tab placement, accounts and logins
+stay with the pool (see browser_pool and browser_sessions).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from django.conf import settings
+from playwright.async_api import Browser, BrowserContext, Page, Playwright
+
+from presentations_module import (
+    AssetCache,
+    RenderProfile,
+    RequestPolicy,
+    SokraticSource,
+    get_render_profile,
+    install_page_helpers,
+)
+
+from .host_metrics import browser_tree_rss
+from .site_governor import RedisSiteGovernor
+from .sokratic_accounts import SokraticAccount
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class BrowserShard:  # pylint: disable=too-many-instance-attributes
+    """One Chromium process with its own shared context and tab budget."""
+
+    index: int
+    capacity: int
+    account: SokraticAccount | None = None
+    browser: Browser | None = None
+    context: BrowserContext | None = None
+    active_tabs: int = 0
+    healthy: bool = False
+    relaunching: bool = False
+    launches: int = 0
+    launched_at: float = 0.0
+    crashes: int = 0
+    is_authenticated: bool = False
+    # Set once the site accepted the session; a stored one is checked first.
+    session_verified: bool = False
+    auth_failed_until: float = 0.0
+    auth_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    warm_pages: list[tuple[Page, float]] = field(default_factory=list)
+    refill_task: asyncio.Task[None] | None = None
+    process_marker: str = ""
+    served_tasks: set[str] = field(default_factory=set)
+    rss: int | None = None
+    recycles: int = 0
+    # Replaced by a fresh browser: admits no new tabs, closes once drained.
+    recycling: bool = False
+    recycle_after: float = 0.0
+
+    @property
+    def browser_id(self) -> str:
+        return hex(id(self.browser))
+
+    @property
+    def label(self) -> str:
+        return f"{self.index}:{self.browser_id}"
+
+    def admits(self) -> bool:
+        return self.healthy and not self.recycling and self.active_tabs < self.capacity
+
+    def recycle_reason(
+        self,
+        *,
+        max_generations: int,
+        max_uptime_s: int,
+        max_rss: int,
+        now: float | None = None,
+    ) -> str | None:
+        """Why this browser is due for replacement, or None (a limit of 0 is off)."""
+        now = time.monotonic() if now is None else now
+        if max_generations and len(self.served_tasks) >= max_generations:
+            return f"generations={len(self.served_tasks)}>={max_generations}"
+        if max_uptime_s and self.launched_at and now - self.launched_at >= max_uptime_s:
+            return f"uptime={now - self.launched_at:.0f}s>={max_uptime_s}s"
+        if max_rss and self.rss is not None and self.rss >= max_rss:
+            return f"rss={self.rss >> 20}MB>={max_rss >> 20}MB"
+        return None
+
+    def bind(self, source: SokraticSource) -> SokraticSource:
+        """Inject this shard's browser/context into *source* (skips init_async)."""
+        source.browser = self.browser
+        source.context = self.context
+        source.is_init = True
+        return source
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "index": self.index,
+            "account": self.account.username if self.account else None,
+            "browser_id": self.browser_id,
+            "healthy": self.healthy,
+            "relaunching": self.relaunching,
+            "active_tabs": self.active_tabs,
+            "capacity": self.capacity,
+            "launches": self.launches,
+            "crashes": self.crashes,
+            "recycles": self.recycles,
+            "recycling": self.recycling,
+            "generations": len(self.served_tasks),
+            "rss_mb": None if self.rss is None else self.rss >> 20,
+            "uptime_s": int(time.monotonic() - self.launched_at) if self.launched_at else 0,
+            "authenticated": self.is_authenticated,
+            "warm_tabs": len(self.warm_pages),
+        }
+
+
+@dataclass
+class SourceFactory:
+    """What every SokraticSource of the pool is built with: settings and shared helpers."""
+
+    request_policy: RequestPolicy
+    render_profile: RenderProfile
+    asset_cache: AssetCache | None = None
+    site_governor: RedisSiteGovernor | None = None
+
+    @classmethod
+    def from_settings(cls) -> SourceFactory:
+        return cls(
+            request_policy=RequestPolicy(
+                allowed_hosts=tuple(settings.PRESENTATIONS_ALLOWED_HOSTS),
+                blocked_resource_types=frozenset(settings.PRESENTATIONS_BLOCKED_RESOURCE_TYPES),
+                blocked_url_patterns=tuple(settings.PRESENTATIONS_BLOCKED_URL_PATTERNS),
+                block_trackers=settings.PRESENTATIONS_BLOCK_TRACKERS,
+            ),
+            render_profile=get_render_profile(settings.PRESENTATIONS_RENDER_PROFILE),
+        )
+
+    def build(
+        self, playwright: Playwright, logger_obj: logging.Logger, storage: Any = None
+    ) -> SokraticSource:
+        """SokraticSource configured from settings; bind it to a shard before use."""
+        return SokraticSource(
+            playwright,
+            logger=logger_obj,
+            generation_dir=settings.PRESENTATIONS_DIR,
+            generation_timeout=settings.PRESENTATIONS_GENERATION_TIMEOUT_MS,
+            playwright_default_timeout=settings.PLAYWRIGHT_DEFAULT_TIMEOUT_MS,
+            save_screenshots=settings.PRESENTATIONS_SAVE_SCREENSHOTS,
+            screenshot_mode=settings.PRESENTATIONS_SCREENSHOT_MODE,
+            screenshot_ring_size=settings.PRESENTATIONS_SCREENSHOT_RING_SIZE,
+            screenshot_quality=settings.PRESENTATIONS_SCREENSHOT_QUALITY,
+            screenshot_sample_percent=settings.PRESENTATIONS_SCREENSHOT_SAMPLE_PERCENT,
+            save_logs=settings.PRESENTATIONS_SAVE_LOGS,
+            max_log_bytes=settings.PRESENTATIONS_MAX_LOG_BYTES,
+            form_fill_mode=settings.PRESENTATIONS_FORM_FILL_MODE,
+            site_throttle_delay_ms=settings.PRESENTATIONS_SITE_THROTTLE_DELAY_MS,
+            storage=storage,
+            asset_cache=self.asset_cache,
+            site_governor=self.site_governor,
+            request_policy=self.request_policy,
+            render_profile=self.render_profile,
+            direct_export=settings.PRESENTATIONS_DIRECT_EXPORT,
+            export_url_templates=settings.PRESENTATIONS_EXPORT_URL_TEMPLATES,
+        )
+
+
+class ShardFleet:
+    """The pool's browser shards: launch, crash relaunch, recycling and warm tabs.
+
+    Must be used from the browser-pool event loop. ``slots_changed`` is
+    notified whenever a shard starts or stops taking tabs, and
+    ``active_tabs`` counts the tabs held on every shard, including recycled
+    ones that are still draining.
+    """
+
+    _RELAUNCH_RETRY_S = 30
+    _DRAIN_TIMEOUT_S = 60
+    _RECYCLE_CHECK_S = 60
+
+    def __init__(
+        self,
+        sources: SourceFactory,
+        *,
+        load_session: Callable[[BrowserShard], Awaitable[dict[str, Any] | None]],
+    ) -> None:
+        self.sources = sources
+        self.shards: list[BrowserShard] = []
+        self.active_tabs = 0
+        self.playwright: Playwright | None = None
+        self.slots_changed: asyncio.Condition | None = None
+        self._load_session = load_session
+        self._recycle_task: asyncio.Task[None] | None = None
+
+    def build_source(self, logger_obj: logging.Logger, storage: Any = None) -> SokraticSource:
+        assert self.playwright is not None
+        return self.sources.build(self.playwright, logger_obj, storage)
+
+    async def start(self, playwright: Playwright, shards: list[BrowserShard]) -> None:
+        """Launch *shards*; raise only if none of them comes up."""
+        self.playwright = playwright
+        self.slots_changed = asyncio.Condition()
+        self.shards = shards
+        self._recycle_task = asyncio.get_running_loop().create_task(
+            self._recycle_loop(), name="browser-pool-recycle"
+        )
+        results = await asyncio.gather(
+            *(self.launch(shard) for shard in self.shards),
+            return_exceptions=True,
+        )
+        failures = [r for r in results if isinstance(r, BaseException)]
+        if len(failures) == len(self.shards):
+            raise failures[0]
+        for shard, result in zip(self.shards, results):
+            if isinstance(result, BaseException):
+                logger.error("BrowserPool: shard %d failed to launch: %s", shard.index, result)
+                self.schedule_relaunch(shard)
+
+    async def launch(
+        self, shard: BrowserShard, storage_state: dict[str, Any] | None = None
+    ) -> None:
+        assert self.playwright is not None
+        headless = settings.PRESENTATIONS_HEADLESS
+        render_profile = self.sources.render_profile
+        # Unknown switches are ignored by Chromium; this one lets host_metrics
+        # find the browser's process tree.
+        marker = f"--presentations-shard={os.getpid()}-{shard.index}-{shard.launches + 1}"
+        browser = await self.playwright.chromium.launch(
+            **render_profile.launch_options(headless, extra_args=(marker,))
+        )
+        shard.browser = browser
+        shard.process_marker = marker
+        if storage_state is None:
+            storage_state = await self._load_session(shard)
+        shard.context = await browser.new_context(
+            storage_state=storage_state,
+            **render_profile.context_options(),
+            accept_downloads=True,
+            locale="ru-RU",
+            timezone_id="Europe/Moscow",
+            user_agent=(
+                "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+                "AppleWebKit/537.36 (KHTML, like Gecko) "
+                "Chrome/120.0.0.0 Safari/537.36"
+            ),
+        )
+        await install_page_helpers(shard.context)
+        await render_profile.install(shard.context)
+        browser.on("disconnected", lambda _browser: self._on_disconnected(shard, _browser))
+        shard.is_authenticated = storage_state is not None
+        shard.session_verified = False
+        shard.auth_failed_until = 0.0
+        shard.warm_pages = []
+        shard.served_tasks = set()
+        shard.rss = None
+        shard.launches += 1
+        shard.launched_at = time.monotonic()
+        shard.healthy = True
+        logger.info(
+            "BrowserPool: shard %d launched (account=%s, headless=%s, render_profile=%s, "
+            "capacity=%d, stored_session=%s, worker_pid=%d, browser_id=%s)",
+            shard.index,
+            shard.account.username if shard.account else None,
+            headless,
+            render_profile.name,
+            shard.capacity,
+            storage_state is not None,
+            os.getpid(),
+            shard.browser_id,
+        )
+        self.schedule_refill(shard)
+        await self.notify_slots()
+
+    def _on_disconnected(self, shard: BrowserShard, browser: Browser) -> None:
+        if shard.browser is not browser or shard.recycling:
+            return
+        logger.warning(
+            "BrowserPool: shard %d browser disconnected (worker_pid=%d, browser_id=%s)",
+            shard.index,
+            os.getpid(),
+            shard.browser_id,
+        )
+        shard.crashes += 1
+        self.schedule_relaunch(shard)
+
+    def schedule_relaunch(self, shard: BrowserShard) -> None:
+        shard.healthy = False
+        if shard.relaunching or shard.recycling:
+            return
+        shard.relaunching = True
+        asyncio.get_running_loop().create_task(
+            self._relaunch(shard), name=f"browser-shard-{shard.index}-relaunch"
+        )
+
+    async def _relaunch(self, shard: BrowserShard) -> None:
+        """Drain in-flight tabs of a dead shard, then launch a fresh browser."""
+        try:
+            assert self.slots_changed is not None
+            async with self.slots_changed:
+                try:
+                    await asyncio.wait_for(
+                        self.slots_changed.wait_for(lambda: shard.active_tabs == 0),
+                        timeout=self._DRAIN_TIMEOUT_S,
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        "BrowserPool: shard %d still has %d tab(s) after %ds, relaunching anyway",
+                        shard.index,
+                        shard.active_tabs,
+                        self._DRAIN_TIMEOUT_S,
+                    )
+            await self.close(shard)
+            while True:
+                try:
+                    await self.launch(shard)
+                    break
+                except Exception as exc:  # pylint: disable=broad-except
+                    logger.error(
+                        "BrowserPool: shard %d relaunch failed, retrying in %ds: %s",
+                        shard.index,
+                        self._RELAUNCH_RETRY_S,
+                        exc,
+                    )
+                    await asyncio.sleep(self._RELAUNCH_RETRY_S)
+        finally:
+            shard.relaunching = False
+
+    @staticmethod
+    async def close(shard: BrowserShard) -> None:
+        if shard.refill_task is not None:
+            shard.refill_task.cancel()
+            shard.refill_task = None
+        shard.warm_pages = []
+        try:
+            if shard.context:
+                await shard.context.close()
+        except Exception:  # pylint: disable=broad-except
+            pass
+        try:
+            if shard.browser:
+                await shard.browser.close()
+        except Exception:  # pylint: disable=broad-except
+            pass
+        shard.context = None
+
+    async def _recycle_loop(self) -> None:
+        """Refresh per-browser RSS and start recycling browsers past their limits."""
+        while True:
+            await asyncio.sleep(self._RECYCLE_CHECK_S)
+            for shard in list(self.shards):
+                if shard.healthy and shard.process_marker:
+                    try:
+                        shard.rss = await asyncio.to_thread(browser_tree_rss, shard.process_marker)
+                    except Exception as exc:  # pylint: disable=broad-except
+                        logger.debug("BrowserPool: RSS read failed for shard %s: %s", shard.label, exc)
+                self.maybe_recycle(shard)
+
+    def maybe_recycle(self, shard: BrowserShard) -> None:
+        """Start replacing *shard* if a recycling limit is hit (one shard at a time)."""
+        if not shard.healthy or shard.recycling or shard.relaunching:
+            return
+        if time.monotonic() < shard.recycle_after:
+            return
+        if any(other.recycling for other in self.shards):
+            return
+        reason = shard.recycle_reason(
+            max_generations=settings.PRESENTATIONS_BROWSER_MAX_GENERATIONS,
+            max_uptime_s=settings.PRESENTATIONS_BROWSER_MAX_UPTIME_S,
+            max_rss=settings.PRESENTATIONS_BROWSER_MAX_RSS_MB * 1024 * 1024,
+        )
+        if reason is None:
+            return
+        shard.recycling = True
+        asyncio.get_running_loop().create_task(
+            self.recycle(shard, reason), name=f"browser-shard-{shard.index}-recycle"
+        )
+
+    async def recycle(self, old: BrowserShard, reason: str) -> None:
+        """Swap *old* for a freshly launched browser, then close it once drained.
+
+        Tabs already running on *old* finish there; new tabs go to the
+        replacement, which starts from *old*'s cookies so it needs no login.
+        """
+        logger.info(
+            "BrowserPool: recycling shard %s (%s, active_tabs=%d, worker_pid=%d)",
+            old.label,
+            reason,
+            old.active_tabs,
+            os.getpid(),
+        )
+        for page, _ in old.warm_pages:
+            await self.close_page(page)
+        old.warm_pages = []
+        replacement = BrowserShard(
+            index=old.index,
+            capacity=old.capacity,
+            account=old.account,
+            launches=old.launches,
+            crashes=old.crashes,
+            recycles=old.recycles + 1,
+        )
+        try:
+            storage_state = None
+            if old.is_authenticated and old.context is not None:
+                storage_state = await old.context.storage_state()
+            await self.launch(replacement, storage_state=storage_state)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.error("BrowserPool: replacement for shard %s failed to launch: %s", old.label, exc)
+            await self.close(replacement)
+            old.recycling = False
+            old.recycle_after = time.monotonic() + self._RECYCLE_CHECK_S
+            if old.browser is not None and not old.browser.is_connected():
+                self.schedule_relaunch(old)
+            return
+
+        if old in self.shards:
+            self.shards[self.shards.index(old)] = replacement
+        await self.notify_slots()
+
+        assert self.slots_changed is not None
+        drain_timeout_s = settings.PRESENTATIONS_GENERATION_TIMEOUT_MS / 1000
+        async with self.slots_changed:
+            try:
+                await asyncio.wait_for(
+                    self.slots_changed.wait_for(lambda: old.active_tabs == 0),
+                    timeout=drain_timeout_s,
+                )
+            except asyncio.TimeoutError:
+                logger.warning(
+                    "BrowserPool: recycled shard %s still has %d tab(s) after %.0fs, closing anyway",
+                    old.label,
+                    old.active_tabs,
+                    drain_timeout_s,
+                )
+        old.healthy = False
+        await self.close(old)
+        logger.info(
+            "BrowserPool: shard %d recycled (old=%s, new=%s, worker_pid=%d)",
+            old.index,
+            old.browser_id,
+            replacement.browser_id,
+            os.getpid(),
+        )
+
+    async def notify_slots(self) -> None:
+        if self.slots_changed is None:
+            return
+        async with self.slots_changed:
+            self.slots_changed.notify_all()
+
+    def schedule_refill(self, shard: BrowserShard) -> None:
+        if settings.PRESENTATIONS_WARM_TABS <= 0 or not shard.is_authenticated:
+            return
+        if shard.refill_task is not None and not shard.refill_task.done():
+            return
+        shard.refill_task = asyncio.get_running_loop().create_task(
+            self._refill_warm_tabs(shard), name=f"browser-shard-{shard.index}-warm"
+        )
+
+    async def _refill_warm_tabs(self, shard: BrowserShard) -> None:
+        """Top up *shard* with routed tabs parked on the landing page.
+
+        Tabs are opened one at a time so that a dispatched batch does not hit
+        the landing page all at once.
+        """
+        source = shard.bind(self.build_source(logging.getLogger("presentations_module")))
+        launches = shard.launches
+        while (
+            shard.healthy
+            and not shard.recycling
+            and shard.is_authenticated
+            and shard.launches == launches
+            and len(shard.warm_pages) < settings.PRESENTATIONS_WARM_TABS
+        ):
+            page: Page | None = None
+            try:
+                page = await source.open_landing_tab()
+                if not await source.is_landing_ready(
+                    page, timeout=settings.PRESENTATIONS_ORDER_PROBE_TIMEOUT_MS
+                ):
+                    raise RuntimeError(f"landing page not ready at {page.url}")
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning(
+                    "BrowserPool: warm tab refill failed on shard %s: %s", shard.label, exc
+                )
+                await self.close_page(page)
+                return
+            if shard.launches != launches:
+                await self.close_page(page)
+                return
+            shard.warm_pages.append((page, time.monotonic()))
+        logger.debug(
+            "BrowserPool: shard %s has %d warm tab(s)", shard.label, len(shard.warm_pages)
+        )
+
+    async def take_warm_tab(self, shard: BrowserShard) -> Page | None:
+        """Pop a ready landing-page tab from *shard*, or None if none is warm.
+
+        Tabs older than PRESENTATIONS_WARM_TAB_MAX_AGE_S are closed instead of
+        handed out. The shard is refilled in the background either way.
+        """
+        page: Page | None = None
+        max_age = settings.PRESENTATIONS_WARM_TAB_MAX_AGE_S
+        while shard.warm_pages:
+            candidate, opened_at = shard.warm_pages.pop(0)
+            if candidate.is_closed() or time.monotonic() - opened_at > max_age:
+                await self.close_page(candidate)
+                continue
+            page = candidate
+            break
+        self.schedule_refill(shard)
+        return page
+
+    @staticmethod
+    async def close_page(page: Page | None) -> None:
+        if page is not None:
+            try:
+                await page.close()
+            except Exception:  # pylint: disable=broad-except
+                logger.debug("BrowserPool: tab already closed")
+
+    @staticmethod
+    async def open_tab(shard: BrowserShard) -> Page:
+        if shard.context is None:
+            raise RuntimeError(f"BrowserPool: shard {shard.index} has no context")
+        return await shard.context.new_page()
@@ -23,6 +23,8 @@ class CreatePresentationCommandDto:  # pylint: disable=too-many-instance-attribu
     template: int | None = None
     status: str = "pending"
     files: list[str] = field(default_factory=list)
+    priority: int = 0
+    owner_key: str = ""
 
     def with_status(self, status: str) -> "CreatePresentationCommandDto":
         """Return a copy with an explicit status for volatility handling."""
@@ -38,4 +40,6 @@ class CreatePresentationCommandDto:  # pylint: disable=too-many-instance-attribu
             template=self.template,
             status=status,
             files=list(self.files),
+            priority=self.priority,
+            owner_key=self.owner_key,
         )
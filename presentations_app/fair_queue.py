@@ -0,0 +1,221 @@
+"""Which pending presentations the relay claims next.
+
+Pending rows are grouped by owner (``owner_key``: the API user, or a book
+or bulk batch of theirs). A claim takes the highest effective priority
+first; among equal priorities it serves the owner holding the fewest slots
+for its weight (weighted fair share, counting what the owner already has
+queued or processing); among equals, the longest-waiting row. A row's
+effective priority grows by one per ``PRESENTATIONS_PRIORITY_AGING_S`` of
+waiting, so nothing starves behind a stream of higher-priority work.
+
+Candidates are the first due rows of each owner and the oldest due rows
+overall (rows backing off after a failure wait for ``next_attempt_at``, see
+retry_policy), read through partial indexes on pending rows, so a claim
+costs the batch size times the number of owners with pending work, not the
+queue depth.
+"""
+
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Presentation
+from .retry_policy import due_for_attempt
+
+PRIORITY_MIN = -10
+PRIORITY_MAX = 10
+
+
+def owner_key(requester: str, *, book_id: int | None = None, batch: str | None = None) -> str:
+    """Fair-share bucket of a presentation: the requester, split by book or bulk batch."""
+    if book_id is not None:
+        return f"{requester}/book:{book_id}"
+    if batch:
+        return f"{requester}/batch:{batch}"
+    return requester
+
+
+@dataclass(frozen=True)
+class PendingHead:
+    """A claim candidate: the columns the scheduler orders by."""
+
+    id: str
+    owner_key: str
+    priority: int
+    created_at: datetime
+
+
+def effective_priority(head: PendingHead, now: datetime, aging_s: int) -> int:
+    if aging_s <= 0:
+        return head.priority
+    waited = max((now - head.created_at).total_seconds(), 0.0)
+    return head.priority + int(waited // aging_s)
+
+
+def owner_weight(key: str, weights: dict[str, float]) -> float:
+    """Weight of an owner, or of its requester when the owner has none; default 1."""
+    weight = weights.get(key) or weights.get(key.split("/", 1)[0]) or 1.0
+    return max(float(weight), 0.01)
+
+
+_OwnerRow = tuple[int, datetime, str]
+
+
+def _rows_per_owner(
+    candidates: list[PendingHead], now: datetime, aging_s: int
+) -> dict[str, list[_OwnerRow]]:
+    """Deduplicated candidates of each owner as (-effective priority, created_at, id), sorted."""
+    per_owner: dict[str, list[_OwnerRow]] = {}
+    seen: set[str] = set()
+    for head in candidates:
+        if head.id in seen:
+            continue
+        seen.add(head.id)
+        per_owner.setdefault(head.owner_key, []).append(
+            (-effective_priority(head, now, aging_s), head.created_at, head.id)
+        )
+    for rows in per_owner.values():
+        rows.sort()
+    return per_owner
+
+
+def _heap_entry(
+    key: str, rows: list[_OwnerRow], index: int, served: int, weights: dict[str, float]
+) -> tuple[int, float, datetime, str, int]:
+    """Heap order of an owner's row *index*: priority, then weighted share, then age."""
+    neg_priority, created_at, _ = rows[index]
+    return (neg_priority, served / owner_weight(key, weights), created_at, key, index)
+
+
+def schedule(
+    candidates: list[PendingHead],
+    limit: int,
+    *,
+    in_flight: dict[str, int],
+    weights: dict[str, float],
+    now: datetime,
+    aging_s: int,
+) -> list[str]:
+    """Pick up to *limit* candidate ids in claim order."""
+    per_owner = _rows_per_owner(candidates, now, aging_s)
+    served = {key: in_flight.get(key, 0) for key in per_owner}
+    heap = [_heap_entry(key, rows, 0, served[key], weights) for key, rows in per_owner.items()]
+    heapq.heapify(heap)
+
+    picked: list[str] = []
+    while heap and len(picked) < limit:
+        _, _, _, key, index = heapq.heappop(heap)
+        picked.append(per_owner[key][index][2])
+        served[key] += 1
+        if index + 1 < len(per_owner[key]):
+            heapq.heappush(heap, _heap_entry(key, per_owner[key], index + 1, served[key], weights))
+    return picked
+
+
+# Loose index scan over the owners with pending work, then the first rows of
+# each through pres_pending_owner_idx.
+_OWNER_HEADS_SQL = """
+WITH RECURSIVE owners(owner_key) AS (
+    (SELECT owner_key FROM {table}
+     WHERE status = 'pending' ORDER BY owner_key LIMIT 1)
+    UNION ALL
+    SELECT (SELECT p.owner_key FROM {table} p
+            WHERE p.status = 'pending' AND p.owner_key > o.owner_key
+            ORDER BY p.owner_key LIMIT 1)
+    FROM owners o WHERE o.owner_key IS NOT NULL
+)
+SELECT head.id, head.owner_key, head.priority, head.created_at
+FROM owners o
+CROSS JOIN LATERAL (
+    SELECT p.id, p.owner_key, p.priority, p.created_at FROM {table} p
+    WHERE p.status = 'pending' AND p.owner_key = o.owner_key
+      AND (p.next_attempt_at IS NULL OR p.next_attempt_at <= %s)
+    ORDER BY p.priority DESC, p.created_at
+    LIMIT %s
+) head
+WHERE o.owner_key IS NOT NULL
+"""
+
+_HEAD_FIELDS = ("id", "owner_key", "priority", "created_at")
+
+
+def _owner_heads(limit: int, now: datetime) -> list[PendingHead]:
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _OWNER_HEADS_SQL.format(table=connection.ops.quote_name(Presentation._meta.db_table)),
+                [now, limit],
+            )
+            return [PendingHead(str(row[0]), *row[1:]) for row in cursor.fetchall()]
+    pending = Presentation.objects.filter(due_for_attempt(now), status="pending")
+    heads: list[PendingHead] = []
+    for key in pending.order_by("owner_key").values_list("owner_key", flat=True).distinct():
+        rows = pending.filter(owner_key=key).order_by("-priority", "created_at")
+        heads.extend(
+            PendingHead(str(row[0]), *row[1:]) for row in rows.values_list(*_HEAD_FIELDS)[:limit]
+        )
+    return heads
+
+
+def pending_candidates(limit: int, now: datetime) -> list[PendingHead]:
+    """The first *limit* due rows of every owner plus the *limit* oldest due rows overall."""
+    oldest = (
+        Presentation.objects.filter(due_for_attempt(now), status="pending")
+        .order_by("created_at")
+        .values_list(*_HEAD_FIELDS)[:limit]
+    )
+    return _owner_heads(limit, now) + [PendingHead(str(row[0]), *row[1:]) for row in oldest]
+
+
+def next_pending_ids(limit: int) -> list[str]:
+    """Ids of the due pending presentations to claim next, in claim order (not locked)."""
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    if not settings.PRESENTATIONS_FAIR_QUEUE:
+        return [
+            str(pres_id)
+            for pres_id in Presentation.objects.filter(due_for_attempt(now), status="pending")
+            .order_by("created_at")
+            .values_list("id", flat=True)[:limit]
+        ]
+    in_flight = dict(
+        Presentation.objects.filter(status__in=("queued", "processing"))
+        .order_by()
+        .values("owner_key")
+        .annotate(count=Count("id"))
+        .values_list("owner_key", "count")
+    )
+    return schedule(
+        pending_candidates(limit, now),
+        limit,
+        in_flight=in_flight,
+        weights=settings.PRESENTATIONS_OWNER_WEIGHTS,
+        now=now,
+        aging_s=settings.PRESENTATIONS_PRIORITY_AGING_S,
+    )
+
+
+def lock_pending_for_claim(limit: int) -> list[str]:
+    """Lock the next pending presentations, in claim order; call inside a transaction.
+
+    Rows another relay locked first are skipped (SKIP LOCKED), so concurrent
+    relays claim different presentations; the next claim makes up for them.
+    """
+    wanted = next_pending_ids(limit)
+    if not wanted:
+        return []
+    locked = {
+        str(pres_id)
+        for pres_id in Presentation.objects.select_for_update(skip_locked=True)
+        .filter(id__in=wanted, status="pending")
+        .values_list("id", flat=True)
+    }
+    return [pres_id for pres_id in wanted if pres_id in locked]
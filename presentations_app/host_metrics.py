@@ -0,0 +1,225 @@
+"""Host and Chromium resource readings from ``/proc`` (Linux only).
+
+Every reader returns None instead of raising when the data is unavailable
+(other platforms, restricted containers), so callers treat a missing reading
+as "no signal". Readers are blocking; call them via ``asyncio.to_thread``
+from the browser-pool loop.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+_PROC = Path("/proc")
+_CGROUP = Path("/sys/fs/cgroup")
+
+
+@dataclass(frozen=True)
+class HostPressure:
+    """One reading of host load.
+
+    ``cpu_load`` is the 1-minute load average per usable CPU. ``cpu_psi`` and
+    ``memory_psi`` are the ``some avg10`` stall percentages from
+    ``/proc/pressure``. ``memory_used`` is the used fraction of the cgroup
+    limit, or of the host when no limit is set.
+    """
+
+    cpu_load: float | None = None
+    cpu_psi: float | None = None
+    memory_used: float | None = None
+    memory_psi: float | None = None
+
+    def as_dict(self) -> dict[str, float | None]:
+        return {
+            "cpu_load": _round(self.cpu_load),
+            "cpu_psi": _round(self.cpu_psi),
+            "memory_used": _round(self.memory_used),
+            "memory_psi": _round(self.memory_psi),
+        }
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 3)
+
+
+def _read(path: Path) -> str | None:
+    try:
+        return path.read_text(encoding="ascii", errors="replace")
+    except OSError:
+        return None
+
+
+def _cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+def _cpu_load() -> float | None:
+    raw = _read(_PROC / "loadavg")
+    if not raw:
+        return None
+    try:
+        return float(raw.split()[0]) / _cpu_count()
+    except (IndexError, ValueError):
+        return None
+
+
+def _psi_some_avg10(resource: str) -> float | None:
+    raw = _read(_PROC / "pressure" / resource)
+    if not raw:
+        return None
+    for line in raw.splitlines():
+        if not line.startswith("some "):
+            continue
+        for part in line.split()[1:]:
+            key, _, value = part.partition("=")
+            if key == "avg10":
+                try:
+                    return float(value)
+                except ValueError:
+                    return None
+    return None
+
+
+def _meminfo() -> dict[str, int]:
+    raw = _read(_PROC / "meminfo") or ""
+    values: dict[str, int] = {}
+    for line in raw.splitlines():
+        key, _, rest = line.partition(":")
+        parts = rest.split()
+        if parts and parts[0].isdigit():
+            values[key] = int(parts[0]) * 1024
+    return values
+
+
+def _memory_used() -> float | None:
+    limit = (_read(_CGROUP / "memory.max") or "").strip()
+    current = (_read(_CGROUP / "memory.current") or "").strip()
+    if limit.isdigit() and current.isdigit() and int(limit) > 0:
+        return int(current) / int(limit)
+    info = _meminfo()
+    total, available = info.get("MemTotal"), info.get("MemAvailable")
+    if not total or available is None:
+        return None
+    return 1 - available / total
+
+
+def read_host_pressure() -> HostPressure:
+    return HostPressure(
+        cpu_load=_cpu_load(),
+        cpu_psi=_psi_some_avg10("cpu"),
+        memory_used=_memory_used(),
+        memory_psi=_psi_some_avg10("memory"),
+    )
+
+
+def _process_table() -> dict[int, tuple[int, str]]:
+    """pid -> (ppid, command line) for every readable process."""
+    table: dict[int, tuple[int, str]] = {}
+    for entry in _PROC.iterdir() if _PROC.is_dir() else ():
+        if not entry.name.isdigit():
+            continue
+        stat = _read(entry / "stat")
+        if not stat:
+            continue
+        # The command name may contain spaces and parentheses; fields after
+        # the last ")" are fixed.
+        fields = stat.rsplit(")", 1)[-1].split()
+        try:
+            ppid = int(fields[1])
+        except (IndexError, ValueError):
+            continue
+        cmdline = (_read(entry / "cmdline") or "").replace("\0", " ")
+        table[int(entry.name)] = (ppid, cmdline)
+    return table
+
+
+def _rss_bytes(pid: int) -> int:
+    raw = _read(_PROC / str(pid) / "statm")
+    if not raw:
+        return 0
+    try:
+        return int(raw.split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (IndexError, ValueError, OSError):
+        return 0
+
+
+def _descendants(table: dict[int, tuple[int, str]], roots: set[int]) -> set[int]:
+    children: dict[int, list[int]] = {}
+    for pid, (ppid, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+    found: set[int] = set()
+    stack = list(roots)
+    while stack:
+        pid = stack.pop()
+        for child in children.get(pid, ()):
+            if child not in found:
+                found.add(child)
+                stack.append(child)
+    return found
+
+
+def process_tree_rss(root_pid: int | None = None, *, include_root: bool = False) -> int | None:
+    """Summed RSS of *root_pid*'s descendants (default: this process's children).
+
+    For a pool worker this is the Playwright driver plus every Chromium
+    process it launched.
+    """
+    if not _PROC.is_dir():
+        return None
+    root_pid = os.getpid() if root_pid is None else root_pid
+    pids = _descendants(_process_table(), {root_pid})
+    if include_root:
+        pids.add(root_pid)
+    return sum(_rss_bytes(pid) for pid in pids)
+
+
+def _browser_pids(marker: str) -> set[int]:
+    table = _process_table()
+    roots = {pid for pid, (_, cmdline) in table.items() if marker in cmdline.split(" ")}
+    return roots | _descendants(table, roots) if roots else set()
+
+
+def _cpu_seconds(pid: int) -> float:
+    stat = _read(_PROC / str(pid) / "stat")
+    if not stat:
+        return 0.0
+    fields = stat.rsplit(")", 1)[-1].split()
+    try:
+        # utime and stime, fields 14 and 15 of /proc/<pid>/stat.
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (IndexError, ValueError, OSError):
+        return 0.0
+
+
+def browser_tree_rss(marker: str) -> int | None:
+    """Summed RSS of the process(es) with the argument *marker*, plus their descendants.
+
+    The pool passes a unique ``--presentations-shard=...`` switch to every
+    Chromium it launches, so this is the memory of one browser: the browser
+    process, its renderers, GPU and utility processes.
+    """
+    if not _PROC.is_dir():
+        return None
+    pids = _browser_pids(marker)
+    if not pids:
+        return None
+    return sum(_rss_bytes(pid) for pid in pids)
+
+
+def browser_tree_cpu_s(marker: str) -> float | None:
+    """CPU seconds (user + system) used so far by the live processes of one browser.
+
+    Renderers that already exited are not counted, so sample it while the
+    tabs of interest are still open.
+    """
+    if not _PROC.is_dir():
+        return None
+    pids = _browser_pids(marker)
+    if not pids:
+        return None
+    return sum(_cpu_seconds(pid) for pid in pids)
@@ -0,0 +1,171 @@
+"""One leader per cluster for periodic work that must run exactly once.
+
+Every node runs ``celery beat``, and beat sends its periodic tasks to the
+node's own queue. Node-local work (claiming for the node's tabs) runs
+everywhere; cluster-wide work (relay resets and DB snapshot, Telegram stats)
+runs only on the node that holds a Redis lease. The holder renews it every
+third of the lease; when it dies, the lease expires and another node takes
+over within one lease period.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+from typing import Any
+
+from django.conf import settings
+
+from .worker_node import get_worker_node_label
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] lease key. ARGV: token, lease ms. Extends the lease if we hold it.
+_RENEW_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[2]))
+end
+return 0
+"""
+
+# KEYS[1] lease key. ARGV: token. Deletes the lease if we hold it.
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLeaderLease:
+    """``SET key token NX PX`` lease; the token is ``<node>|<uuid>``."""
+
+    def __init__(self, client: Any, *, key: str, lease_s: float, node: str | None = None) -> None:
+        self._client = client
+        self.key = key
+        self.lease_s = lease_s
+        self.node = node or get_worker_node_label()
+        self.token = f"{self.node}|{uuid.uuid4().hex}"
+        self._renew = client.register_script(_RENEW_LUA)
+        self._release = client.register_script(_RELEASE_LUA)
+
+    def try_acquire(self) -> bool:
+        return bool(self._client.set(self.key, self.token, nx=True, px=int(self.lease_s * 1000)))
+
+    def renew(self) -> bool:
+        return bool(int(self._renew(keys=[self.key], args=[self.token, int(self.lease_s * 1000)])))
+
+    def release(self) -> None:
+        self._release(keys=[self.key], args=[self.token])
+
+    def holder(self) -> str | None:
+        raw = self._client.get(self.key)
+        if not raw:
+            return None
+        value = raw.decode() if isinstance(raw, bytes) else str(raw)
+        return value.rsplit("|", 1)[0]
+
+
+class LeaderElection:
+    """Thread that holds or contests the lease.
+
+    :attr:`is_leader` is also bounded by the time of the last successful
+    renewal, so a stalled thread stops acting as leader before its lease
+    can pass to another node.
+    """
+
+    def __init__(self, lease: RedisLeaderLease) -> None:
+        self.lease = lease
+        self.renew_s = lease.lease_s / 3
+        self.elections = 0
+        self.errors = 0
+        self._valid_until = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        return time.monotonic() < self._valid_until
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="leader-election")
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        """Stop contesting and hand the lease over at once if we hold it."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self.is_leader:
+            self._valid_until = 0.0
+            try:
+                self.lease.release()
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("LeaderElection: failed to release the lease: %s", exc)
+
+    def step(self) -> bool:
+        """Renew or try to take the lease once; return whether this node leads."""
+        started = time.monotonic()
+        was_leader = self.is_leader
+        try:
+            held = self.lease.renew() if was_leader else self.lease.try_acquire()
+        except Exception as exc:  # pylint: disable=broad-except
+            self.errors += 1
+            logger.warning("LeaderElection: Redis unavailable: %s", exc)
+            held = False
+        if held:
+            # Counted from before the call, with one renew interval of margin.
+            self._valid_until = started + self.lease.lease_s - self.renew_s
+            if not was_leader:
+                self.elections += 1
+                logger.info("LeaderElection: %s is now the cluster leader", self.lease.node)
+        elif was_leader:
+            self._valid_until = 0.0
+            logger.warning("LeaderElection: %s lost the leader lease", self.lease.node)
+        return held
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.step()
+            self._stop.wait(self.renew_s)
+
+    def snapshot(self) -> dict[str, Any]:
+        try:
+            holder = self.lease.holder()
+        except Exception:  # pylint: disable=broad-except
+            holder = None
+        return {
+            "node": self.lease.node,
+            "is_leader": self.is_leader,
+            "leader": holder,
+            "elections": self.elections,
+            "errors": self.errors,
+        }
+
+
+def build_leader_election() -> LeaderElection | None:
+    """Election selected by PRESENTATIONS_LEADER_ELECTION (auto | redis | off).
+
+    None means every node acts as leader, which is right for a single node.
+    """
+    backend = (settings.PRESENTATIONS_LEADER_ELECTION or "auto").strip().lower()
+    redis_url = settings.PRESENTATIONS_LEADER_REDIS_URL or ""
+    if backend == "auto":
+        backend = "redis" if redis_url.startswith(("redis://", "rediss://", "unix://")) else "off"
+    if backend != "redis":
+        return None
+
+    import redis
+
+    return LeaderElection(
+        RedisLeaderLease(
+            redis.Redis.from_url(redis_url),
+            key=settings.PRESENTATIONS_LEADER_KEY,
+            lease_s=max(settings.PRESENTATIONS_LEADER_LEASE_S, 3),
+        )
+    )
@@ -3,11 +3,13 @@
 from __future__ import annotations
 
 import csv
+import os
 import sys
 
 from django.core.management.base import BaseCommand, CommandError
 
 from presentations_app.dto import CreatePresentationCommandDto
+from presentations_app.fair_queue import PRIORITY_MAX, PRIORITY_MIN, owner_key
 from presentations_app.models import Presentation
 from presentations_app.services import PresentationService
 
@@ -27,10 +29,25 @@ class Command(BaseCommand):
             action="store_true",
             help="Parse and validate without writing to the database",
         )
+        parser.add_argument(
+            "--owner",
+            default="import",
+            help="Fair-share owner of the rows; each file (or book_id) is its own batch",
+        )
+        parser.add_argument(
+            "--priority",
+            type=int,
+            default=0,
+            help=f"Claim priority of the rows ({PRIORITY_MIN}..{PRIORITY_MAX}, higher first)",
+        )
 
     def handle(self, *args, **options):  # pylint: disable=too-many-locals
         csv_path = options["csv_file"]
         dry_run = options["dry_run"]
+        priority = options["priority"]
+        if priority < PRIORITY_MIN or priority > PRIORITY_MAX:
+            raise CommandError(f"--priority must be between {PRIORITY_MIN} and {PRIORITY_MAX}")
+        batch = os.path.basename(csv_path)
 
         try:
             with open(csv_path, newline="", encoding="utf-8") as fh:
@@ -80,6 +97,8 @@ class Command(BaseCommand):
                 created += 1
                 continue
 
+            command.priority = priority
+            command.owner_key = owner_key(options["owner"], book_id=command.book_id, batch=batch)
             _service.create_presentation(command.with_status("pending"))
             created += 1
 
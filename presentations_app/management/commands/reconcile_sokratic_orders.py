@@ -0,0 +1,85 @@
+"""Management command: match Sokratic orders from the account history to orphaned presentations."""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from presentations_app.models import Presentation
+from presentations_app.order_recovery import match_orphaned_orders, reconcile_candidates
+from presentations_app.tasks import fetch_order_history
+
+
+class Command(BaseCommand):
+    help = (
+        "Record Sokratic order URLs for failed presentations that have none, and for "
+        "presentations whose recorded order the account's history no longer lists, matching "
+        "the history by topic. Only unambiguous matches are applied."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since-hours",
+            type=int,
+            default=72,
+            help="Only consider presentations created within this many hours (default 72)",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=200,
+            help="How many history orders to read (default 200)",
+        )
+        parser.add_argument(
+            "--requeue",
+            action="store_true",
+            help="Set matched failed presentations back to pending with a fresh retry budget",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Show matches without writing to the database",
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timezone.timedelta(hours=options["since_hours"])
+        rows = [
+            (str(pk), topic, status, order_url, account)
+            for pk, topic, status, order_url, account in Presentation.objects.filter(
+                Q(status="failed") | Q(status="pending", order_url__isnull=False),
+                created_at__gte=since,
+            ).values_list("id", "topic", "status", "order_url", "sokratic_account")
+        ]
+        if not rows:
+            self.stdout.write("No orphaned presentations.")
+            return
+
+        orders = fetch_order_history(limit=options["limit"])
+        orphans = reconcile_candidates(rows, orders, limit=options["limit"])
+        if not orphans:
+            self.stdout.write("No orphaned presentations.")
+            return
+        taken = Presentation.objects.filter(order_url__isnull=False).values_list("order_url", flat=True)
+        matches = match_orphaned_orders(orphans, orders, taken_urls=taken)
+
+        accounts = {order.url: order.account for order in orders}
+        for presentation_id, order_url in matches.items():
+            self.stdout.write(f"{presentation_id} -> {order_url}")
+            if options["dry_run"]:
+                continue
+            updates = {
+                "order_url": order_url,
+                "completed_stages": ["order_submitted"],
+                "sokratic_account": accounts.get(order_url),
+            }
+            Presentation.objects.filter(id=presentation_id).update(**updates)
+            if options["requeue"]:
+                Presentation.objects.filter(id=presentation_id, status="failed").update(
+                    status="pending", retry_count=0, files=[], processing_since=None, next_attempt_at=None
+                )
+
+        self.stdout.write(
+            f"Orphans: {len(orphans)}, history orders: {len(orders)}, "
+            f"matched: {len(matches)}{' (dry run)' if options['dry_run'] else ''}."
+        )
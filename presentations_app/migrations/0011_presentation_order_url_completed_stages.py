@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("presentations_app", "0010_presentation_task_id_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="presentation",
+            name="order_url",
+            field=models.CharField(blank=True, max_length=512, null=True),
+        ),
+        migrations.AddField(
+            model_name="presentation",
+            name="completed_stages",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("presentations_app", "0011_presentation_order_url_completed_stages"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="presentation",
+            name="sokratic_account",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,49 @@
+"""PostgreSQL trigger: NOTIFY presentations_pending when a presentation becomes pending.
+
+Other databases have no LISTEN/NOTIFY; there the relay tick and local
+capacity wake-ups keep dispatching.
+"""
+
+from django.db import migrations
+
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION presentations_app_notify_pending() RETURNS trigger AS $$
+BEGIN
+    IF NEW.status = 'pending' AND (TG_OP = 'INSERT' OR OLD.status IS DISTINCT FROM NEW.status) THEN
+        PERFORM pg_notify('presentations_pending', NEW.id::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS presentations_app_notify_pending ON presentations_app_presentation;
+CREATE TRIGGER presentations_app_notify_pending
+    AFTER INSERT OR UPDATE OF status ON presentations_app_presentation
+    FOR EACH ROW EXECUTE FUNCTION presentations_app_notify_pending();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS presentations_app_notify_pending ON presentations_app_presentation;
+DROP FUNCTION IF EXISTS presentations_app_notify_pending();
+"""
+
+
+def create_notify_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_TRIGGER)
+
+
+def drop_notify_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_TRIGGER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("presentations_app", "0012_presentation_sokratic_account"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_notify_trigger, drop_notify_trigger),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("presentations_app", "0013_presentation_pending_notify_trigger"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="presentation",
+            name="assigned_node",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
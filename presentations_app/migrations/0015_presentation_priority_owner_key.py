@@ -0,0 +1,45 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("presentations_app", "0014_presentation_assigned_node"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="presentation",
+            name="owner_key",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="presentation",
+            name="priority",
+            field=models.SmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="presentation",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["owner_key", "-priority", "created_at"],
+                name="pres_pending_owner_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="presentation",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["created_at"],
+                name="pres_pending_age_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="presentation",
+            index=models.Index(
+                condition=models.Q(("status__in", ["queued", "processing"])),
+                fields=["owner_key"],
+                name="pres_active_owner_idx",
+            ),
+        ),
+    ]
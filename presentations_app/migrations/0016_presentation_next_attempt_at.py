@@ -0,0 +1,44 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("presentations_app", "0015_presentation_priority_owner_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="presentation",
+            name="next_attempt_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        # Rebuilt to cover next_attempt_at and id, so claims can check the
+        # backoff with an index-only scan.
+        migrations.RemoveIndex(
+            model_name="presentation",
+            name="pres_pending_owner_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="presentation",
+            name="pres_pending_age_idx",
+        ),
+        migrations.AddIndex(
+            model_name="presentation",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["owner_key", "-priority", "created_at"],
+                include=("next_attempt_at", "id"),
+                name="pres_pending_owner_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="presentation",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["created_at"],
+                include=("next_attempt_at", "id"),
+                name="pres_pending_age_idx",
+            ),
+        ),
+    ]
@@ -25,10 +25,47 @@ class Presentation(models.Model):
     retry_count = models.PositiveSmallIntegerField(default=0)
     processing_since = models.DateTimeField(null=True, blank=True)
     files = models.JSONField(default=list, blank=True)
+    # Sokratic order of the latest attempt and the resumable stages it
+    # completed; a retry harvests the missing formats from this order.
+    order_url = models.CharField(max_length=512, blank=True, null=True)
+    completed_stages = models.JSONField(default=list, blank=True)
+    # Sokratic account (username) that placed order_url; only it can see the order.
+    sokratic_account = models.CharField(max_length=255, blank=True, null=True)
+    # Worker node whose queue a queued presentation was sent to (node registry on).
+    assigned_node = models.CharField(max_length=255, blank=True, null=True)
+    # Scheduling: higher priority is claimed sooner; pending work is shared
+    # fairly between owners (API user, book or bulk batch), see fair_queue.
+    priority = models.SmallIntegerField(default=0)
+    owner_key = models.CharField(max_length=255, default="", blank=True)
+    # A failed attempt goes back to pending with a backoff; claims skip it until then.
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            # Per-owner heads of the pending queue, and the owner skip scan;
+            # covering next_attempt_at and id allows index-only claim reads.
+            models.Index(
+                fields=["owner_key", "-priority", "created_at"],
+                condition=models.Q(status="pending"),
+                include=["next_attempt_at", "id"],
+                name="pres_pending_owner_idx",
+            ),
+            # Longest-waiting pending rows, for aging.
+            models.Index(
+                fields=["created_at"],
+                condition=models.Q(status="pending"),
+                include=["next_attempt_at", "id"],
+                name="pres_pending_age_idx",
+            ),
+            # Slots each owner already holds.
+            models.Index(
+                fields=["owner_key"],
+                condition=models.Q(status__in=["queued", "processing"]),
+                name="pres_active_owner_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.topic} ({self.language})"
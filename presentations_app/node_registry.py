@@ -0,0 +1,227 @@
+"""Per-node Celery queues and the live capacity of every worker node.
+
+Each worker consumes its own Celery queue (``presentations.node.<label>``)
+besides the shared one; beat on each node sends node-local periodic tasks
+there. With the registry on, each worker also refreshes a short-lived
+Redis record with its free tab/order slots. The relay reads the live
+records and sends each claimed presentation straight to the queue of a
+node that has room for it, split in proportion to free capacity. A node whose record expired is
+treated as gone and its queued presentations are handed to the others.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable
+
+from django.conf import settings
+
+from .worker_node import get_worker_node_label
+
+logger = logging.getLogger(__name__)
+
+NODE_QUEUE_PREFIX = "presentations.node"
+
+# Periodic tasks that act on the sending node's own pool (or are gated on
+# the cluster leader there), so beat must deliver them to its own worker.
+NODE_LOCAL_TASKS = frozenset(
+    {
+        "presentations_app.tasks.dispatch_pending_presentations",
+        "presentations_app.tasks.send_hourly_telegram_stats",
+    }
+)
+
+
+def node_queue_name(node: str) -> str:
+    return f"{NODE_QUEUE_PREFIX}.{node}"
+
+
+def route_node_local_task(name: str, *_args: Any, **_kwargs: Any) -> dict[str, str] | None:
+    """Celery router: send node-local tasks to the queue of the node sending them.
+
+    An explicit ``queue=`` in ``apply_async`` still wins.
+    """
+    if name in NODE_LOCAL_TASKS:
+        return {"queue": node_queue_name(get_worker_node_label())}
+    return None
+
+
+@dataclass
+class NodeCapacity:
+    """One heartbeat: the node's free slots and the load they were computed from."""
+
+    node: str
+    queue: str
+    free_slots: int
+    tab_budget: int = 0
+    active_tabs: int = 0
+    orders_in_flight: int = 0
+    updated_at: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "NodeCapacity":
+        return cls(
+            node=str(data["node"]),
+            queue=str(data.get("queue") or node_queue_name(str(data["node"]))),
+            free_slots=int(data.get("free_slots") or 0),
+            tab_budget=int(data.get("tab_budget") or 0),
+            active_tabs=int(data.get("active_tabs") or 0),
+            orders_in_flight=int(data.get("orders_in_flight") or 0),
+            updated_at=float(data.get("updated_at") or 0.0),
+        )
+
+
+def assign_proportionally(free: dict[str, int], count: int) -> list[str]:
+    """Spread *count* items over nodes in proportion to their free slots.
+
+    Returns one node per item, interleaved so that the oldest items are
+    spread across nodes too. No node gets more than its free slots; the
+    rounding remainder goes to the largest fractional shares.
+    """
+    free = {node: slots for node, slots in free.items() if slots > 0}
+    total = sum(free.values())
+    count = min(count, total)
+    if count <= 0:
+        return []
+    shares = {node: slots * count / total for node, slots in free.items()}
+    quota = {node: int(share) for node, share in shares.items()}
+    remainder = count - sum(quota.values())
+    by_fraction = sorted(free, key=lambda node: (-(shares[node] - quota[node]), -free[node], node))
+    for node in by_fraction[:remainder]:
+        quota[node] += 1
+
+    order = sorted(quota, key=lambda node: (-quota[node], node))
+    assignments: list[str] = []
+    while len(assignments) < count:
+        for node in order:
+            if quota[node] > 0:
+                quota[node] -= 1
+                assignments.append(node)
+    return assignments
+
+
+class RedisNodeRegistry:
+    """Heartbeat records (``<prefix>:<node>`` with a TTL) plus an index set of node names."""
+
+    def __init__(self, client: Any, *, key_prefix: str, ttl_s: float) -> None:
+        self._client = client
+        self.key_prefix = key_prefix
+        self.ttl_s = ttl_s
+
+    def _key(self, node: str) -> str:
+        return f"{self.key_prefix}:{node}"
+
+    def publish(self, capacity: NodeCapacity) -> None:
+        pipe = self._client.pipeline()
+        pipe.set(self._key(capacity.node), json.dumps(capacity.as_dict()), px=int(self.ttl_s * 1000))
+        pipe.sadd(f"{self.key_prefix}:index", capacity.node)
+        pipe.execute()
+
+    def remove(self, node: str) -> None:
+        pipe = self._client.pipeline()
+        pipe.delete(self._key(node))
+        pipe.srem(f"{self.key_prefix}:index", node)
+        pipe.execute()
+
+    def live_nodes(self) -> dict[str, NodeCapacity]:
+        """Nodes whose heartbeat has not expired; expired ones leave the index."""
+        names = sorted(
+            name.decode() if isinstance(name, bytes) else str(name)
+            for name in self._client.smembers(f"{self.key_prefix}:index")
+        )
+        if not names:
+            return {}
+        records = self._client.mget([self._key(name) for name in names])
+        live: dict[str, NodeCapacity] = {}
+        gone: list[str] = []
+        for name, raw in zip(names, records):
+            if not raw:
+                gone.append(name)
+                continue
+            try:
+                live[name] = NodeCapacity.from_dict(json.loads(raw))
+            except (KeyError, TypeError, ValueError) as exc:
+                logger.warning("NodeRegistry: unreadable heartbeat of %s: %s", name, exc)
+        if gone:
+            self._client.srem(f"{self.key_prefix}:index", *gone)
+        return live
+
+
+class NodeHeartbeat:
+    """Thread that publishes ``read_capacity()`` every *interval_s*."""
+
+    def __init__(
+        self,
+        registry: RedisNodeRegistry,
+        read_capacity: Callable[[], NodeCapacity],
+        *,
+        interval_s: float,
+    ) -> None:
+        self.registry = registry
+        self.read_capacity = read_capacity
+        self.interval_s = interval_s
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="node-heartbeat")
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        try:
+            self.registry.remove(self.read_capacity().node)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("NodeHeartbeat: failed to remove the heartbeat: %s", exc)
+
+    def beat(self) -> NodeCapacity | None:
+        """Publish the current capacity now; None if Redis is unavailable."""
+        capacity = self.read_capacity()
+        capacity.updated_at = time.time()
+        try:
+            self.registry.publish(capacity)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.errors += 1
+            logger.warning("NodeHeartbeat: failed to publish %s: %s", capacity.node, exc)
+            return None
+        return capacity
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.beat()
+            self._stop.wait(self.interval_s)
+
+
+def build_node_registry() -> RedisNodeRegistry | None:
+    """Registry selected by PRESENTATIONS_NODE_REGISTRY (auto | redis | off).
+
+    ``auto`` uses Redis when the URL is a Redis URL; None turns node-targeted
+    dispatch off, and each worker then claims for itself on the shared queue.
+    """
+    backend = (settings.PRESENTATIONS_NODE_REGISTRY or "auto").strip().lower()
+    redis_url = settings.PRESENTATIONS_NODE_REGISTRY_REDIS_URL or ""
+    if backend == "auto":
+        backend = "redis" if redis_url.startswith(("redis://", "rediss://", "unix://")) else "off"
+    if backend != "redis":
+        return None
+
+    import redis
+
+    return RedisNodeRegistry(
+        redis.Redis.from_url(redis_url),
+        key_prefix=settings.PRESENTATIONS_NODE_REGISTRY_KEY,
+        ttl_s=max(settings.PRESENTATIONS_NODE_HEARTBEAT_TTL_S, settings.PRESENTATIONS_NODE_HEARTBEAT_S * 2),
+    )
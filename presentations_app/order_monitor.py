@@ -0,0 +1,115 @@
+"""Lightweight watcher for submitted Sokratic orders.
+
+Tasks release their browser tab right after order submission and park here
+until the order page reports the presentation as ready. One probe tab cycles
+through every pending order, so waiting for server-side generation costs a
+single tab per worker instead of one tab per deck.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Callable
+
+from playwright.async_api import Page
+
+from presentations_module import SokraticSource
+
+logger = logging.getLogger(__name__)
+
+
+class OrderMonitor:
+    """Cycle one tab through pending order URLs and wake waiters when ready.
+
+    Must be used from the browser-pool event loop. The probe loop starts with
+    the first waiter and stops (closing its tab) once nobody is waiting.
+    """
+
+    def __init__(
+        self,
+        *,
+        build_source: Callable[[], SokraticSource],
+        poll_interval_s: float,
+        probe_timeout_ms: int,
+    ) -> None:
+        self._build_source = build_source
+        self._poll_interval_s = poll_interval_s
+        self._probe_timeout_ms = probe_timeout_ms
+        self._waiters: dict[str, list[asyncio.Future[None]]] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._waiters)
+
+    async def wait_until_ready(self, order_url: str, timeout_s: float) -> None:
+        """Block until *order_url* is ready; raise ``TimeoutError`` after *timeout_s*."""
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(order_url, []).append(future)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="order-monitor")
+        try:
+            await asyncio.wait_for(future, timeout=timeout_s)
+        except asyncio.TimeoutError as exc:
+            raise TimeoutError(
+                f"Order was not ready after {timeout_s:.0f}s: {order_url}"
+            ) from exc
+        finally:
+            waiters = self._waiters.get(order_url)
+            if waiters is not None and future in waiters:
+                waiters.remove(future)
+                if not waiters:
+                    del self._waiters[order_url]
+
+    def _resolve(self, order_url: str) -> None:
+        for future in self._waiters.pop(order_url, []):
+            if not future.done():
+                future.set_result(None)
+
+    async def _run(self) -> None:
+        source: SokraticSource | None = None
+        page: Page | None = None
+        logger.info("OrderMonitor: started (worker_pid=%d)", os.getpid())
+        try:
+            while self._waiters:
+                for order_url in list(self._waiters):
+                    if order_url not in self._waiters:
+                        continue
+                    try:
+                        if source is None:
+                            source = self._build_source()
+                        if page is None or page.is_closed():
+                            page = await source.new_tab()
+                        ready = await source.is_order_ready(
+                            page, order_url, timeout=self._probe_timeout_ms
+                        )
+                    except Exception as exc:  # pylint: disable=broad-except
+                        logger.warning(
+                            "OrderMonitor: probe failed for %s: %s", order_url, exc
+                        )
+                        page = await self._close_quietly(page)
+                        # The browser behind the source may have been relaunched.
+                        source = None
+                        continue
+                    if ready:
+                        logger.info("OrderMonitor: order ready: %s", order_url)
+                        self._resolve(order_url)
+                if self._waiters:
+                    await asyncio.sleep(self._poll_interval_s)
+        finally:
+            await self._close_quietly(page)
+            logger.info("OrderMonitor: stopped (worker_pid=%d)", os.getpid())
+        if self._waiters:
+            # A waiter arrived while the probe tab was closing.
+            self._task = asyncio.create_task(self._run(), name="order-monitor")
+
+    @staticmethod
+    async def _close_quietly(page: Page | None) -> None:
+        if page is not None:
+            try:
+                await page.close()
+            except Exception:  # pylint: disable=broad-except
+                logger.debug("OrderMonitor: probe tab already closed")
+        return None
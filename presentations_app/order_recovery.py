@@ -0,0 +1,130 @@
+"""Resume failed generations from their recorded Sokratic order.
+
+A presentation records the order URL of its latest attempt and the
+resumable stages that finished (``order_submitted`` and ``downloaded_*``).
+A retry skips order submission and harvests only the formats whose file is
+still missing. Orders submitted before the URL was recorded can be matched
+back to their presentations from the account's order history.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Iterable
+
+from presentations_module import DownloadFormat
+
+FORMAT_STAGES = {
+    DownloadFormat.POWERPOINT: "downloaded_powerpoint",
+    DownloadFormat.PDF: "downloaded_pdf",
+    DownloadFormat.TEXT: "downloaded_text",
+}
+RESUMABLE_STAGES = frozenset({"order_submitted", *FORMAT_STAGES.values()})
+
+_FORMAT_EXTENSIONS = {
+    DownloadFormat.POWERPOINT: (".pptx", ".ppt"),
+    DownloadFormat.PDF: (".pdf",),
+    DownloadFormat.TEXT: (".txt",),
+}
+
+
+def existing_files(files: Iterable[str] | None) -> list[str]:
+    """Files of an earlier attempt that are still on this node's disk."""
+    return [path for path in files or [] if path and os.path.exists(path)]
+
+
+def missing_formats(
+    formats: Iterable[DownloadFormat],
+    completed_stages: Iterable[str],
+    files: Iterable[str],
+) -> list[DownloadFormat]:
+    """Formats that still have to be downloaded from the recorded order.
+
+    A format counts as done only if its stage completed and one of *files*
+    has its extension, so a retry on another node downloads it again.
+    """
+    done = set(completed_stages)
+    extensions = [os.path.splitext(path)[1].lower() for path in files]
+    return [
+        doc_format
+        for doc_format in formats
+        if FORMAT_STAGES[doc_format] not in done
+        or not any(ext in _FORMAT_EXTENSIONS[doc_format] for ext in extensions)
+    ]
+
+
+@dataclass(frozen=True)
+class HistoryOrder:
+    url: str
+    title: str
+    account: str | None = None
+
+
+_NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_title(value: str) -> str:
+    return _NON_WORD_RE.sub(" ", value.casefold()).strip()
+
+
+def reconcile_candidates(
+    rows: Iterable[tuple[str, str, str, str | None, str | None]],
+    orders: Iterable[HistoryOrder],
+    *,
+    limit: int,
+) -> list[tuple[str, str]]:
+    """``(presentation_id, topic)`` pairs that may take an order from the history.
+
+    *rows* are ``(id, topic, status, order_url, sokratic_account)``. A failed
+    row without an order qualifies, and so does a row whose recorded order
+    its account's history no longer lists (stale). A pending row without an
+    order is only waiting for a slot, so it is never matched. An account
+    whose history filled *limit* may have more orders than were read, so its
+    unlisted orders are not called stale.
+    """
+    listed: dict[str | None, set[str]] = {}
+    for order in orders:
+        listed.setdefault(order.account, set()).add(order.url)
+    complete = {account for account, urls in listed.items() if len(urls) < limit}
+
+    candidates: list[tuple[str, str]] = []
+    for presentation_id, topic, status, order_url, account in rows:
+        if not order_url:
+            if status == "failed":
+                candidates.append((presentation_id, topic))
+        elif account in complete and order_url not in listed[account]:
+            candidates.append((presentation_id, topic))
+    return candidates
+
+
+def match_orphaned_orders(
+    orphans: Iterable[tuple[str, str]],
+    orders: Iterable[HistoryOrder],
+    taken_urls: Iterable[str] = (),
+) -> dict[str, str]:
+    """Map presentation id -> order URL for unambiguous topic/title matches.
+
+    *orphans* are ``(presentation_id, topic)`` pairs without a usable
+    order (see :func:`reconcile_candidates`). A title that several orphans
+    or several free orders share is skipped rather than guessed.
+    """
+    taken = set(taken_urls)
+    orders_by_title: dict[str, list[str]] = {}
+    for order in orders:
+        if order.url in taken:
+            continue
+        urls = orders_by_title.setdefault(normalize_title(order.title), [])
+        if order.url not in urls:
+            urls.append(order.url)
+    orphans_by_title: dict[str, list[str]] = {}
+    for presentation_id, topic in orphans:
+        orphans_by_title.setdefault(normalize_title(topic), []).append(presentation_id)
+
+    matches: dict[str, str] = {}
+    for title, presentation_ids in orphans_by_title.items():
+        urls = orders_by_title.get(title, [])
+        if title and len(presentation_ids) == 1 and len(urls) == 1:
+            matches[presentation_ids[0]] = urls[0]
+    return matches
@@ -0,0 +1,367 @@
+"""Outbox relay: claim pending presentations and hand them to generate tasks.
+
+Presentations are inserted as ``pending``; the relay moves them to
+``queued`` with an atomic ``UPDATE ... WHERE status='pending'`` and sends
+one ``generate_presentation_task`` per row. Claims are sized by the free
+slots of this worker's pool or, with the node registry on, of every live
+node. The relay also owns the worker's node heartbeat, leader election and
+push dispatcher, which it starts and stops from Celery worker signals
+(see ``OutboxRelay.connect_signals``).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime, timezone as dt_timezone
+from typing import Any
+
+from celery.signals import celeryd_after_setup, worker_ready, worker_shutting_down
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .browser_pool import BrowserPool
+from .fair_queue import lock_pending_for_claim
+from .leader_election import LeaderElection, build_leader_election
+from .models import Presentation
+from .node_registry import (
+    NodeCapacity,
+    NodeHeartbeat,
+    RedisNodeRegistry,
+    assign_proportionally,
+    build_node_registry,
+    node_queue_name,
+)
+from .push_dispatch import PushDispatcher
+from .worker_node import get_worker_node_label
+
+logger = logging.getLogger(__name__)
+
+# A queued presentation no task claimed within this long goes back to pending.
+QUEUED_TIMEOUT_S = 300
+# pg_advisory_xact_lock key serializing node assignment across relays.
+_ASSIGN_LOCK_KEY = 0x70726573
+
+
+def _heartbeat_time(capacity: NodeCapacity) -> datetime:
+    return datetime.fromtimestamp(capacity.updated_at, tz=dt_timezone.utc)
+
+
+class OutboxRelay:
+    """Per-worker claim state and the cluster services the claims depend on.
+
+    *generate_task* is the Celery task started for every claimed
+    presentation; it is sent to the node's queue when the node registry
+    assigns the work, and with ``delay`` otherwise.
+    """
+
+    def __init__(self, browser_pool: BrowserPool, generate_task: Any) -> None:
+        self._pool = browser_pool
+        self._generate_task = generate_task
+        self._claim_lock = threading.Lock()
+        # Presentations this worker queued that no generate task claimed yet.
+        self.dispatched_ids: set[str] = set()
+        self.push_dispatcher: PushDispatcher | None = None
+        self.node_registry: RedisNodeRegistry | None = None
+        self.node_heartbeat: NodeHeartbeat | None = None
+        self.leader_election: LeaderElection | None = None
+
+    def is_cluster_leader(self) -> bool:
+        """Whether this worker runs cluster-wide periodic work (always, without an election)."""
+        return self.leader_election is None or self.leader_election.is_leader
+
+    def recover_stuck_presentations(self) -> None:
+        """Cluster-wide part of the relay: DB snapshot and resets of stuck rows."""
+        status_counts = Presentation.objects.values("status").annotate(n=Count("id"))
+        logger.info("Outbox relay DB snapshot: %s", {r["status"]: r["n"] for r in status_counts})
+
+        # --- recover stuck processing tasks (lease > 30 min) ---
+        stuck_cutoff = timezone.now() - timezone.timedelta(seconds=settings.PRESENTATIONS_LEASE_TIMEOUT_S)
+        stuck_ids = list(
+            Presentation.objects.filter(
+                Q(status="processing", processing_since__lt=stuck_cutoff)
+                | Q(status="processing", processing_since__isnull=True)
+            ).values_list("id", flat=True)
+        )
+        if stuck_ids:
+            logger.warning("Outbox relay: resetting %d stuck processing presentation(s) to pending.", len(stuck_ids))
+            Presentation.objects.filter(id__in=stuck_ids).update(
+                status="pending", processing_since=None, assigned_node=None
+            )
+
+        # --- recover stuck queued tasks (dispatched but never claimed) ---
+        queued_cutoff = timezone.now() - timezone.timedelta(seconds=QUEUED_TIMEOUT_S)
+        stuck_queued = Presentation.objects.filter(
+            status="queued", processing_since__lt=queued_cutoff
+        ).update(status="pending", processing_since=None, assigned_node=None)
+        if stuck_queued:
+            logger.warning("Outbox relay: reset %d stuck queued presentation(s) to pending.", stuck_queued)
+
+        if self.node_registry is not None:
+            try:
+                live_nodes = self.node_registry.live_nodes()
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("Outbox relay: node registry unavailable: %s", exc)
+            else:
+                logger.info(
+                    "Outbox relay live nodes: %s",
+                    {node: capacity.free_slots for node, capacity in live_nodes.items()},
+                )
+
+    def _reserved_dispatches(self) -> int:
+        """Presentations this worker queued that no generate task has claimed yet.
+
+        They hold no tab and no order slot so far, but must not be claimed for
+        twice; rows that left ``queued`` (on any worker) are forgotten.
+        """
+        if not self.dispatched_ids:
+            return 0
+        still_queued = {
+            str(pres_id)
+            for pres_id in Presentation.objects.filter(
+                id__in=list(self.dispatched_ids), status="queued"
+            ).values_list("id", flat=True)
+        }
+        self.dispatched_ids.intersection_update(still_queued)
+        return len(self.dispatched_ids)
+
+    def local_capacity(self) -> NodeCapacity:
+        """This worker's free slots: tabs under the budget and orders under the in-flight cap."""
+        node = get_worker_node_label()
+        local_active = self._pool.local_active_tabs
+        local_in_flight = self._pool.local_orders_in_flight
+        tab_budget = self._pool.local_tab_budget
+        free_slots = min(
+            tab_budget - local_active,
+            settings.PRESENTATIONS_MAX_ORDERS_IN_FLIGHT - local_in_flight,
+        )
+        return NodeCapacity(
+            node=node,
+            queue=node_queue_name(node),
+            free_slots=max(free_slots, 0),
+            tab_budget=tab_budget,
+            active_tabs=local_active,
+            orders_in_flight=local_in_flight,
+        )
+
+    @staticmethod
+    def _unreflected_assignments(live: dict[str, NodeCapacity]) -> dict[str, int]:
+        """Presentations sent to each node that its last heartbeat does not count yet.
+
+        That is everything still queued for it, plus what it started after the
+        heartbeat was taken.
+        """
+        counts = dict.fromkeys(live, 0)
+        if not live:
+            return counts
+        since = min(_heartbeat_time(capacity) for capacity in live.values())
+        rows = Presentation.objects.filter(assigned_node__in=list(live)).filter(
+            Q(status="queued") | Q(status="processing", processing_since__gte=since)
+        ).values_list("assigned_node", "status", "processing_since")
+        for node, status, started in rows:
+            if status == "queued" or (started is not None and started >= _heartbeat_time(live[node])):
+                counts[node] += 1
+        return counts
+
+    @staticmethod
+    def _requeue_orphaned(live: dict[str, NodeCapacity]) -> None:
+        """Send presentations queued for a node without a live heartbeat back to pending."""
+        orphaned = (
+            Presentation.objects.filter(status="queued", assigned_node__isnull=False)
+            .exclude(assigned_node__in=list(live))
+            .update(status="pending", processing_since=None, assigned_node=None)
+        )
+        if orphaned:
+            logger.warning(
+                "Outbox relay: reassigning %d presentation(s) queued for nodes without a heartbeat.",
+                orphaned,
+            )
+
+    def _assign_pending_to_nodes(self, reason: str) -> list[str] | None:
+        """Claim pending presentations for the whole cluster and send each to a node queue.
+
+        Nodes get presentations in proportion to their free slots; presentations
+        queued for a node without a live heartbeat are taken back first. Returns
+        None when the registry is unreachable, so the caller claims locally.
+        """
+        assert self.node_registry is not None and self.node_heartbeat is not None
+        if self.node_heartbeat.beat() is None:
+            return None
+        try:
+            live = self.node_registry.live_nodes()
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("Outbox relay: node registry unavailable, claiming locally: %s", exc)
+            return None
+
+        quiet_level = logging.INFO if reason == "relay" else logging.DEBUG
+        with self._claim_lock:
+            with transaction.atomic():
+                if connection.vendor == "postgresql":
+                    # One assigner at a time across the cluster, so two relays
+                    # never hand out the same free slot.
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [_ASSIGN_LOCK_KEY])
+                self._requeue_orphaned(live)
+                unreflected = self._unreflected_assignments(live)
+                free = {
+                    node: capacity.free_slots - unreflected[node] for node, capacity in live.items()
+                }
+                available_slots = sum(max(slots, 0) for slots in free.values())
+                if available_slots <= 0:
+                    logger.log(
+                        quiet_level,
+                        "Outbox relay: no free slots on %d live node(s) (reason=%s, free=%s).",
+                        len(live),
+                        reason,
+                        free,
+                    )
+                    return []
+                pending_ids = lock_pending_for_claim(available_slots)
+                assignments = list(zip(pending_ids, assign_proportionally(free, len(pending_ids))))
+                now = timezone.now()
+                for node in {node for _, node in assignments}:
+                    Presentation.objects.filter(
+                        id__in=[pres_id for pres_id, assigned in assignments if assigned == node]
+                    ).update(status="queued", processing_since=now, assigned_node=node)
+
+        per_node: dict[str, int] = {}
+        for pres_id, node in assignments:
+            self._generate_task.apply_async(
+                args=[pres_id], queue=live[node].queue, expires=QUEUED_TIMEOUT_S
+            )
+            per_node[node] = per_node.get(node, 0) + 1
+        if assignments:
+            logger.info(
+                "Outbox relay assigned %d presentation(s) (reason=%s, per_node=%s, free=%s).",
+                len(assignments),
+                reason,
+                per_node,
+                free,
+            )
+        return [pres_id for pres_id, _ in assignments]
+
+    def claim_pending_presentations(self, reason: str = "relay") -> list[str]:
+        """Queue as many pending presentations as there are free slots for.
+
+        Called by the relay tick and, with push dispatch, whenever a
+        presentation turns pending or the local pool frees a slot. With the
+        node registry on, claims are sized by every live node's heartbeat and
+        sent to node queues. Otherwise each worker sizes the claim by its own
+        pool, so workers sharing the DB do not starve each other; orders
+        waiting on server-side generation hold no tab, so orders in flight are
+        capped separately.
+        """
+        if self.node_heartbeat is not None:
+            assigned = self._assign_pending_to_nodes(reason)
+            if assigned is not None:
+                return assigned
+        # The relay logs every tick; push claims are frequent, so they log
+        # only when they dispatch something.
+        quiet_level = logging.INFO if reason == "relay" else logging.DEBUG
+        with self._claim_lock:
+            local_active = self._pool.local_active_tabs
+            local_in_flight = self._pool.local_orders_in_flight
+            tab_budget = self._pool.local_tab_budget
+            reserved = self._reserved_dispatches()
+            available_slots = min(
+                tab_budget - local_active,
+                settings.PRESENTATIONS_MAX_ORDERS_IN_FLIGHT - local_in_flight,
+            ) - reserved
+            available_slots = max(available_slots, 0)
+
+            if available_slots <= 0:
+                logger.log(
+                    quiet_level,
+                    "Outbox relay: no free slots (reason=%s, local_active=%d, tab_budget=%d, "
+                    "in_flight=%d, max_in_flight=%d, reserved=%d).",
+                    reason,
+                    local_active,
+                    tab_budget,
+                    local_in_flight,
+                    settings.PRESENTATIONS_MAX_ORDERS_IN_FLIGHT,
+                    reserved,
+                )
+                return []
+
+            # Atomically select and mark as "queued" using row-level locking.
+            # SKIP LOCKED ensures concurrent relays (e.g. production + slave)
+            # pick different presentations without duplicates; fair_queue
+            # decides which ones by priority and owner.
+            with transaction.atomic():
+                pending_ids = lock_pending_for_claim(available_slots)
+                if pending_ids:
+                    Presentation.objects.filter(id__in=pending_ids).update(
+                        status="queued", processing_since=timezone.now()
+                    )
+            self.dispatched_ids.update(pending_ids)
+
+        for pres_id in pending_ids:
+            self._generate_task.delay(pres_id)
+        if pending_ids:
+            logger.info(
+                "Outbox relay dispatched %d presentation(s) (reason=%s, local_active=%d, tab_budget=%d, "
+                "in_flight=%d, reserved=%d).",
+                len(pending_ids),
+                reason,
+                local_active,
+                tab_budget,
+                local_in_flight,
+                reserved,
+            )
+        return pending_ids
+
+    def connect_signals(self) -> None:
+        """Hook the handlers below to the Celery worker lifecycle."""
+        celeryd_after_setup.connect(self.subscribe_node_queue, weak=False)
+        worker_ready.connect(self.start_node_heartbeat, weak=False)
+        worker_ready.connect(self.start_leader_election, weak=False)
+        worker_ready.connect(self.start_push_dispatch, weak=False)
+        worker_shutting_down.connect(self.stop_node_heartbeat, weak=False)
+        worker_shutting_down.connect(self.stop_leader_election, weak=False)
+
+    def subscribe_node_queue(self, sender: str, instance: Any, **_kwargs: Any) -> None:
+        """Also consume this node's own queue (node-local beat tasks, node-targeted dispatch)."""
+        queue = node_queue_name(get_worker_node_label())
+        instance.app.amqp.queues.select_add(queue)
+        logger.info("Worker %s consumes node queue %s", sender, queue)
+        self.node_registry = build_node_registry()
+
+    def start_node_heartbeat(self, **_kwargs: Any) -> None:
+        """Publish this worker's free slots to the node registry (see ``node_registry``)."""
+        if self.node_registry is None or self.node_heartbeat is not None:
+            return
+        self.node_heartbeat = NodeHeartbeat(
+            self.node_registry, self.local_capacity, interval_s=settings.PRESENTATIONS_NODE_HEARTBEAT_S
+        )
+        self.node_heartbeat.start()
+
+    def stop_node_heartbeat(self, **_kwargs: Any) -> None:
+        """Drop the heartbeat at once, so the relay reassigns this node's queued work."""
+        if self.node_heartbeat is not None:
+            self.node_heartbeat.stop()
+
+    def start_leader_election(self, **_kwargs: Any) -> None:
+        """Contest the cluster leader lease (see ``leader_election``)."""
+        if self.leader_election is not None:
+            return
+        self.leader_election = build_leader_election()
+        if self.leader_election is not None:
+            self.leader_election.start()
+
+    def stop_leader_election(self, **_kwargs: Any) -> None:
+        """Release the lease on shutdown, so another node takes over without waiting for it to expire."""
+        if self.leader_election is not None:
+            self.leader_election.stop()
+
+    def start_push_dispatch(self, **_kwargs: Any) -> None:
+        """Start the worker's push dispatcher (see ``push_dispatch``) once Celery is up."""
+        if not settings.PRESENTATIONS_PUSH_DISPATCH or self.push_dispatcher is not None:
+            return
+        self.push_dispatcher = PushDispatcher(
+            self.claim_pending_presentations,
+            debounce_s=settings.PRESENTATIONS_PUSH_DISPATCH_DEBOUNCE_MS / 1000,
+        )
+        self._pool.add_capacity_listener(self.push_dispatcher.kick)
+        self.push_dispatcher.start()
@@ -0,0 +1,182 @@
+"""Event-driven dispatch of pending presentations.
+
+A PostgreSQL trigger (migration 0013) sends ``NOTIFY presentations_pending``
+whenever a presentation is inserted as, or moved back to, ``pending``. Each
+worker keeps one listener thread on that channel, and the browser pool wakes
+the same thread whenever it releases a tab or an order-in-flight slot. On
+every wake-up the thread runs the local claim, so new work is picked up
+within the debounce window instead of on the next relay tick. The periodic
+``dispatch_pending_presentations`` stays as the safety net for missed
+notifications and stuck rows.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import select
+import threading
+import time
+from typing import Any, Callable
+
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+PENDING_CHANNEL = "presentations_pending"
+
+
+class PushDispatcher:  # pylint: disable=too-many-instance-attributes
+    """Listener thread that runs *claim* on notifications and local capacity changes.
+
+    ``claim(reason)`` is called from the listener thread only, never
+    concurrently with itself. Bursts of wake-ups within *debounce_s* are
+    coalesced into one claim.
+    """
+
+    def __init__(
+        self,
+        claim: Callable[[str], Any],
+        *,
+        debounce_s: float = 0.1,
+        reconnect_s: float = 5.0,
+        listen: bool = True,
+        alias: str = "default",
+    ) -> None:
+        self._claim = claim
+        self.debounce_s = debounce_s
+        self.reconnect_s = reconnect_s
+        self.alias = alias
+        self.listen = listen and connections[alias].vendor == "postgresql"
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._reasons: set[str] = set()
+        self._reasons_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._wrapper: Any = None
+        self._db: Any = None
+        self.claims = 0
+        self.notifications = 0
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="push-dispatch")
+        self._thread.start()
+        logger.info(
+            "PushDispatcher: started (listen=%s, channel=%s, worker_pid=%d)",
+            self.listen,
+            PENDING_CHANNEL,
+            os.getpid(),
+        )
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        self._stop.set()
+        self.kick("stop")
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def kick(self, reason: str = "capacity") -> None:
+        """Request a claim from any thread; never blocks."""
+        with self._reasons_lock:
+            self._reasons.add(reason)
+        try:
+            os.write(self._wake_w, b"\0")
+        except BlockingIOError:
+            pass  # the pipe is full, so a wake-up is already pending
+
+    # --- listener thread ---
+
+    def _run(self) -> None:
+        next_connect = 0.0
+        while not self._stop.is_set():
+            if self.listen and self._db is None and time.monotonic() >= next_connect:
+                if self._connect():
+                    # Rows that turned pending while nobody listened.
+                    self.kick("listen")
+                else:
+                    next_connect = time.monotonic() + self.reconnect_s
+            readers = [self._wake_r] + ([self._db.fileno()] if self._db is not None else [])
+            try:
+                ready, _, _ = select.select(readers, [], [], self.reconnect_s)
+            except (OSError, ValueError) as exc:
+                logger.warning("PushDispatcher: select failed: %s", exc)
+                self._disconnect()
+                continue
+            if not ready:
+                continue
+            time.sleep(self.debounce_s)
+            reasons = self._drain()
+            if reasons and not self._stop.is_set():
+                self._run_claim(",".join(sorted(reasons)))
+
+    def _drain(self) -> set[str]:
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        with self._reasons_lock:
+            reasons, self._reasons = self._reasons, set()
+        if self._db is not None:
+            try:
+                received = sum(1 for _ in self._db.notifies(timeout=0))
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("PushDispatcher: lost the %s listener: %s", PENDING_CHANNEL, exc)
+                self._disconnect()
+                reasons.add("listen")
+            else:
+                if received:
+                    self.notifications += received
+                    reasons.add("notify")
+        reasons.discard("stop")
+        return reasons
+
+    def _run_claim(self, reason: str) -> None:
+        close_old_connections()
+        try:
+            self._claim(reason)
+            self.claims += 1
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("PushDispatcher: claim failed (reason=%s)", reason)
+        finally:
+            close_old_connections()
+
+    def _connect(self) -> bool:
+        wrapper = connections.create_connection(self.alias)
+        try:
+            wrapper.ensure_connection()
+            db = wrapper.connection
+            db.autocommit = True
+            db.execute(f"LISTEN {PENDING_CHANNEL}")
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning(
+                "PushDispatcher: cannot LISTEN on %s, retrying in %.0fs: %s",
+                PENDING_CHANNEL,
+                self.reconnect_s,
+                exc,
+            )
+            wrapper.close()
+            return False
+        self._wrapper, self._db = wrapper, db
+        logger.info("PushDispatcher: listening on %s", PENDING_CHANNEL)
+        return True
+
+    def _disconnect(self) -> None:
+        if self._db is None:
+            return
+        try:
+            self._wrapper.close()
+        except Exception:  # pylint: disable=broad-except
+            pass
+        self._wrapper = self._db = None
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "listening": self._db is not None,
+            "claims": self.claims,
+            "notifications": self.notifications,
+        }
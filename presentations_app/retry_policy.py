@@ -0,0 +1,61 @@
+"""When a failed presentation is tried again, by what made it fail.
+
+- ``data``: the request can never succeed (:class:`PresentationDataError`,
+  e.g. a style index the gallery does not have). It fails at once.
+- ``browser``: our own tab or browser died (``TargetClosedError``). It is
+  retried after a short delay, on a fresh tab.
+- ``auth``: the session was logged out or logging in failed
+  (:class:`AuthenticationError`). It is retried after a short delay, once
+  the browser has logged in again; the account is not quarantined for it.
+- ``site``: anything else. Sokratic was slow, down or changed: timeouts,
+  HTTP errors, page elements missing. It is retried after a long delay.
+
+The delay doubles with every attempt up to
+``PRESENTATIONS_RETRY_BACKOFF_MAX_S``. It is drawn from the upper half of
+that value (equal jitter), so rows that failed together during an outage
+come back spread out. The delay ends up in ``next_attempt_at``, and claims
+skip pending rows until that time.
+"""
+
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from playwright._impl._errors import TargetClosedError
+
+from presentations_module import AuthenticationError, PresentationDataError
+
+FAILURE_DATA = "data"
+FAILURE_BROWSER = "browser"
+FAILURE_AUTH = "auth"
+FAILURE_SITE = "site"
+
+
+def classify_failure(exc: BaseException) -> str:
+    if isinstance(exc, PresentationDataError):
+        return FAILURE_DATA
+    if isinstance(exc, TargetClosedError):
+        return FAILURE_BROWSER
+    if isinstance(exc, AuthenticationError):
+        return FAILURE_AUTH
+    return FAILURE_SITE
+
+
+def retry_delay_s(failure: str, attempt: int, *, rng: random.Random | None = None) -> float:
+    """Backoff before attempt ``attempt + 1`` after *attempt* failed ones (1-based)."""
+    base = float(settings.PRESENTATIONS_RETRY_BACKOFF_S.get(failure, 300))
+    ceiling = min(base * 2 ** max(attempt - 1, 0), float(settings.PRESENTATIONS_RETRY_BACKOFF_MAX_S))
+    return (rng or random).uniform(ceiling / 2, ceiling)
+
+
+def next_attempt_at(failure: str, attempt: int, *, now: datetime | None = None) -> datetime:
+    return (now or timezone.now()) + timedelta(seconds=retry_delay_s(failure, attempt))
+
+
+def due_for_attempt(now: datetime | None = None) -> Q:
+    """Pending rows that are new or whose backoff has ended."""
+    return Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now or timezone.now())
@@ -14,7 +14,16 @@ class PresentationService:
     ) -> Presentation:
         """Create a Presentation record from the provided command DTO."""
 
-        return Presentation.objects.create(
+        presentation = self.build_presentation(command)
+        presentation.save(force_insert=True)
+        return presentation
+
+    def build_presentation(
+        self, command: CreatePresentationCommandDto
+    ) -> Presentation:
+        """Build an unsaved Presentation from the command DTO (e.g. for bulk_create)."""
+
+        return Presentation(
             topic=command.topic,
             language=command.language,
             slides_amount=command.slides_amount,
@@ -26,4 +35,6 @@ class PresentationService:
             template=command.template,
             status=command.status,
             files=list(command.files),
+            priority=command.priority,
+            owner_key=command.owner_key,
         )
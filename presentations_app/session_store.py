@@ -0,0 +1,210 @@
+"""Shared Sokratic login state (Playwright ``storage_state``) for all workers.
+
+Browsers start from the stored cookies/localStorage instead of logging in.
+A real login happens only when the stored state is missing or expired, and
+the refresh lock makes sure a single process does it while the others wait.
+Methods are blocking; call them from the browser-pool loop via
+``asyncio.to_thread``.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Cookies expiring sooner than this are treated as already expired.
+_COOKIE_EXPIRY_MARGIN_S = 300
+
+
+def is_session_state_valid(
+    record: dict[str, Any] | None,
+    *,
+    max_age_s: int,
+    now: float | None = None,
+) -> bool:
+    """Cheap validity check: record age and cookie expiry, no page load."""
+    if not record or not isinstance(record.get("storage_state"), dict):
+        return False
+    now = time.time() if now is None else now
+    saved_at = float(record.get("saved_at") or 0)
+    if now - saved_at > max_age_s:
+        return False
+    cookies = record["storage_state"].get("cookies") or []
+    if not cookies:
+        return False
+    for cookie in cookies:
+        expires = float(cookie.get("expires") or -1)
+        # -1 marks a session cookie, which lives as long as the record does.
+        if 0 < expires < now + _COOKIE_EXPIRY_MARGIN_S:
+            return False
+    return True
+
+
+class SessionStore(ABC):
+    """Persisted storage state plus a cross-process refresh lock."""
+
+    @abstractmethod
+    def load(self) -> dict[str, Any] | None:
+        """The stored record (``saved_at`` and ``storage_state``), or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def save(self, storage_state: dict[str, Any]) -> None:
+        """Store *storage_state* stamped with the current time."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Forget the stored state, so the next browser logs in."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def acquire_refresh_lock(self, timeout_s: float) -> Any | None:
+        """Block up to *timeout_s* for the refresh lock; return a handle or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def release_refresh_lock(self, handle: Any) -> None:
+        """Release a handle returned by :meth:`acquire_refresh_lock`."""
+        raise NotImplementedError
+
+    @staticmethod
+    def _record(storage_state: dict[str, Any]) -> dict[str, Any]:
+        return {"saved_at": time.time(), "storage_state": storage_state}
+
+
+class FileSessionStore(SessionStore):
+    """JSON file on a local or shared volume; ``flock`` guards the refresh."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+
+    def load(self) -> dict[str, Any] | None:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            logger.warning("SessionStore: unreadable session file %s: %s", self.path, exc)
+            return None
+
+    def save(self, storage_state: dict[str, Any]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(self._record(storage_state), fh)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+    def acquire_refresh_lock(self, timeout_s: float) -> Any | None:
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        fh = open(self.lock_path, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+        deadline = time.monotonic() + timeout_s
+        while True:
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fh
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    fh.close()
+                    return None
+                time.sleep(0.5)
+
+    def release_refresh_lock(self, handle: Any) -> None:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+        finally:
+            handle.close()
+
+
+class RedisSessionStore(SessionStore):
+    """Redis key shared by every node; a Redis lock guards the refresh."""
+
+    def __init__(self, url: str, key: str, *, ttl_s: int, lock_ttl_s: int) -> None:
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self.key = key
+        self.ttl_s = ttl_s
+        self.lock_ttl_s = lock_ttl_s
+
+    def load(self) -> dict[str, Any] | None:
+        raw = self._client.get(self.key)
+        if not raw:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError as exc:
+            logger.warning("SessionStore: unreadable session key %s: %s", self.key, exc)
+            return None
+
+    def save(self, storage_state: dict[str, Any]) -> None:
+        self._client.set(self.key, json.dumps(self._record(storage_state)), ex=self.ttl_s)
+
+    def clear(self) -> None:
+        self._client.delete(self.key)
+
+    def acquire_refresh_lock(self, timeout_s: float) -> Any | None:
+        # Not thread-local: acquire and release may run on different
+        # asyncio.to_thread workers.
+        lock = self._client.lock(
+            f"{self.key}:refresh",
+            timeout=self.lock_ttl_s,
+            blocking_timeout=timeout_s,
+            thread_local=False,
+        )
+        if lock.acquire(token=uuid.uuid4().hex):
+            return lock
+        return None
+
+    def release_refresh_lock(self, handle: Any) -> None:
+        try:
+            handle.release()
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("SessionStore: refresh lock already expired: %s", exc)
+
+
+def build_session_store(account_key: str | None = None) -> SessionStore | None:
+    """Store selected by PRESENTATIONS_SESSION_STORE (auto | redis | file | off).
+
+    With *account_key* the state is kept per Sokratic account: the Redis key
+    and the file name get the key as a suffix.
+    """
+    backend = (settings.PRESENTATIONS_SESSION_STORE or "auto").strip().lower()
+    redis_url = settings.PRESENTATIONS_SESSION_REDIS_URL or ""
+    if backend == "auto":
+        backend = "redis" if redis_url.startswith(("redis://", "rediss://", "unix://")) else "file"
+    if backend == "redis":
+        key = settings.PRESENTATIONS_SESSION_REDIS_KEY
+        return RedisSessionStore(
+            redis_url,
+            f"{key}:{account_key}" if account_key else key,
+            ttl_s=settings.PRESENTATIONS_SESSION_MAX_AGE_S,
+            lock_ttl_s=settings.PRESENTATIONS_SESSION_LOCK_TIMEOUT_S,
+        )
+    if backend == "file":
+        path = Path(settings.PRESENTATIONS_SESSION_FILE)
+        if account_key:
+            path = path.with_name(f"{path.stem}.{account_key}{path.suffix}")
+        return FileSessionStore(path)
+    return None
@@ -0,0 +1,308 @@
+"""Cluster-wide pacing of Sokratic actions (Redis token buckets and semaphores).
+
+Every worker on every node asks the same Redis keys for permission before it
+submits an order or exports a file, so the total load on sokratic.ru stays
+under the configured rate and concurrency instead of each process throttling
+on its own. Concurrency slots are shared max-min fairly between the nodes
+that currently want them. Redis errors fail open: the action runs unpaced
+and the error is counted.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import random
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator
+
+from django.conf import settings
+
+from presentations_module import SITE_ACTIONS, SiteGovernor
+
+from .worker_node import get_worker_node_label
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] bucket hash. ARGV: capacity, refill tokens per second.
+# Returns 0 when a token was taken, else the milliseconds until one is due.
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 60000)
+return wait
+"""
+
+# KEYS[1] holders zset ("node|token" -> lease expiry ms), KEYS[2] waiting
+# nodes zset (node -> last attempt ms). ARGV: limit, node, token, lease ms,
+# waiting window ms. Returns 1 when a slot was taken.
+_SEMAPHORE_ACQUIRE_LUA = """
+local limit = tonumber(ARGV[1])
+local node = ARGV[2]
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now - tonumber(ARGV[5]))
+local holders = redis.call('ZRANGE', KEYS[1], 0, -1)
+local nodes, contenders, mine = {}, 0, 0
+for _, member in ipairs(holders) do
+  local holder = string.match(member, '^(.*)|')
+  if not nodes[holder] then nodes[holder] = true; contenders = contenders + 1 end
+  if holder == node then mine = mine + 1 end
+end
+for _, waiting in ipairs(redis.call('ZRANGE', KEYS[2], 0, -1)) do
+  if not nodes[waiting] then nodes[waiting] = true; contenders = contenders + 1 end
+end
+if not nodes[node] then contenders = contenders + 1 end
+local granted = #holders < limit and mine < math.ceil(limit / contenders)
+if granted then
+  redis.call('ZADD', KEYS[1], now + tonumber(ARGV[4]), node .. '|' .. ARGV[3])
+else
+  redis.call('ZADD', KEYS[2], now, node)
+end
+redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[4]) + 60000)
+redis.call('PEXPIRE', KEYS[2], tonumber(ARGV[5]) + 60000)
+if granted then return 1 end
+return 0
+"""
+
+# KEYS[1] holders zset. ARGV: member, lease ms. Extends a held lease.
+_SEMAPHORE_RENEW_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+return redis.call('ZADD', KEYS[1], 'XX', 'CH', now + tonumber(ARGV[2]), ARGV[1])
+"""
+
+
+def parse_rates(raw: dict[str, str]) -> dict[str, tuple[float, float]]:
+    """``{"submit": "12/60"}`` -> ``{"submit": (12.0, 0.2)}``: burst and tokens per second."""
+    rates: dict[str, tuple[float, float]] = {}
+    for action, value in raw.items():
+        count, _, per = value.partition("/")
+        try:
+            burst, seconds = float(count), float(per or 1)
+        except ValueError:
+            logger.warning("SiteGovernor: ignoring malformed rate %s=%s", action, value)
+            continue
+        if action in SITE_ACTIONS and burst > 0 and seconds > 0:
+            rates[action] = (burst, burst / seconds)
+    return rates
+
+
+def parse_limits(raw: dict[str, str]) -> dict[str, int]:
+    """``{"download": "8"}`` -> ``{"download": 8}``; non-positive values mean no cap."""
+    limits: dict[str, int] = {}
+    for action, value in raw.items():
+        if action in SITE_ACTIONS and value.strip().isdigit() and int(value) > 0:
+            limits[action] = int(value)
+    return limits
+
+
+@dataclass(frozen=True)
+class SitePacing:
+    """Per-action limits: ``rates`` from :func:`parse_rates`, ``limits`` from :func:`parse_limits`."""
+
+    rates: dict[str, tuple[float, float]]
+    limits: dict[str, int]
+
+
+@dataclass
+class ActionWaitStats:
+    """Permits granted for one action on this worker and the time spent waiting for them."""
+
+    granted: int = 0
+    waiting: int = 0
+    errors: int = 0
+    wait_s_total: float = 0.0
+    wait_s_max: float = 0.0
+
+    def record(self, waited_s: float) -> None:
+        self.granted += 1
+        self.wait_s_total += waited_s
+        self.wait_s_max = max(self.wait_s_max, waited_s)
+
+    def as_dict(self) -> dict[str, Any]:
+        values = asdict(self)
+        values["wait_s_avg"] = round(self.wait_s_total / self.granted, 3) if self.granted else 0.0
+        values["wait_s_total"] = round(self.wait_s_total, 3)
+        values["wait_s_max"] = round(self.wait_s_max, 3)
+        return values
+
+
+class RedisSiteGovernor(SiteGovernor):
+    """Token bucket plus fair distributed semaphore per action, shared through Redis.
+
+    Must be used from one event loop (the browser pool's). Redis calls are
+    blocking and run via ``asyncio.to_thread``; waits are ``asyncio.sleep``.
+    """
+
+    _POLL_S = 0.5
+    _WAITING_WINDOW_MS = 5000
+
+    def __init__(
+        self,
+        client: Any,
+        *,
+        key_prefix: str,
+        rates: dict[str, tuple[float, float]],
+        limits: dict[str, int],
+        lease_s: float,
+        node: str | None = None,
+    ) -> None:
+        self._client = client
+        self.key_prefix = key_prefix
+        self.pacing = SitePacing(rates=rates, limits=limits)
+        self.lease_s = lease_s
+        self.node = node or get_worker_node_label()
+        self._take_token = client.register_script(_TOKEN_BUCKET_LUA)
+        self._acquire_slot = client.register_script(_SEMAPHORE_ACQUIRE_LUA)
+        self._renew_slot = client.register_script(_SEMAPHORE_RENEW_LUA)
+        self.stats = {action: ActionWaitStats() for action in SITE_ACTIONS}
+
+    def _key(self, action: str, kind: str) -> str:
+        return f"{self.key_prefix}:{action}:{kind}"
+
+    @contextlib.asynccontextmanager
+    async def permit(self, action: str) -> AsyncIterator[None]:
+        if action not in SITE_ACTIONS:
+            raise ValueError(f"Unknown site action: {action!r}")
+        stats = self.stats[action]
+        started = time.monotonic()
+        member: str | None = None
+        stats.waiting += 1
+        try:
+            # Slot first, then the token: a token is never spent while the
+            # action still waits for concurrency.
+            member = await self._wait_for_slot(action)
+            await self._wait_for_token(action)
+        except asyncio.CancelledError:
+            if member is not None:
+                await self._release(action, member)
+            raise
+        except Exception as exc:  # pylint: disable=broad-except
+            stats.errors += 1
+            logger.warning("SiteGovernor: %s not paced, Redis unavailable: %s", action, exc)
+        finally:
+            stats.waiting -= 1
+        waited_s = time.monotonic() - started
+        stats.record(waited_s)
+        if waited_s >= 1:
+            logger.info("SiteGovernor: waited %.1fs for %s (node=%s)", waited_s, action, self.node)
+
+        renewer: asyncio.Task[None] | None = None
+        if member is not None:
+            renewer = asyncio.get_running_loop().create_task(
+                self._renew(action, member), name=f"site-governor-{action}-lease"
+            )
+        try:
+            yield
+        finally:
+            if renewer is not None:
+                renewer.cancel()
+            if member is not None:
+                await self._release(action, member)
+
+    async def _wait_for_slot(self, action: str) -> str | None:
+        limit = self.pacing.limits.get(action)
+        if not limit:
+            return None
+        token = uuid.uuid4().hex
+        while True:
+            granted = await asyncio.to_thread(
+                self._acquire_slot,
+                keys=[self._key(action, "holders"), self._key(action, "waiting")],
+                args=[limit, self.node, token, int(self.lease_s * 1000), self._WAITING_WINDOW_MS],
+            )
+            if int(granted):
+                return f"{self.node}|{token}"
+            await asyncio.sleep(self._POLL_S * random.uniform(0.5, 1.5))
+
+    async def _wait_for_token(self, action: str) -> None:
+        rate = self.pacing.rates.get(action)
+        if rate is None:
+            return
+        burst, per_second = rate
+        while True:
+            wait_ms = int(
+                await asyncio.to_thread(
+                    self._take_token,
+                    keys=[self._key(action, "bucket")],
+                    args=[burst, per_second],
+                )
+            )
+            if wait_ms <= 0:
+                return
+            # Jitter spreads the retries of nodes that were told the same wait.
+            await asyncio.sleep(wait_ms / 1000 * random.uniform(1.0, 1.2))
+
+    async def _renew(self, action: str, member: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_s / 3)
+            try:
+                await asyncio.to_thread(
+                    self._renew_slot,
+                    keys=[self._key(action, "holders")],
+                    args=[member, int(self.lease_s * 1000)],
+                )
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("SiteGovernor: failed to renew %s lease: %s", action, exc)
+
+    async def _release(self, action: str, member: str) -> None:
+        try:
+            await asyncio.to_thread(self._client.zrem, self._key(action, "holders"), member)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("SiteGovernor: failed to release %s slot, it expires with its lease: %s", action, exc)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "node": self.node,
+            "rates_per_min": {
+                action: round(per_second * 60, 2) for action, (_, per_second) in self.pacing.rates.items()
+            },
+            "limits": dict(self.pacing.limits),
+            "actions": {action: stats.as_dict() for action, stats in self.stats.items()},
+        }
+
+
+def build_site_governor() -> RedisSiteGovernor | None:
+    """Governor selected by PRESENTATIONS_SITE_GOVERNOR (auto | redis | off).
+
+    None when it is off, when no rate or concurrency limit is configured, or
+    (in ``auto``) when the URL is not a Redis URL.
+    """
+    backend = (settings.PRESENTATIONS_SITE_GOVERNOR or "auto").strip().lower()
+    redis_url = settings.PRESENTATIONS_SITE_GOVERNOR_REDIS_URL or ""
+    if backend == "auto":
+        backend = "redis" if redis_url.startswith(("redis://", "rediss://", "unix://")) else "off"
+    if backend != "redis":
+        return None
+    rates = parse_rates(settings.PRESENTATIONS_SITE_RATES)
+    limits = parse_limits(settings.PRESENTATIONS_SITE_CONCURRENCY)
+    if not rates and not limits:
+        return None
+
+    import redis
+
+    return RedisSiteGovernor(
+        redis.Redis.from_url(redis_url),
+        key_prefix=settings.PRESENTATIONS_SITE_GOVERNOR_KEY,
+        rates=rates,
+        limits=limits,
+        lease_s=max(settings.PRESENTATIONS_SITE_LEASE_S, 3),
+    )
@@ -0,0 +1,187 @@
+"""Sokratic accounts the browser pool logs in with.
+
+Each account gets its own browser shard(s), login session and tab cap, so
+throughput scales past a single account's limits. An account whose logins
+or tab phases keep failing is quarantined for a while and receives no new
+orders; orders it already owns still finish on it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class SokraticAccount:  # pylint: disable=too-many-instance-attributes
+    """Credentials plus the runtime load and health of one account."""
+
+    username: str
+    password: str = field(repr=False)
+    max_tabs: int = 0
+    capacity: int = 0
+    active_tabs: int = 0
+    failures: int = 0
+    quarantined_until: float = 0.0
+    quarantines: int = 0
+    last_error: str = ""
+
+    @property
+    def key(self) -> str:
+        """Stable id for session-store keys and file names (no e-mail in them)."""
+        return hashlib.sha256(self.username.strip().casefold().encode("utf-8")).hexdigest()[:12]
+
+    @property
+    def load(self) -> float:
+        return self.active_tabs / self.capacity if self.capacity else float(self.active_tabs)
+
+    def is_quarantined(self, now: float | None = None) -> bool:
+        return (time.monotonic() if now is None else now) < self.quarantined_until
+
+    def admits(self, now: float | None = None) -> bool:
+        """Takes new orders: not quarantined and below its tab cap."""
+        if self.is_quarantined(now):
+            return False
+        return not self.capacity or self.active_tabs < self.capacity
+
+    def record_success(self) -> None:
+        self.failures = 0
+
+    def record_failure(
+        self,
+        reason: str,
+        *,
+        threshold: int,
+        quarantine_s: float,
+        can_quarantine: bool = True,
+        now: float | None = None,
+    ) -> bool:
+        """Count a failure; return True if it put the account into quarantine.
+
+        *can_quarantine* is False when no other account could take over, so
+        the last usable account keeps serving instead of stalling the pool.
+        """
+        self.failures += 1
+        self.last_error = reason
+        if not threshold or self.failures < threshold or not can_quarantine:
+            return False
+        now = time.monotonic() if now is None else now
+        self.quarantined_until = now + quarantine_s
+        self.quarantines += 1
+        self.failures = 0
+        return True
+
+    def snapshot(self, now: float | None = None) -> dict[str, Any]:
+        now = time.monotonic() if now is None else now
+        return {
+            "username": self.username,
+            "active_tabs": self.active_tabs,
+            "capacity": self.capacity,
+            "failures": self.failures,
+            "quarantined_s": max(int(self.quarantined_until - now), 0),
+            "quarantines": self.quarantines,
+            "last_error": self.last_error,
+        }
+
+
+class AccountPool:
+    """The configured accounts: lookup, combined tab capacity and quarantine."""
+
+    def __init__(self, accounts: Iterable[SokraticAccount] = ()) -> None:
+        self.accounts = list(accounts)
+
+    def __iter__(self) -> Iterator[SokraticAccount]:
+        return iter(self.accounts)
+
+    def __len__(self) -> int:
+        return len(self.accounts)
+
+    @property
+    def names(self) -> list[str]:
+        return [account.username for account in self.accounts]
+
+    @property
+    def capacity(self) -> int:
+        return sum(account.capacity for account in self.accounts)
+
+    def get(self, name: str | None) -> SokraticAccount | None:
+        for account in self.accounts:
+            if account.username == name:
+                return account
+        return None
+
+    def record_failure(
+        self, account: SokraticAccount, reason: str, now: float | None = None
+    ) -> int | None:
+        """Count a failure against *account*; return the quarantine length if it started one.
+
+        The last account that is not quarantined keeps serving, so the pool
+        never stalls on quarantines alone.
+        """
+        now = time.monotonic() if now is None else now
+        can_quarantine = any(
+            other is not account and not other.is_quarantined(now) for other in self.accounts
+        )
+        quarantine_s = settings.PRESENTATIONS_ACCOUNT_QUARANTINE_S
+        if not account.record_failure(
+            reason,
+            threshold=settings.PRESENTATIONS_ACCOUNT_QUARANTINE_FAILURES,
+            quarantine_s=quarantine_s,
+            can_quarantine=can_quarantine,
+            now=now,
+        ):
+            return None
+        logger.warning(
+            "BrowserPool: account %s quarantined for %ds (%s, worker_pid=%d)",
+            account.username,
+            quarantine_s,
+            reason,
+            os.getpid(),
+        )
+        return quarantine_s
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        return [account.snapshot() for account in self.accounts]
+
+
+def parse_accounts(entries: Iterable[str]) -> list[SokraticAccount]:
+    """Parse ``username:password[:max_tabs]`` entries, skipping malformed ones.
+
+    A trailing all-digit segment is the account's tab cap, so a password
+    that itself ends in ``:<digits>`` needs an explicit cap after it.
+    """
+    accounts: list[SokraticAccount] = []
+    seen: set[str] = set()
+    for entry in entries:
+        username, sep, rest = entry.strip().partition(":")
+        if not sep or not username or not rest:
+            continue
+        password, max_tabs = rest, 0
+        head, sep, tail = rest.rpartition(":")
+        if sep and head and tail.isdigit():
+            password, max_tabs = head, int(tail)
+        if username.casefold() in seen:
+            continue
+        seen.add(username.casefold())
+        accounts.append(SokraticAccount(username=username, password=password, max_tabs=max_tabs))
+    return accounts
+
+
+def configured_accounts() -> list[SokraticAccount]:
+    """SOKRATIC_ACCOUNTS, or the single SOKRATIC_USERNAME/SOKRATIC_PASSWORD account."""
+    accounts = parse_accounts(settings.SOKRATIC_ACCOUNTS)
+    if accounts:
+        return accounts
+    login = os.environ.get("SOKRATIC_USERNAME")
+    password = os.environ.get("SOKRATIC_PASSWORD")
+    if not login or not password:
+        return []
+    return [SokraticAccount(username=login, password=password)]
@@ -0,0 +1,251 @@
+"""AIMD controller for the browser pool's tab budget.
+
+The budget grows by one tab per healthy control interval while it is
+actually used and is cut multiplicatively when the pool or the host shows
+stress: slow stages, timeouts/failures, CPU or memory pressure, or Chromium
+RSS over its limit. After a cut the budget holds for one interval before it
+may grow again, so a single bad reading does not make it oscillate.
+:class:`TabBudget` runs the controller on the browser-pool event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from django.conf import settings
+
+from .host_metrics import HostPressure, process_tree_rss, read_host_pressure
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _StageLatency:
+    """Fast and slow EWMA of one stage's duration; the slow one is the baseline."""
+
+    fast: float
+    slow: float
+    samples: int = 1
+
+
+@dataclass
+class TabControllerLimits:  # pylint: disable=too-many-instance-attributes
+    min_tabs: int
+    max_tabs: int
+    cpu_load_high: float = 0.9
+    cpu_psi_high: float = 40.0
+    memory_used_high: float = 0.9
+    memory_psi_high: float = 10.0
+    chromium_rss_limit: int = 0
+    failure_rate_high: float = 0.25
+    latency_factor: float = 2.0
+    decrease_factor: float = 0.7
+    outcome_window_s: float = 300.0
+    min_outcomes: int = 4
+    min_stage_samples: int = 5
+
+
+@dataclass
+class AdaptiveTabController:
+    """Additive-increase / multiplicative-decrease tab budget.
+
+    Feed it with :meth:`record_stage` and :meth:`record_outcome`, then call
+    :meth:`evaluate` once per control interval. Use from one event loop.
+    """
+
+    limits: TabControllerLimits
+    budget: int = 0
+    last_reason: str = "initial"
+    _latencies: dict[str, _StageLatency] = field(default_factory=dict)
+    _outcomes: deque[tuple[float, bool]] = field(default_factory=deque)
+    _hold: bool = False
+
+    _FAST_ALPHA = 0.3
+    _SLOW_ALPHA = 0.05
+
+    def __post_init__(self) -> None:
+        if self.limits.min_tabs < 1 or self.limits.max_tabs < self.limits.min_tabs:
+            raise ValueError(f"Invalid tab bounds: {self.limits.min_tabs}..{self.limits.max_tabs}")
+        if not self.budget:
+            self.budget = self.limits.max_tabs
+        self.budget = self._clamp(self.budget)
+
+    def _clamp(self, value: int) -> int:
+        return max(self.limits.min_tabs, min(self.limits.max_tabs, value))
+
+    def record_stage(self, stage: str, seconds: float) -> None:
+        entry = self._latencies.get(stage)
+        if entry is None:
+            self._latencies[stage] = _StageLatency(fast=seconds, slow=seconds)
+            return
+        entry.fast += self._FAST_ALPHA * (seconds - entry.fast)
+        entry.slow += self._SLOW_ALPHA * (seconds - entry.slow)
+        entry.samples += 1
+
+    def record_outcome(self, failed: bool, now: float | None = None) -> None:
+        self._outcomes.append((time.monotonic() if now is None else now, failed))
+
+    def failure_rate(self, now: float | None = None) -> float | None:
+        now = time.monotonic() if now is None else now
+        while self._outcomes and now - self._outcomes[0][0] > self.limits.outcome_window_s:
+            self._outcomes.popleft()
+        if len(self._outcomes) < self.limits.min_outcomes:
+            return None
+        return sum(1 for _, failed in self._outcomes if failed) / len(self._outcomes)
+
+    def _stress_reason(
+        self,
+        pressure: HostPressure,
+        chromium_rss: int | None,
+        now: float | None,
+    ) -> str | None:
+        limits = self.limits
+        checks = (
+            ("cpu_load", pressure.cpu_load, limits.cpu_load_high),
+            ("cpu_psi", pressure.cpu_psi, limits.cpu_psi_high),
+            ("memory_used", pressure.memory_used, limits.memory_used_high),
+            ("memory_psi", pressure.memory_psi, limits.memory_psi_high),
+            ("failure_rate", self.failure_rate(now), limits.failure_rate_high),
+        )
+        for name, value, threshold in checks:
+            if value is not None and value > threshold:
+                return f"{name}={value:.2f}>{threshold:g}"
+        if limits.chromium_rss_limit and chromium_rss and chromium_rss > limits.chromium_rss_limit:
+            return f"chromium_rss={chromium_rss >> 20}MB>{limits.chromium_rss_limit >> 20}MB"
+        for stage, entry in self._latencies.items():
+            if (
+                entry.samples >= limits.min_stage_samples
+                and entry.fast > entry.slow * limits.latency_factor
+            ):
+                return f"latency[{stage}]={entry.fast:.1f}s>{limits.latency_factor:g}x{entry.slow:.1f}s"
+        return None
+
+    def evaluate(
+        self,
+        pressure: HostPressure,
+        *,
+        active_tabs: int,
+        chromium_rss: int | None = None,
+        now: float | None = None,
+    ) -> int:
+        """Adjust and return the budget for the next interval."""
+        reason = self._stress_reason(pressure, chromium_rss, now)
+        if reason is not None:
+            self.budget = self._clamp(math.floor(self.budget * self.limits.decrease_factor))
+            self.last_reason = f"decrease: {reason}"
+            self._hold = True
+        elif self._hold:
+            self._hold = False
+            self.last_reason = "hold"
+        elif active_tabs >= self.budget and self.budget < self.limits.max_tabs:
+            self.budget = self._clamp(self.budget + 1)
+            self.last_reason = "increase"
+        else:
+            self.last_reason = "steady"
+        return self.budget
+
+    def snapshot(self) -> dict[str, object]:
+        return {
+            "budget": self.budget,
+            "min_tabs": self.limits.min_tabs,
+            "max_tabs": self.limits.max_tabs,
+            "last_reason": self.last_reason,
+            "failure_rate": self.failure_rate(),
+            "stage_latency_s": {
+                stage: round(entry.fast, 1) for stage, entry in self._latencies.items()
+            },
+        }
+
+
+class TabBudget:
+    """The pool's live tab budget: PRESENTATIONS_MAX_TABS, or the AIMD controller's.
+
+    With PRESENTATIONS_ADAPTIVE_TABS, :meth:`start` runs a control loop that
+    reads host pressure and Chromium RSS every
+    PRESENTATIONS_TAB_CONTROL_INTERVAL_S and lets the controller resize the
+    budget between PRESENTATIONS_MIN_TABS and PRESENTATIONS_MAX_TABS.
+    """
+
+    def __init__(self) -> None:
+        self.controller: AdaptiveTabController | None = None
+        self.host_pressure = HostPressure()
+        self.chromium_rss: int | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def budget(self) -> int:
+        if self.controller is not None:
+            return self.controller.budget
+        return settings.PRESENTATIONS_MAX_TABS
+
+    def start(
+        self, *, active_tabs: Callable[[], int], on_change: Callable[[], Awaitable[None]]
+    ) -> None:
+        if not settings.PRESENTATIONS_ADAPTIVE_TABS:
+            return
+        self.controller = AdaptiveTabController(
+            TabControllerLimits(
+                min_tabs=max(min(settings.PRESENTATIONS_MIN_TABS, settings.PRESENTATIONS_MAX_TABS), 1),
+                max_tabs=max(settings.PRESENTATIONS_MAX_TABS, 1),
+                cpu_load_high=settings.PRESENTATIONS_TAB_CPU_HIGH_PCT / 100,
+                memory_used_high=settings.PRESENTATIONS_TAB_MEMORY_HIGH_PCT / 100,
+                failure_rate_high=settings.PRESENTATIONS_TAB_FAILURE_RATE_HIGH_PCT / 100,
+                chromium_rss_limit=settings.PRESENTATIONS_CHROMIUM_RSS_LIMIT_MB * 1024 * 1024,
+            )
+        )
+        self._task = asyncio.get_running_loop().create_task(
+            self._control_loop(active_tabs, on_change), name="browser-pool-tab-control"
+        )
+
+    def record_stage(self, stage: str, seconds: float) -> None:
+        if self.controller is not None:
+            self.controller.record_stage(stage, seconds)
+
+    def record_outcome(self, failed: bool) -> None:
+        if self.controller is not None:
+            self.controller.record_outcome(failed)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "tab_controller": self.controller.snapshot() if self.controller else None,
+            "host": self.host_pressure.as_dict(),
+            "chromium_rss_mb": None if self.chromium_rss is None else self.chromium_rss >> 20,
+        }
+
+    async def _control_loop(
+        self, active_tabs: Callable[[], int], on_change: Callable[[], Awaitable[None]]
+    ) -> None:
+        """Resize the budget every PRESENTATIONS_TAB_CONTROL_INTERVAL_S."""
+        assert self.controller is not None
+        while True:
+            await asyncio.sleep(settings.PRESENTATIONS_TAB_CONTROL_INTERVAL_S)
+            try:
+                self.host_pressure = await asyncio.to_thread(read_host_pressure)
+                self.chromium_rss = await asyncio.to_thread(process_tree_rss)
+                previous = self.controller.budget
+                budget = self.controller.evaluate(
+                    self.host_pressure,
+                    active_tabs=active_tabs(),
+                    chromium_rss=self.chromium_rss,
+                )
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("BrowserPool: tab control step failed: %s", exc)
+                continue
+            if budget != previous:
+                logger.info(
+                    "BrowserPool: tab budget %d -> %d (%s, host=%s, chromium_rss_mb=%s, worker_pid=%d)",
+                    previous,
+                    budget,
+                    self.controller.last_reason,
+                    self.host_pressure.as_dict(),
+                    None if self.chromium_rss is None else self.chromium_rss >> 20,
+                    os.getpid(),
+                )
+                await on_change()
@@ -0,0 +1,134 @@
+"""Unit tests for BrowserPool shard placement (no browser launched)."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from unittest.mock import patch
+
+from django.test import override_settings
+
+from presentations_app.browser_pool import BrowserPool
+from presentations_app.browser_shards import BrowserShard
+
+
+def _pool(*capacities: int) -> BrowserPool:
+    pool = BrowserPool()
+    pool._fleet.shards = [
+        BrowserShard(index=index, capacity=capacity, healthy=True)
+        for index, capacity in enumerate(capacities)
+    ]
+    return pool
+
+
+@override_settings(PRESENTATIONS_MAX_TABS=10)
+def test_pick_shard_prefers_least_loaded_healthy_shard() -> None:
+    pool = _pool(3, 3, 3)
+    pool._fleet.shards[0].active_tabs = 2
+    pool._fleet.shards[1].healthy = False
+    pool._fleet.shards[2].active_tabs = 1
+    pool._fleet.active_tabs = 3
+
+    assert pool._pick_shard() is pool._fleet.shards[2]
+
+    pool._fleet.shards[2].active_tabs = 3
+    pool._fleet.active_tabs = 5
+    assert pool._pick_shard() is pool._fleet.shards[0]
+
+
+@override_settings(PRESENTATIONS_MAX_TABS=4)
+def test_pick_shard_respects_global_tab_budget() -> None:
+    pool = _pool(3, 3)
+    pool._fleet.shards[0].active_tabs = 2
+    pool._fleet.shards[1].active_tabs = 2
+    pool._fleet.active_tabs = 4
+
+    assert pool.tab_budget == 4
+    assert pool._pick_shard() is None
+
+
+class _FakePage:
+    def __init__(self, closed: bool = False) -> None:
+        self.closed = closed
+
+    def is_closed(self) -> bool:
+        return self.closed
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+@override_settings(PRESENTATIONS_WARM_TAB_MAX_AGE_S=60)
+def test_take_warm_tab_skips_closed_and_stale_tabs() -> None:
+    pool = _pool(2)
+    shard = pool._fleet.shards[0]
+    now = time.monotonic()
+    stale, dead, fresh = _FakePage(), _FakePage(closed=True), _FakePage()
+    shard.warm_pages = [(stale, now - 120), (dead, now), (fresh, now)]
+
+    with patch.object(pool, "_ensure_running"):
+        assert asyncio.run(pool.take_warm_tab(shard)) is fresh
+        assert asyncio.run(pool.take_warm_tab(shard)) is None
+
+    assert stale.closed
+    assert not fresh.closed
+
+
+def test_recycle_reason_checks_generations_uptime_and_rss() -> None:
+    shard = BrowserShard(index=0, capacity=2, healthy=True, launched_at=100.0)
+    limits = {"max_generations": 2, "max_uptime_s": 600, "max_rss": 512 << 20}
+
+    assert shard.recycle_reason(**limits, now=200.0) is None
+    shard.served_tasks = {"a", "b"}
+    assert shard.recycle_reason(**limits, now=200.0).startswith("generations=2")
+
+    shard.served_tasks = set()
+    assert shard.recycle_reason(**limits, now=800.0).startswith("uptime=")
+
+    shard.rss = 600 << 20
+    assert shard.recycle_reason(**limits, now=200.0) == "rss=600MB>=512MB"
+    assert shard.recycle_reason(max_generations=0, max_uptime_s=0, max_rss=0, now=800.0) is None
+
+
+@override_settings(PRESENTATIONS_MAX_TABS=10)
+def test_recycling_shard_admits_no_new_tabs() -> None:
+    pool = _pool(2, 2)
+    pool._fleet.shards[0].recycling = True
+
+    assert pool._pick_shard() is pool._fleet.shards[1]
+    pool._fleet.shards[1].recycling = True
+    assert pool._pick_shard() is None
+
+
+@override_settings(PRESENTATIONS_GENERATION_TIMEOUT_MS=5000)
+def test_recycle_swaps_in_replacement_and_closes_old_after_drain() -> None:
+    pool = _pool(2)
+    old = pool._fleet.shards[0]
+    old.active_tabs = 1
+    old.recycling = True
+    closed: list[BrowserShard] = []
+
+    async def _fake_launch(shard: BrowserShard, storage_state=None) -> None:
+        shard.healthy = True
+
+    async def _fake_close(shard: BrowserShard) -> None:
+        closed.append(shard)
+
+    async def _scenario() -> None:
+        pool._fleet.slots_changed = asyncio.Condition()
+        with patch.object(pool._fleet, "launch", _fake_launch), patch.object(
+            pool._fleet, "close", _fake_close
+        ):
+            recycle = asyncio.create_task(pool._fleet.recycle(old, "test"))
+            await asyncio.sleep(0.01)
+            assert pool._fleet.shards[0] is not old
+            assert pool._fleet.shards[0].recycles == 1
+            assert closed == []
+
+            async with pool._fleet.slots_changed:
+                old.active_tabs = 0
+                pool._fleet.slots_changed.notify_all()
+            await recycle
+        assert closed == [old]
+
+    asyncio.run(_scenario())
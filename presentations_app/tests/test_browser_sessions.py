@@ -0,0 +1,119 @@
+"""Unit tests for stored-session adoption, verification and invalidation (no browser launched)."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from django.test import override_settings
+
+from presentations_module import AuthenticationError
+
+from presentations_app.browser_pool import BrowserPool
+from presentations_app.browser_shards import BrowserShard
+from presentations_app.session_store import FileSessionStore
+from presentations_app.sokratic_accounts import AccountPool, SokraticAccount
+
+_STATE = {
+    "cookies": [{"name": "sid", "value": "s", "domain": "sokratic.ru", "path": "/", "expires": -1}],
+    "origins": [{"origin": "https://sokratic.ru", "localStorage": [{"name": "token", "value": "t"}]}],
+}
+
+
+class _FakeContext:
+    def __init__(self) -> None:
+        self.cookies: list[dict] = []
+        self.init_scripts: list[str] = []
+
+    async def add_cookies(self, cookies: list[dict]) -> None:
+        self.cookies.extend(cookies)
+
+    async def add_init_script(self, script: str) -> None:
+        self.init_scripts.append(script)
+
+
+def _pool(tmp_path: Path, *, logged_in: bool) -> tuple[BrowserPool, BrowserShard, FileSessionStore, list[str]]:
+    account = SokraticAccount(username="a", password="p")
+    pool = BrowserPool()
+    pool._accounts = AccountPool([account])
+    shard = BrowserShard(
+        index=0, capacity=3, healthy=True, account=account, context=_FakeContext(), is_authenticated=True
+    )
+    pool._fleet.shards = [shard]
+    store = FileSessionStore(tmp_path / "session.json")
+    store.save(_STATE)
+    pool._sessions._stores[account.username] = store
+    logins: list[str] = []
+
+    async def _has_session() -> bool:
+        return logged_in
+
+    async def _login(shard: BrowserShard, **kwargs) -> None:
+        logins.append(shard.label)
+        shard.is_authenticated = True
+        shard.session_verified = True
+
+    source = SimpleNamespace(has_session=_has_session)
+    pool._fleet.build_source = lambda logger_obj, storage=None: source
+    pool._sessions._login = _login
+    return pool, shard, store, logins
+
+
+def _authenticate(pool: BrowserPool, shard: BrowserShard) -> None:
+    asyncio.run(
+        pool._sessions.ensure_authenticated(
+            shard, generation_id="g1", logger_obj=None, storage=None
+        )
+    )
+
+
+@override_settings(PRESENTATIONS_WARM_TABS=0)
+def test_a_rejected_stored_session_is_cleared_and_replaced_by_a_login(tmp_path: Path) -> None:
+    pool, shard, store, logins = _pool(tmp_path, logged_in=False)
+
+    _authenticate(pool, shard)
+
+    assert store.load() is None
+    assert logins == [shard.label]
+    assert shard.is_authenticated and shard.session_verified
+
+
+@override_settings(PRESENTATIONS_WARM_TABS=0, PRESENTATIONS_SESSION_MAX_AGE_S=3600)
+def test_adopted_session_restores_local_storage_and_is_checked_once(tmp_path: Path) -> None:
+    pool, shard, store, logins = _pool(tmp_path, logged_in=True)
+    shard.is_authenticated = False
+
+    _authenticate(pool, shard)
+    _authenticate(pool, shard)
+
+    assert logins == []
+    assert shard.is_authenticated and shard.session_verified
+    assert shard.context.cookies == _STATE["cookies"]
+    assert len(shard.context.init_scripts) == 1
+    assert '"origin": "https://sokratic.ru"' in shard.context.init_scripts[0]
+    assert store.load() is not None
+
+
+@override_settings(PRESENTATIONS_MAX_TABS=10)
+def test_a_logout_inside_a_tab_clears_the_stored_session(tmp_path: Path) -> None:
+    pool, shard, store, _logins = _pool(tmp_path, logged_in=True)
+    shard.session_verified = True
+
+    async def _scenario() -> None:
+        pool._fleet.slots_changed = asyncio.Condition()
+        with patch.object(pool, "_ensure_running"):
+            with pytest.raises(AuthenticationError):
+                async with pool.tab_slot("t1"):
+                    raise AuthenticationError("Sokratic session is logged out")
+            deadline = time.monotonic() + 5
+            while store.load() is not None and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+
+    asyncio.run(_scenario())
+
+    assert store.load() is None
+    assert not shard.is_authenticated and not shard.session_verified
@@ -0,0 +1,110 @@
+"""Tests for the claim order: priority, fair share between owners and aging."""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest.mock import patch
+
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+
+from presentations_app import tasks
+from presentations_app.fair_queue import PendingHead, next_pending_ids, schedule
+from presentations_app.models import Presentation
+
+NOW = datetime(2026, 1, 1, 12, 0, tzinfo=dt_timezone.utc)
+
+
+def _heads(owner: str, count: int, *, priority: int = 0, age_s: int = 0) -> list[PendingHead]:
+    return [
+        PendingHead(f"{owner}-{i}", owner, priority, NOW - timedelta(seconds=age_s - i))
+        for i in range(count)
+    ]
+
+
+def _schedule(candidates: list[PendingHead], limit: int, **kwargs) -> list[str]:
+    options = {"in_flight": {}, "weights": {}, "now": NOW, "aging_s": 0, **kwargs}
+    return schedule(candidates, limit, **options)
+
+
+def test_owners_share_the_batch_and_in_flight_work_counts() -> None:
+    candidates = _heads("import", 10, age_s=600) + _heads("user:1", 2)
+
+    assert _schedule(candidates, 4) == ["import-0", "user:1-0", "import-1", "user:1-1"]
+    # The import already holds five slots, so the user goes first.
+    assert _schedule(candidates, 4, in_flight={"import": 5}) == [
+        "user:1-0",
+        "user:1-1",
+        "import-0",
+        "import-1",
+    ]
+
+
+def test_weights_scale_an_owners_share() -> None:
+    candidates = _heads("api/batch:a", 6, age_s=60) + _heads("user:1", 6)
+
+    picked = _schedule(candidates, 6, weights={"user:1": 2})
+
+    assert sum(pres_id.startswith("user:1") for pres_id in picked) == 4
+
+
+def test_priority_first_and_aging_lets_old_work_through() -> None:
+    urgent = _heads("user:1", 3, priority=2)
+    waiting = _heads("import", 1, age_s=300)
+
+    assert _schedule(urgent + waiting, 1) == ["user:1-0"]
+    # Five minutes at one level per two minutes: 0 + 2 ties with 2, and the older row wins.
+    assert _schedule(urgent + waiting, 1, aging_s=120) == ["import-0"]
+
+
+def _presentation(**kwargs) -> Presentation:
+    return Presentation.objects.create(
+        topic="T", language="ru", slides_amount=5, grade=3, subject="Sci", **kwargs
+    )
+
+
+@pytest.mark.django_db
+@override_settings(PRESENTATIONS_PRIORITY_AGING_S=0)
+def test_next_pending_ids_reads_every_owner_through_the_candidates() -> None:
+    bulk = [_presentation(owner_key="api/batch:x") for _ in range(6)]
+    _presentation(owner_key="api/batch:x", status="processing")
+    interactive = _presentation(owner_key="user:7")
+    urgent = _presentation(owner_key="api/batch:x", priority=3)
+
+    picked = next_pending_ids(3)
+
+    assert picked == [str(urgent.id), str(interactive.id), str(bulk[0].id)]
+    with override_settings(PRESENTATIONS_FAIR_QUEUE=False):
+        assert next_pending_ids(2) == [str(bulk[0].id), str(bulk[1].id)]
+
+
+@pytest.mark.django_db
+@patch("presentations_app.views.API_TOKEN", "test-api-token")
+@override_settings(PRESENTATIONS_MAX_TABS=2, PRESENTATIONS_MAX_ORDERS_IN_FLIGHT=10)
+def test_bulk_import_does_not_starve_a_later_request(client, monkeypatch) -> None:
+    monkeypatch.setattr(tasks.generate_presentation_task, "delay", lambda pres_id: None)
+    monkeypatch.setattr(tasks._relay, "dispatched_ids", set())
+    headers = {"HTTP_AUTHORIZATION": "Bearer test-api-token"}
+    row = {"topic": "T", "language": "ru", "grade": 3, "subject": "Sci"}
+    bulk = client.post(
+        reverse("presentation-bulk-create"),
+        data=json.dumps({"items": [dict(row) for _ in range(20)]}),
+        content_type="application/json",
+        **headers,
+    )
+    single = client.post(
+        reverse("presentation-create"),
+        data=json.dumps(row),
+        content_type="application/json",
+        **headers,
+    )
+    assert bulk.status_code == 201 and single.status_code == 201
+    single_id = single.json()["id"]
+    assert Presentation.objects.get(id=single_id).owner_key == "api"
+    assert Presentation.objects.exclude(id=single_id).values("owner_key").distinct().count() == 1
+
+    claimed = tasks._relay.claim_pending_presentations("notify")
+
+    assert len(claimed) == 2 and single_id in claimed
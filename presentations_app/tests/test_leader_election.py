@@ -0,0 +1,117 @@
+"""Tests for the leader lease and node-local beat routing (fake Redis client)."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from presentations_app import leader_election, tasks
+from presentations_app.leader_election import LeaderElection, RedisLeaderLease
+from presentations_app.models import Presentation
+from presentations_app.node_registry import route_node_local_task
+
+
+class _FakeRedis:
+    """GET/SET NX plus the two lease scripts, without expiry (tests delete keys instead)."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, str] = {}
+
+    def set(self, key: str, value: str, nx: bool = False, **_expiry: int) -> bool:
+        if nx and key in self.values:
+            return False
+        self.values[key] = value
+        return True
+
+    def get(self, key: str) -> bytes | None:
+        value = self.values.get(key)
+        return value.encode() if value is not None else None
+
+    def register_script(self, script: str) -> Any:
+        def _run(keys: list[str], args: list[Any]) -> int:
+            if self.values.get(keys[0]) != args[0]:
+                return 0
+            if "DEL" in script:
+                del self.values[keys[0]]
+            return 1
+
+        return _run
+
+
+def _election(client: _FakeRedis, node: str) -> LeaderElection:
+    return LeaderElection(RedisLeaderLease(client, key="leader", lease_s=9, node=node))
+
+
+def test_lease_passes_to_another_node_when_it_expires() -> None:
+    client = _FakeRedis()
+    first, second = _election(client, "n1"), _election(client, "n2")
+
+    assert first.step() and first.is_leader
+    assert not second.step() and not second.is_leader
+    assert first.step()  # renewal keeps it
+    assert second.snapshot()["leader"] == "n1"
+
+    del client.values["leader"]  # n1 stopped renewing and the lease expired
+    assert second.step() and second.is_leader
+    assert not first.step() and not first.is_leader
+
+
+def test_stop_hands_the_lease_over_at_once() -> None:
+    client = _FakeRedis()
+    first, second = _election(client, "n1"), _election(client, "n2")
+    first.step()
+
+    first.stop()
+
+    assert not first.is_leader
+    assert second.step()
+
+
+def test_stalled_leader_steps_down_before_its_lease_ends(monkeypatch) -> None:
+    election = _election(_FakeRedis(), "n1")
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(leader_election.time, "monotonic", lambda: clock.now)
+    election.step()
+
+    clock.now += 5.9
+    assert election.is_leader
+    clock.now += 0.2  # past lease (9 s) minus one renew interval (3 s)
+    assert not election.is_leader
+
+
+def test_periodic_tasks_are_routed_to_the_sending_node(monkeypatch) -> None:
+    monkeypatch.setattr("presentations_app.node_registry.get_worker_node_label", lambda: "host/a")
+
+    route = route_node_local_task("presentations_app.tasks.dispatch_pending_presentations", (), {}, {})
+
+    assert route == {"queue": "presentations.node.host/a"}
+    assert route_node_local_task("presentations_app.tasks.generate_presentation_task", (), {}, {}) is None
+
+
+def _presentation(**kwargs) -> Presentation:
+    return Presentation.objects.create(
+        topic="T", language="ru", slides_amount=5, grade=3, subject="Sci", **kwargs
+    )
+
+
+@pytest.mark.django_db
+def test_relay_on_a_follower_claims_but_leaves_resets_to_the_leader(monkeypatch) -> None:
+    follower = SimpleNamespace(is_leader=False, snapshot=lambda: {"is_leader": False})
+    monkeypatch.setattr(tasks._relay, "leader_election", follower)
+    monkeypatch.setattr(tasks._relay, "dispatched_ids", set())
+    monkeypatch.setattr(tasks.generate_presentation_task, "delay", lambda pres_id: None)
+    stuck = _presentation(status="processing")
+    pending = _presentation()
+
+    tasks.dispatch_pending_presentations()
+
+    assert Presentation.objects.get(id=stuck.id).status == "processing"
+    assert Presentation.objects.get(id=pending.id).status == "queued"
+
+    follower.is_leader = True
+    tasks.dispatch_pending_presentations()
+
+    # Reset by the leader, then claimed again by the same tick.
+    assert Presentation.objects.get(id=stuck.id).status == "queued"
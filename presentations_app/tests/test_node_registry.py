@@ -0,0 +1,117 @@
+"""Tests for node heartbeats and node-targeted assignment (fake Redis client)."""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import pytest
+from django.test import override_settings
+
+from presentations_app import outbox_relay, tasks
+from presentations_app.models import Presentation
+from presentations_app.node_registry import (
+    NodeCapacity,
+    NodeHeartbeat,
+    RedisNodeRegistry,
+    assign_proportionally,
+    node_queue_name,
+)
+
+
+class _FakeRedis:
+    def __init__(self) -> None:
+        self.values: dict[str, bytes] = {}
+        self.sets: dict[str, set[bytes]] = {}
+
+    def pipeline(self) -> "_FakeRedis":
+        return self
+
+    def execute(self) -> list[Any]:
+        return []
+
+    def set(self, key: str, value: str, **_expiry: int) -> None:
+        self.values[key] = value.encode()
+
+    def delete(self, key: str) -> None:
+        self.values.pop(key, None)
+
+    def sadd(self, key: str, *members: str) -> None:
+        self.sets.setdefault(key, set()).update(m.encode() for m in members)
+
+    def srem(self, key: str, *members: str) -> None:
+        self.sets.get(key, set()).difference_update(m.encode() for m in members)
+
+    def smembers(self, key: str) -> set[bytes]:
+        return set(self.sets.get(key, set()))
+
+    def mget(self, keys: list[str]) -> list[bytes | None]:
+        return [self.values.get(key) for key in keys]
+
+
+def _capacity(node: str, free_slots: int) -> NodeCapacity:
+    return NodeCapacity(
+        node=node, queue=node_queue_name(node), free_slots=free_slots, updated_at=time.time()
+    )
+
+
+def test_assign_proportionally_follows_free_slots() -> None:
+    assert assign_proportionally({"a": 6, "b": 3, "c": 0}, 6) == ["a", "b", "a", "b", "a", "a"]
+    assert sorted(assign_proportionally({"a": 1, "b": 1}, 5)) == ["a", "b"]
+    assert assign_proportionally({"a": 2, "b": 2, "c": 2}, 1) == ["a"]
+    assert assign_proportionally({"a": -1}, 3) == []
+
+
+def test_registry_forgets_expired_heartbeats() -> None:
+    client = _FakeRedis()
+    registry = RedisNodeRegistry(client, key_prefix="nodes", ttl_s=20)
+    registry.publish(_capacity("n1", 3))
+    registry.publish(_capacity("n2", 1))
+
+    client.values.pop("nodes:n2")  # its TTL ran out
+
+    assert {node: c.free_slots for node, c in registry.live_nodes().items()} == {"n1": 3}
+    assert client.sets["nodes:index"] == {b"n1"}
+
+
+def _presentation(**kwargs) -> Presentation:
+    return Presentation.objects.create(
+        topic="T", language="ru", slides_amount=5, grade=3, subject="Sci", **kwargs
+    )
+
+
+@pytest.mark.django_db
+@override_settings(PRESENTATIONS_MAX_TABS=1, PRESENTATIONS_MAX_ORDERS_IN_FLIGHT=10)
+def test_claim_sends_presentations_to_node_queues(monkeypatch) -> None:
+    registry = RedisNodeRegistry(_FakeRedis(), key_prefix="nodes", ttl_s=20)
+    heartbeat = NodeHeartbeat(registry, tasks._relay.local_capacity, interval_s=5)
+    monkeypatch.setattr(tasks._relay, "node_registry", registry)
+    monkeypatch.setattr(tasks._relay, "node_heartbeat", heartbeat)
+    monkeypatch.setattr(outbox_relay, "get_worker_node_label", lambda: "local")
+    sent: list[tuple[str, str]] = []
+    monkeypatch.setattr(
+        tasks.generate_presentation_task,
+        "apply_async",
+        lambda args, queue, expires: sent.append((args[0], queue)),
+    )
+    registry.publish(_capacity("busy", 3))
+    # Queued for a node that stopped heartbeating: taken back and reassigned.
+    orphan = _presentation(status="queued", assigned_node="gone")
+    # Sent to "busy" earlier, not started yet: uses one of its slots.
+    _presentation(status="queued", assigned_node="busy")
+    fresh = [_presentation() for _ in range(4)]
+
+    assigned = tasks._relay.claim_pending_presentations("notify")
+
+    by_node = dict(
+        Presentation.objects.filter(id__in=assigned).values_list("id", "assigned_node")
+    )
+    assert len(assigned) == 3  # 1 local slot + 2 left on "busy"
+    assert sorted(by_node.values()) == ["busy", "busy", "local"]
+    assert str(orphan.id) in assigned
+    assert sorted(queue for _, queue in sent) == [
+        "presentations.node.busy",
+        "presentations.node.busy",
+        "presentations.node.local",
+    ]
+    assert Presentation.objects.filter(id__in=[p.id for p in fresh], status="pending").count() == 2
@@ -0,0 +1,76 @@
+"""Unit tests for presentations_app.order_monitor (fake source, no browser)."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from presentations_app.order_monitor import OrderMonitor
+
+
+class _FakePage:
+    def __init__(self) -> None:
+        self.closed = False
+
+    def is_closed(self) -> bool:
+        return self.closed
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class _FakeSource:
+    """Reports an order as ready after it has been probed *ready_after* times."""
+
+    def __init__(self, ready_after: dict[str, int]) -> None:
+        self.ready_after = ready_after
+        self.probes: dict[str, int] = {}
+        self.pages: list[_FakePage] = []
+
+    async def new_tab(self) -> _FakePage:
+        page = _FakePage()
+        self.pages.append(page)
+        return page
+
+    async def is_order_ready(self, page: _FakePage, order_url: str, timeout: int | None = None) -> bool:
+        self.probes[order_url] = self.probes.get(order_url, 0) + 1
+        return self.probes[order_url] >= self.ready_after[order_url]
+
+
+def _monitor(source: _FakeSource) -> OrderMonitor:
+    return OrderMonitor(
+        build_source=lambda: source,  # type: ignore[arg-type,return-value]
+        poll_interval_s=0.01,
+        probe_timeout_ms=10,
+    )
+
+
+def test_waiters_wake_when_their_order_is_ready_using_one_tab() -> None:
+    source = _FakeSource({"o/1": 1, "o/2": 3})
+    monitor = _monitor(source)
+
+    async def scenario() -> None:
+        await asyncio.gather(
+            monitor.wait_until_ready("o/1", timeout_s=1),
+            monitor.wait_until_ready("o/2", timeout_s=1),
+        )
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert source.probes == {"o/1": 1, "o/2": 3}
+    assert len(source.pages) == 1
+    assert source.pages[0].closed
+    assert monitor.pending_count == 0
+
+
+def test_wait_times_out_and_forgets_the_order() -> None:
+    source = _FakeSource({"o/slow": 10_000})
+    monitor = _monitor(source)
+
+    async def scenario() -> None:
+        with pytest.raises(TimeoutError, match="o/slow"):
+            await monitor.wait_until_ready("o/slow", timeout_s=0.05)
+
+    asyncio.run(scenario())
+    assert monitor.pending_count == 0
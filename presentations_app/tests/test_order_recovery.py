@@ -0,0 +1,93 @@
+"""Unit tests for presentations_app.order_recovery."""
+
+from __future__ import annotations
+
+import pytest
+from django.core.management import call_command
+from presentations_module import DownloadFormat
+
+from presentations_app.management.commands import reconcile_sokratic_orders
+from presentations_app.models import Presentation
+from presentations_app.order_recovery import (
+    HistoryOrder,
+    existing_files,
+    match_orphaned_orders,
+    missing_formats,
+    reconcile_candidates,
+)
+
+_ALL = [DownloadFormat.POWERPOINT, DownloadFormat.PDF, DownloadFormat.TEXT]
+
+
+def test_missing_formats_needs_both_stage_and_file() -> None:
+    stages = ["order_submitted", "downloaded_powerpoint", "downloaded_pdf"]
+
+    assert missing_formats(_ALL, stages, ["/d/deck.pptx", "/d/deck.pdf"]) == [DownloadFormat.TEXT]
+    # The PDF stage completed on another node, but the file is not here.
+    assert missing_formats(_ALL, stages, ["/d/deck.pptx"]) == [DownloadFormat.PDF, DownloadFormat.TEXT]
+    assert missing_formats(_ALL, ["order_submitted"], []) == _ALL
+
+
+def test_existing_files_drops_paths_not_on_disk(tmp_path) -> None:
+    kept = tmp_path / "deck.pptx"
+    kept.write_bytes(b"x")
+
+    assert existing_files([str(kept), str(tmp_path / "gone.pdf"), ""]) == [str(kept)]
+    assert existing_files(None) == []
+
+
+def test_match_orphaned_orders_skips_ambiguous_and_taken() -> None:
+    orders = [
+        HistoryOrder("https://s/ru/orders/1", "Фотосинтез"),
+        HistoryOrder("https://s/ru/orders/2", "Клетка"),
+        HistoryOrder("https://s/ru/orders/3", "Клетка"),
+        HistoryOrder("https://s/ru/orders/4", "Вулканы"),
+        HistoryOrder("https://s/ru/orders/5", "Реки России"),
+    ]
+    orphans = [
+        ("a", "  фотосинтез! "),
+        ("b", "Клетка"),
+        ("c", "Вулканы"),
+        ("d", "Реки  России"),
+        ("e", "Реки России"),
+    ]
+
+    matches = match_orphaned_orders(orphans, orders, taken_urls=["https://s/ru/orders/4"])
+
+    assert matches == {"a": "https://s/ru/orders/1"}
+
+
+def test_reconcile_candidates_skip_waiting_rows_and_unread_history() -> None:
+    orders = [HistoryOrder("https://s/ru/orders/1", "Клетка", account="acc1")]
+    rows = [
+        ("failed", "A", "failed", None, None),
+        ("waiting", "B", "pending", None, None),
+        ("stale", "C", "pending", "https://s/ru/orders/9", "acc1"),
+        ("listed", "D", "failed", "https://s/ru/orders/1", "acc1"),
+    ]
+
+    assert reconcile_candidates(rows, orders, limit=10) == [("failed", "A"), ("stale", "C")]
+    # acc1's history filled the limit, so order 9 may just not have been read.
+    assert reconcile_candidates(rows, orders, limit=1) == [("failed", "A")]
+
+
+def _presentation(**kwargs) -> Presentation:
+    return Presentation.objects.create(language="ru", slides_amount=5, grade=3, subject="Sci", **kwargs)
+
+
+@pytest.mark.django_db
+def test_reconcile_leaves_a_pending_row_with_a_colliding_title(monkeypatch) -> None:
+    orders = [
+        HistoryOrder("https://s/ru/orders/1", "Клетка", account="acc1"),
+        HistoryOrder("https://s/ru/orders/2", "Вулканы", account="acc1"),
+    ]
+    monkeypatch.setattr(reconcile_sokratic_orders, "fetch_order_history", lambda limit: orders)
+    waiting = _presentation(topic="Клетка", status="pending")
+    failed = _presentation(topic="Вулканы", status="failed")
+
+    call_command("reconcile_sokratic_orders", "--requeue", stdout=open("/dev/null", "w", encoding="utf-8"))
+
+    waiting.refresh_from_db()
+    failed.refresh_from_db()
+    assert waiting.order_url is None
+    assert (failed.order_url, failed.status) == ("https://s/ru/orders/2", "pending")
@@ -0,0 +1,82 @@
+"""Tests for push dispatch: the NOTIFY trigger, the listener thread and the local claim."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+from django.db import connection, connections
+from django.test import override_settings
+
+from presentations_app import tasks
+from presentations_app.models import Presentation
+from presentations_app.push_dispatch import PENDING_CHANNEL, PushDispatcher
+
+
+def _presentation(**kwargs) -> Presentation:
+    return Presentation.objects.create(
+        topic="T", language="ru", slides_amount=5, grade=3, subject="Sci", **kwargs
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_trigger_notifies_when_a_presentation_becomes_pending() -> None:
+    if connection.vendor != "postgresql":
+        pytest.skip("LISTEN/NOTIFY needs PostgreSQL")
+    listener = connections.create_connection("default")
+    listener.ensure_connection()
+    listener.connection.autocommit = True
+    listener.connection.execute(f"LISTEN {PENDING_CHANNEL}")
+    try:
+        created = _presentation()
+        processing = _presentation(status="processing")
+        Presentation.objects.filter(id=created.id).update(status="queued")
+        Presentation.objects.filter(id=processing.id).update(status="pending")
+        Presentation.objects.filter(id=processing.id).update(status="pending")
+
+        payloads = [n.payload for n in listener.connection.notifies(timeout=1, stop_after=3)]
+    finally:
+        listener.close()
+
+    assert payloads == [str(created.id), str(processing.id)]
+
+
+def test_kicks_are_coalesced_into_one_claim() -> None:
+    calls: list[str] = []
+    claimed = threading.Event()
+
+    def _claim(reason: str) -> None:
+        calls.append(reason)
+        claimed.set()
+
+    dispatcher = PushDispatcher(_claim, debounce_s=0.2, listen=False)
+    dispatcher.start()
+    try:
+        for _ in range(5):
+            dispatcher.kick("capacity")
+        dispatcher.kick("manual")
+        assert claimed.wait(2)
+        time.sleep(0.3)
+    finally:
+        dispatcher.stop()
+
+    assert calls == ["capacity,manual"]
+
+
+@pytest.mark.django_db
+@override_settings(PRESENTATIONS_MAX_TABS=2, PRESENTATIONS_MAX_ORDERS_IN_FLIGHT=10)
+def test_claim_counts_queued_but_unstarted_dispatches(monkeypatch) -> None:
+    delayed: list[str] = []
+    monkeypatch.setattr(tasks.generate_presentation_task, "delay", delayed.append)
+    monkeypatch.setattr(tasks._relay, "dispatched_ids", set())
+    first, second, third = (_presentation() for _ in range(3))
+
+    assert tasks._relay.claim_pending_presentations("notify") == [str(first.id), str(second.id)]
+    # Both are still queued, so the worker has no slot left for the third.
+    assert tasks._relay.claim_pending_presentations("notify") == []
+
+    # A worker started the first one (it holds no tab yet in this test).
+    Presentation.objects.filter(id=first.id).update(status="processing")
+    assert tasks._relay.claim_pending_presentations("capacity") == [str(third.id)]
+    assert delayed == [str(first.id), str(second.id), str(third.id)]
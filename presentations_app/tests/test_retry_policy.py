@@ -0,0 +1,97 @@
+"""Tests for failure classification, retry backoff and claims that wait for it."""
+
+from __future__ import annotations
+
+import random
+from datetime import timedelta
+
+import pytest
+from django.test import override_settings
+from django.utils import timezone
+from playwright._impl._errors import TargetClosedError
+
+from presentations_module import AuthenticationError, PresentationDataError
+
+from presentations_app import tasks
+from presentations_app.models import Presentation
+from presentations_app.retry_policy import classify_failure, retry_delay_s
+
+
+def test_failures_are_classified_by_cause() -> None:
+    assert classify_failure(PresentationDataError("style_id index out of range")) == "data"
+    assert classify_failure(TargetClosedError()) == "browser"
+    assert classify_failure(AuthenticationError("Sokratic session is logged out")) == "auth"
+    assert classify_failure(RuntimeError("Download event not received")) == "site"
+
+
+@override_settings(PRESENTATIONS_RETRY_BACKOFF_S={"site": 100, "browser": 10}, PRESENTATIONS_RETRY_BACKOFF_MAX_S=300)
+def test_backoff_doubles_with_jitter_up_to_the_cap() -> None:
+    rng = random.Random(7)
+
+    first = [retry_delay_s("site", 1, rng=rng) for _ in range(200)]
+    second = [retry_delay_s("site", 2, rng=rng) for _ in range(200)]
+    capped = [retry_delay_s("site", 5, rng=rng) for _ in range(200)]
+
+    assert 50 <= min(first) and max(first) <= 100
+    assert 100 <= min(second) and max(second) <= 200
+    assert 150 <= min(capped) and max(capped) <= 300
+    assert len({round(delay, 3) for delay in first}) > 100
+    assert retry_delay_s("browser", 1, rng=rng) <= 10
+
+
+def _presentation(**kwargs) -> Presentation:
+    return Presentation.objects.create(
+        topic="T", language="ru", slides_amount=5, grade=3, subject="Sci", **kwargs
+    )
+
+
+@pytest.fixture
+def quiet_failures(monkeypatch):
+    async def _no_progress(*_args) -> None:
+        return None
+
+    monkeypatch.setattr(tasks, "_send_progress_async", _no_progress)
+    monkeypatch.setattr(tasks.connections, "close_all", lambda: None)
+    monkeypatch.setattr(tasks.generate_presentation_task, "delay", lambda pres_id: None)
+    scheduled: list = []
+    monkeypatch.setattr(
+        tasks.dispatch_pending_presentations, "apply_async", lambda **kwargs: scheduled.append(kwargs)
+    )
+    monkeypatch.setattr(tasks._relay, "dispatched_ids", set())
+    return scheduled
+
+
+@pytest.mark.django_db
+@override_settings(PRESENTATIONS_MAX_TABS=2, PRESENTATIONS_MAX_ORDERS_IN_FLIGHT=10)
+def test_site_failure_waits_out_its_backoff_before_the_next_claim(quiet_failures) -> None:
+    failing = _presentation(status="processing")
+
+    tasks._handle_task_failure(failing, str(failing.id), RuntimeError("HTTP 502"))
+
+    failing.refresh_from_db()
+    assert failing.status == "pending" and failing.retry_count == 1
+    assert failing.next_attempt_at > timezone.now() + timedelta(seconds=60)
+    assert failing.logs.get(stage="retrying").payload["failure"] == "site"
+    # A claim is scheduled for the moment the backoff ends.
+    assert quiet_failures == [{"eta": failing.next_attempt_at}]
+    assert tasks._relay.claim_pending_presentations("notify") == []
+
+    Presentation.objects.filter(id=failing.id).update(
+        next_attempt_at=timezone.now() - timedelta(seconds=1)
+    )
+    assert tasks._relay.claim_pending_presentations("notify") == [str(failing.id)]
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("quiet_failures")
+def test_data_failure_is_not_retried() -> None:
+    failing = _presentation(status="processing")
+
+    tasks._handle_task_failure(
+        failing, str(failing.id), PresentationDataError("style_id index out of range: 40")
+    )
+
+    failing.refresh_from_db()
+    assert failing.status == "failed" and failing.retry_count == 1
+    assert failing.next_attempt_at is None
+    assert failing.logs.get(stage="failed").payload == {"failure": "data"}
@@ -0,0 +1,53 @@
+"""Unit tests for presentations_app.session_store (file backend, validity check)."""
+
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+from presentations_app.session_store import FileSessionStore, is_session_state_valid
+
+
+def _state(expires: float) -> dict:
+    return {
+        "cookies": [{"name": "sid", "value": "x", "domain": "sokratic.ru", "expires": expires}],
+        "origins": [],
+    }
+
+
+def test_session_state_validity_checks_age_and_cookie_expiry() -> None:
+    now = time.time()
+    fresh = {"saved_at": now - 60, "storage_state": _state(now + 86400)}
+    assert is_session_state_valid(fresh, max_age_s=3600, now=now)
+    assert not is_session_state_valid(fresh, max_age_s=30, now=now)
+
+    expiring = {"saved_at": now - 60, "storage_state": _state(now + 10)}
+    assert not is_session_state_valid(expiring, max_age_s=3600, now=now)
+
+    session_cookie = {"saved_at": now, "storage_state": _state(-1)}
+    assert is_session_state_valid(session_cookie, max_age_s=3600, now=now)
+
+    assert not is_session_state_valid(None, max_age_s=3600, now=now)
+    assert not is_session_state_valid({"saved_at": now, "storage_state": {"cookies": []}}, max_age_s=3600, now=now)
+
+
+def test_file_store_roundtrip_and_single_refresh_lock(tmp_path: Path) -> None:
+    store = FileSessionStore(tmp_path / "session.json")
+    assert store.load() is None
+
+    store.save(_state(time.time() + 86400))
+    record = store.load()
+    assert record is not None
+    assert record["storage_state"]["cookies"][0]["name"] == "sid"
+
+    other = FileSessionStore(tmp_path / "session.json")
+    handle = store.acquire_refresh_lock(timeout_s=1)
+    assert handle is not None
+    assert other.acquire_refresh_lock(timeout_s=0) is None
+    store.release_refresh_lock(handle)
+    second = other.acquire_refresh_lock(timeout_s=0)
+    assert second is not None
+    other.release_refresh_lock(second)
+
+    store.clear()
+    assert store.load() is None
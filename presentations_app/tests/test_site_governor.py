@@ -0,0 +1,109 @@
+"""Unit tests for the Redis site governor (scripted fake client, no Redis)."""
+
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import patch
+
+from django.test import override_settings
+
+from presentations_app.site_governor import (
+    RedisSiteGovernor,
+    build_site_governor,
+    parse_limits,
+    parse_rates,
+)
+
+
+class _FakeScript:
+    def __init__(self, client: "_FakeRedis", name: str) -> None:
+        self.client = client
+        self.name = name
+
+    def __call__(self, keys, args):
+        self.client.calls.append((self.name, keys[0]))
+        replies = self.client.replies.get(self.name, [])
+        return replies.pop(0) if replies else 1
+
+
+class _FakeRedis:
+    def __init__(self, replies: dict[str, list[int]]) -> None:
+        self.replies = replies
+        self.calls: list[tuple[str, str]] = []
+        self.removed: list[tuple[str, str]] = []
+
+    def register_script(self, script: str) -> _FakeScript:
+        if "HMGET" in script:
+            return _FakeScript(self, "token")
+        if "'XX'" in script:
+            return _FakeScript(self, "renew")
+        return _FakeScript(self, "slot")
+
+    def zrem(self, key: str, member: str) -> None:
+        self.removed.append((key, member))
+
+
+def _governor(client: _FakeRedis) -> RedisSiteGovernor:
+    return RedisSiteGovernor(
+        client,
+        key_prefix="gov",
+        rates={"submit": (2.0, 1.0)},
+        limits={"submit": 1},
+        lease_s=60,
+        node="node-a",
+    )
+
+
+def test_parse_rates_and_limits() -> None:
+    assert parse_rates({"submit": "12/60", "download": "5", "other": "1/1", "bad": "x"}) == {
+        "submit": (12.0, 0.2),
+        "download": (5.0, 5.0),
+    }
+    assert parse_limits({"download": "8", "submit": "0", "other": "3"}) == {"download": 8}
+
+
+def test_permit_waits_for_slot_then_token_and_releases() -> None:
+    client = _FakeRedis({"slot": [0, 1], "token": [30, 0]})
+    governor = _governor(client)
+
+    async def _run() -> None:
+        with patch.object(RedisSiteGovernor, "_POLL_S", 0.01):
+            async with governor.permit("submit"):
+                assert governor.stats["submit"].waiting == 0
+
+    asyncio.run(_run())
+
+    assert [name for name, _ in client.calls] == ["slot", "slot", "token", "token"]
+    assert client.removed and client.removed[0][0] == "gov:submit:holders"
+    assert client.removed[0][1].startswith("node-a|")
+    stats = governor.stats["submit"].as_dict()
+    assert stats["granted"] == 1 and stats["wait_s_max"] > 0
+
+
+def test_permit_fails_open_when_redis_errors() -> None:
+    client = _FakeRedis({})
+    governor = _governor(client)
+
+    async def _broken(*_args, **_kwargs):
+        raise ConnectionError("redis down")
+
+    async def _run() -> None:
+        with patch.object(governor, "_wait_for_slot", _broken):
+            async with governor.permit("submit"):
+                pass
+
+    asyncio.run(_run())
+
+    assert governor.stats["submit"].errors == 1
+    assert governor.stats["submit"].granted == 1
+    assert client.removed == []
+
+
+@override_settings(
+    PRESENTATIONS_SITE_GOVERNOR="auto",
+    PRESENTATIONS_SITE_GOVERNOR_REDIS_URL="redis://127.0.0.1:6379/0",
+    PRESENTATIONS_SITE_RATES={},
+    PRESENTATIONS_SITE_CONCURRENCY={},
+)
+def test_governor_is_off_without_limits() -> None:
+    assert build_site_governor() is None
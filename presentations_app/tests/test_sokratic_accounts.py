@@ -0,0 +1,127 @@
+"""Unit tests for Sokratic account parsing, quarantine and account-aware shard placement."""
+
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from django.test import override_settings
+
+from presentations_module import AuthenticationError, PresentationDataError
+
+from presentations_app.browser_pool import BrowserPool
+from presentations_app.browser_shards import BrowserShard
+from presentations_app.session_store import FileSessionStore, build_session_store
+from presentations_app.sokratic_accounts import AccountPool, SokraticAccount, parse_accounts
+
+
+def test_parse_accounts_reads_optional_tab_cap() -> None:
+    accounts = parse_accounts(
+        ["a@x.ru:secret:4", "b@x.ru:pa:ss", "broken", "A@x.ru:dup", "c@x.ru:p:12:3"]
+    )
+
+    assert [(a.username, a.password, a.max_tabs) for a in accounts] == [
+        ("a@x.ru", "secret", 4),
+        ("b@x.ru", "pa:ss", 0),
+        ("c@x.ru", "p:12", 3),
+    ]
+
+
+def test_account_is_quarantined_after_consecutive_failures() -> None:
+    account = SokraticAccount(username="a", password="p", capacity=2)
+    limits = {"threshold": 2, "quarantine_s": 600, "now": 100.0}
+
+    assert not account.record_failure("auth failed", **limits)
+    account.record_success()
+    assert not account.record_failure("tab timeout", **limits)
+    assert account.record_failure("tab timeout", **limits)
+    assert not account.admits(now=500.0)
+    assert account.admits(now=701.0)
+
+    last = SokraticAccount(username="b", password="p")
+    for _ in range(3):
+        assert not last.record_failure("auth failed", **limits, can_quarantine=False)
+    assert last.admits(now=100.0)
+
+
+def _pool(*accounts: SokraticAccount) -> BrowserPool:
+    pool = BrowserPool()
+    pool._accounts = AccountPool(accounts)
+    pool._fleet.shards = [
+        BrowserShard(index=index, capacity=3, healthy=True, account=account)
+        for index, account in enumerate(accounts)
+    ]
+    for account in accounts:
+        account.capacity = account.max_tabs or 3
+    return pool
+
+
+@override_settings(PRESENTATIONS_MAX_TABS=10)
+def test_pick_shard_prefers_least_loaded_account_and_honours_pinning() -> None:
+    busy = SokraticAccount(username="busy", password="p", max_tabs=2, active_tabs=1)
+    idle = SokraticAccount(username="idle", password="p", active_tabs=1)
+    pool = _pool(busy, idle)
+
+    assert pool._pick_shard().account is idle
+
+    idle.quarantined_until = float("inf")
+    assert pool._pick_shard().account is busy
+    # Orders already placed on a quarantined account still get a tab there.
+    assert pool._pick_shard("idle").account is idle
+
+    busy.active_tabs = 2
+    assert pool._pick_shard() is None
+    assert pool._pick_shard("busy") is None
+
+
+@override_settings(PRESENTATIONS_MAX_TABS=10)
+def test_data_errors_do_not_count_against_the_account() -> None:
+    account = SokraticAccount(username="a", password="p")
+    pool = _pool(account)
+
+    async def _fail(exc: Exception) -> None:
+        async with pool.tab_slot("t1"):
+            raise exc
+
+    async def _scenario() -> None:
+        pool._fleet.slots_changed = asyncio.Condition()
+        with patch.object(pool, "_ensure_running"):
+            with pytest.raises(PresentationDataError):
+                await _fail(PresentationDataError("style_id index out of range"))
+            assert account.failures == 0
+            with pytest.raises(RuntimeError):
+                await _fail(RuntimeError("page changed"))
+            assert account.failures == 1
+        assert account.active_tabs == 0
+
+    asyncio.run(_scenario())
+
+
+def test_a_logged_out_session_does_not_quarantine_the_account() -> None:
+    account = SokraticAccount(username="a", password="p")
+    pool = _pool(account)
+    shard = pool._fleet.shards[0]
+    shard.is_authenticated = True
+
+    async def _scenario() -> None:
+        pool._fleet.slots_changed = asyncio.Condition()
+        with patch.object(pool, "_ensure_running"):
+            for _ in range(5):
+                with pytest.raises(AuthenticationError):
+                    async with pool.tab_slot("t1"):
+                        raise AuthenticationError("Sokratic session is logged out")
+        assert account.failures == 0 and not account.is_quarantined()
+        assert shard.is_authenticated is False
+
+    asyncio.run(_scenario())
+
+
+@override_settings(PRESENTATIONS_SESSION_STORE="file", PRESENTATIONS_SESSION_FILE="/tmp/s/session.json")
+def test_session_store_is_kept_per_account() -> None:
+    store = build_session_store("abc123")
+
+    assert isinstance(store, FileSessionStore)
+    assert store.path == Path("/tmp/s/session.abc123.json")
+    assert build_session_store().path == Path("/tmp/s/session.json")
@@ -0,0 +1,76 @@
+"""Unit tests for the adaptive tab budget and /proc readers."""
+
+from __future__ import annotations
+
+import os
+
+from presentations_app.host_metrics import HostPressure, process_tree_rss, read_host_pressure
+from presentations_app.tab_controller import AdaptiveTabController, TabControllerLimits
+
+_CALM = HostPressure(cpu_load=0.2, cpu_psi=1.0, memory_used=0.4, memory_psi=0.0)
+
+
+def _controller(budget: int = 4, **limits) -> AdaptiveTabController:
+    return AdaptiveTabController(TabControllerLimits(min_tabs=1, max_tabs=8, **limits), budget=budget)
+
+
+def test_budget_grows_additively_only_while_used() -> None:
+    controller = _controller()
+
+    assert controller.evaluate(_CALM, active_tabs=1) == 4
+    assert controller.last_reason == "steady"
+    assert controller.evaluate(_CALM, active_tabs=4) == 5
+    assert controller.evaluate(_CALM, active_tabs=5) == 6
+
+
+def test_host_pressure_cuts_budget_and_holds_one_interval() -> None:
+    controller = _controller(budget=8)
+
+    hot = HostPressure(cpu_load=1.5)
+    assert controller.evaluate(hot, active_tabs=8) == 5
+    assert controller.last_reason.startswith("decrease: cpu_load")
+    assert controller.evaluate(_CALM, active_tabs=5) == 5
+    assert controller.last_reason == "hold"
+    assert controller.evaluate(_CALM, active_tabs=5) == 6
+
+
+def test_budget_stays_within_bounds() -> None:
+    controller = _controller(budget=1)
+    assert controller.evaluate(HostPressure(memory_used=0.99), active_tabs=1) == 1
+
+    controller = _controller(budget=8)
+    controller.evaluate(_CALM, active_tabs=8)
+    assert controller.budget == 8
+
+
+def test_failure_rate_and_chromium_rss_are_stress_signals() -> None:
+    controller = _controller(budget=6, chromium_rss_limit=100 << 20)
+    for failed in (True, True, False, False):
+        controller.record_outcome(failed, now=100.0)
+    assert controller.failure_rate(now=100.0) == 0.5
+    assert controller.evaluate(_CALM, active_tabs=6, now=100.0) == 4
+    assert "failure_rate" in controller.last_reason
+
+    controller = _controller(budget=6, chromium_rss_limit=100 << 20)
+    controller.evaluate(_CALM, active_tabs=6, chromium_rss=200 << 20)
+    assert "chromium_rss" in controller.last_reason
+
+
+def test_stage_latency_well_above_baseline_is_stress() -> None:
+    controller = _controller(budget=6)
+    for _ in range(10):
+        controller.record_stage("form_saved", 2.0)
+    controller.evaluate(_CALM, active_tabs=6)
+    assert controller.last_reason == "increase"
+
+    for _ in range(5):
+        controller.record_stage("form_saved", 20.0)
+    controller.evaluate(_CALM, active_tabs=7)
+    assert controller.last_reason.startswith("decrease: latency[form_saved]")
+
+
+def test_proc_readers_do_not_raise() -> None:
+    pressure = read_host_pressure()
+    assert isinstance(pressure.as_dict(), dict)
+    rss = process_tree_rss(os.getpid(), include_root=True)
+    assert rss is None or rss > 0
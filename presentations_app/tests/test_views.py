@@ -1,6 +1,9 @@
 import json
 import uuid
+from unittest.mock import patch
+
 from django.test import TestCase, RequestFactory
+from django.urls import reverse
 from presentations_app.models import Presentation, PresentationLog
 from presentations_app.views import PresentationActiveView
 
@@ -38,3 +41,26 @@ class PresentationActiveViewErrorTest(TestCase):
         found = next((i for i in items if i["id"] == str(pid)), None)
         self.assertIsNotNone(found)
         self.assertIsNone(found["error_message"])
+
+
+class PresentationRestartViewTest(TestCase):
+    @patch("presentations_app.views.API_TOKEN", "test-api-token")
+    def test_restart_drops_the_recorded_order(self):
+        p = Presentation.objects.create(
+            topic="T", language="en", slides_amount=5, grade=3, subject="Sci",
+            status="failed", retry_count=3, files=["/tmp/a.pdf"],
+            order_url="https://sokratic.ru/presentations/1",
+            completed_stages=["order_submitted"], sokratic_account="acc1",
+        )
+
+        response = self.client.post(
+            reverse("presentation-restart", kwargs={"presentation_id": p.id}),
+            HTTP_AUTHORIZATION="Bearer test-api-token",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        p.refresh_from_db()
+        self.assertEqual((p.status, p.retry_count, p.files), ("pending", 0, []))
+        self.assertIsNone(p.order_url)
+        self.assertEqual(p.completed_stages, [])
+        self.assertIsNone(p.sokratic_account)
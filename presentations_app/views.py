@@ -8,6 +8,7 @@ from functools import wraps
 
 import os
 import mimetypes
+import uuid
 
 from django.http import Http404, HttpRequest, HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404, render, redirect
@@ -19,6 +20,7 @@ from django.contrib.auth import authenticate, login as django_login, logout as d
 from django.db import connection, transaction
 
 from .dto import CreatePresentationCommandDto
+from .fair_queue import PRIORITY_MAX, PRIORITY_MIN, owner_key
 from .models import Presentation, UserToken
 from .s3 import build_s3_storage
 from .sftp_download import sftp_file_http_response
@@ -204,6 +206,16 @@ def _validate_create_payload(  # pylint: disable=too-many-return-statements,too-
         except (TypeError, ValueError):
             return None, JsonResponse({"detail": "template must be an integer if provided"}, status=400)
 
+    try:
+        priority: int | None = int(payload.get("priority") or 0)
+    except (TypeError, ValueError):
+        priority = None
+    if priority is None or not PRIORITY_MIN <= priority <= PRIORITY_MAX:
+        return None, JsonResponse(
+            {"detail": f"priority must be an integer between {PRIORITY_MIN} and {PRIORITY_MAX}"},
+            status=400,
+        )
+
     return CreatePresentationCommandDto(
         topic=payload["topic"],
         language=payload["language"],
@@ -216,9 +228,18 @@ def _validate_create_payload(  # pylint: disable=too-many-return-statements,too-
         template=template,
         files=list(files),
         status=status,
+        priority=priority,
     ), None
 
 
+def _requester_key(request: HttpRequest) -> str:
+    """Fair-share owner of API requests: the token's user, or the static API token."""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return "api"
+
+
 class PresentationCreateView(View):
     """Controller that creates new presentations."""
 
@@ -252,6 +273,7 @@ class PresentationCreateView(View):
                     status=200,
                 )
 
+        command.owner_key = owner_key(_requester_key(request))
         presentation = self.service.create_presentation(command.with_status("pending"))
         # No explicit dispatch — the outbox relay (Celery Beat) will pick it up.
         return JsonResponse(
@@ -277,6 +299,8 @@ class PresentationCreateView(View):
 class PresentationBulkCreateView(View):
     """Create multiple presentations in one request."""
 
+    service = PresentationService()
+
     @method_decorator(_require_api_token)
     def post(self, request: HttpRequest, *args: Any, **kwargs: Any) -> JsonResponse:
         try:
@@ -295,6 +319,10 @@ class PresentationBulkCreateView(View):
         if slides_amount < 0:
             return JsonResponse({"detail": "slides_amount must be non-negative"}, status=400)
 
+        # Each request is its own fair-share bucket (per book when book_id is
+        # set), so a large import cannot starve the requester's other work.
+        requester = _requester_key(request)
+        batch = uuid.uuid4().hex[:12]
         commands: list[CreatePresentationCommandDto] = []
         for item in items:
             row_payload = dict(item)
@@ -306,6 +334,7 @@ class PresentationBulkCreateView(View):
             if error is not None or command is None:
                 return JsonResponse({"detail": "Invalid row payload"}, status=400)
 
+            command.owner_key = owner_key(requester, book_id=command.book_id, batch=batch)
             commands.append(command.with_status("pending"))
 
         task_ids = [command.task_id for command in commands if command.task_id]
@@ -344,21 +373,7 @@ class PresentationBulkCreateView(View):
                     continue
                 seen_new_task_ids.add(command.task_id)
 
-            to_create.append(
-                Presentation(
-                    topic=command.topic,
-                    language=command.language,
-                    slides_amount=command.slides_amount,
-                    grade=command.grade,
-                    subject=command.subject,
-                    author=command.author,
-                    task_id=command.task_id,
-                    book_id=command.book_id,
-                    template=command.template,
-                    status=command.status,
-                    files=list(command.files),
-                )
-            )
+            to_create.append(self.service.build_presentation(command))
 
         created = Presentation.objects.bulk_create(to_create)
 
@@ -516,7 +531,17 @@ class PresentationRestartView(View):
     @method_decorator(_require_api_token)
     def post(self, request: HttpRequest, presentation_id: str, *args: Any, **kwargs: Any) -> JsonResponse:
         presentation = get_object_or_404(Presentation, id=presentation_id)
-        Presentation.objects.filter(id=presentation_id).update(status="pending", files=[], retry_count=0)
+        # Drop the recorded order too, so the restart submits a new deck
+        # instead of re-harvesting the old one.
+        Presentation.objects.filter(id=presentation_id).update(
+            status="pending",
+            files=[],
+            retry_count=0,
+            next_attempt_at=None,
+            order_url=None,
+            completed_stages=[],
+            sokratic_account=None,
+        )
         # No explicit dispatch — the outbox relay (Celery Beat) will pick it up.
         return JsonResponse(
             {
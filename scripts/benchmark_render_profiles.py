@@ -0,0 +1,178 @@
+"""Compare rendering profiles: per-tab RSS and CPU of Chromium, and landing-page stage latency.
+
+For every profile a browser is launched the way the worker pool launches it
+(same flags, context options, page helpers and request policy), then
+``--tabs`` routed tabs load the Sokratic landing page at once. The script
+records per tab how long navigation and the "Создать с AI" button took, and
+per round the browser's RSS and CPU time above its idle baseline.
+
+    python scripts/benchmark_render_profiles.py --profiles standard,lean --tabs 6 --rounds 3
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+from playwright.async_api import async_playwright
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from presentations_app.host_metrics import browser_tree_cpu_s, browser_tree_rss  # noqa: E402
+from presentations_module import (  # noqa: E402
+    RENDER_PROFILES,
+    SokraticSource,
+    get_render_profile,
+    install_page_helpers,
+)
+
+load_dotenv()
+
+USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36"
+)
+SETTLE_S = 2.0
+
+
+async def _load_tab(source, timeout_ms):
+    """Stage latencies of one tab in seconds; None for a stage that did not finish."""
+    page = await source.new_tab()
+    started = time.monotonic()
+    timings = {"goto": None, "landing_ready": None}
+    try:
+        await page.goto(source.url, timeout=timeout_ms)
+        timings["goto"] = time.monotonic() - started
+        if await source.is_landing_ready(page, timeout=timeout_ms):
+            timings["landing_ready"] = time.monotonic() - started
+    except Exception as exc:  # pylint: disable=broad-except
+        print(f"  tab failed: {exc}", file=sys.stderr)
+    return page, timings
+
+
+async def run_profile(playwright, profile, args):
+    marker = f"--presentations-shard=benchmark-{os.getpid()}-{profile.name}"
+    browser = await playwright.chromium.launch(
+        **profile.launch_options(args.headless, extra_args=(marker,))
+    )
+    context = await browser.new_context(
+        **profile.context_options(),
+        locale="ru-RU",
+        timezone_id="Europe/Moscow",
+        user_agent=USER_AGENT,
+    )
+    await install_page_helpers(context)
+    await profile.install(context)
+    source = SokraticSource(
+        playwright,
+        logger=logging.getLogger("benchmark"),
+        generation_dir=tempfile.gettempdir(),
+        generation_timeout=args.timeout_ms,
+        render_profile=profile,
+    )
+    source.browser, source.context, source.is_init = browser, context, True
+
+    rounds = []
+    try:
+        for _ in range(args.rounds):
+            await asyncio.sleep(SETTLE_S)
+            rss_idle = browser_tree_rss(marker) or 0
+            cpu_before = browser_tree_cpu_s(marker) or 0.0
+            results = await asyncio.gather(
+                *(_load_tab(source, args.timeout_ms) for _ in range(args.tabs))
+            )
+            await asyncio.sleep(SETTLE_S)
+            rss_loaded = browser_tree_rss(marker) or 0
+            cpu_after = browser_tree_cpu_s(marker) or 0.0
+            rounds.append(
+                {
+                    "rss_per_tab_mb": (rss_loaded - rss_idle) / args.tabs / 2**20,
+                    "cpu_per_tab_s": (cpu_after - cpu_before) / args.tabs,
+                    "timings": [timings for _, timings in results],
+                }
+            )
+            for page, _ in results:
+                await page.close()
+    finally:
+        await context.close()
+        await browser.close()
+    return summarize(profile.name, rounds, args.tabs)
+
+
+def _median(values):
+    values = [value for value in values if value is not None]
+    return round(statistics.median(values), 3) if values else None
+
+
+def summarize(name, rounds, tabs):
+    timings = [timing for round_ in rounds for timing in round_["timings"]]
+    return {
+        "profile": name,
+        "tabs": tabs,
+        "rounds": len(rounds),
+        "rss_per_tab_mb": _median([round_["rss_per_tab_mb"] for round_ in rounds]),
+        "cpu_per_tab_s": _median([round_["cpu_per_tab_s"] for round_ in rounds]),
+        "goto_s": _median([timing["goto"] for timing in timings]),
+        "landing_ready_s": _median([timing["landing_ready"] for timing in timings]),
+        "failed_tabs": sum(1 for timing in timings if timing["landing_ready"] is None),
+    }
+
+
+def print_table(rows):
+    columns = [
+        "profile",
+        "tabs",
+        "rounds",
+        "rss_per_tab_mb",
+        "cpu_per_tab_s",
+        "goto_s",
+        "landing_ready_s",
+        "failed_tabs",
+    ]
+    print("  ".join(f"{column:>15}" for column in columns))
+    for row in rows:
+        print("  ".join(f"{str(row[column]):>15}" for column in columns))
+
+
+async def main_async(args):
+    rows = []
+    async with async_playwright() as playwright:
+        for name in args.profiles:
+            profile = get_render_profile(name)
+            print(f"Benchmarking profile {name!r} ({args.tabs} tabs x {args.rounds} rounds)...")
+            rows.append(await run_profile(playwright, profile, args))
+    print_table(rows)
+    if args.json:
+        Path(args.json).write_text(json.dumps(rows, indent=2), encoding="utf-8")
+        print(f"Wrote {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--profiles",
+        default=",".join(RENDER_PROFILES),
+        type=lambda value: [item.strip() for item in value.split(",") if item.strip()],
+        help="Comma-separated profile names (default: all)",
+    )
+    parser.add_argument("--tabs", type=int, default=4, help="Tabs loaded concurrently per round")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--timeout-ms", type=int, default=30000)
+    parser.add_argument("--headed", dest="headless", action="store_false")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+    if not sys.platform.startswith("linux"):
+        print("RSS and CPU are read from /proc; only latencies are measured on this platform.")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()